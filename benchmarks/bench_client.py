@@ -0,0 +1,159 @@
+"""
+Offline benchmarks of the client against a local IBKRSimulator, results are printed as JSON.
+
+    python benchmarks/bench_client.py --output bench.json
+    python benchmarks/bench_client.py --quick
+    python benchmarks/bench_client.py --transport urllib3   # compare transports under the same workload
+    python benchmarks/bench_client.py --payload-dir recorded/   # also decode recorded *.json responses
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from ibkr_web_client import IBKRHttpClient
+from ibkr_web_client.auth import IBKRAuthenticator
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials, SimulatorSettings, SyntheticData
+from ibkr_web_client.transport import TRANSPORTS, Transport, create_transport
+
+
+LOGGER = logging.getLogger("ibkr_web_client.benchmarks")
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+
+def latency_stats(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "requests_per_second": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        "mean_ms": statistics.mean(ordered) * 1000,
+    }
+
+
+def timed(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def bench_signing(simulator: IBKRSimulator, iterations: int) -> Dict[str, float]:
+    config = simulator.client_config()
+    url = f"{config.base_url}/portfolio/accounts"
+
+    lst_times = [timed(lambda: IBKRAuthenticator(config, LOGGER).get_headers("GET", url)) for _ in range(3)]
+
+    authenticator = IBKRAuthenticator(config, LOGGER)
+    authenticator.get_headers("GET", url)
+    elapsed = timed(lambda: [authenticator.get_headers("GET", url) for _ in range(iterations)])
+    return {
+        "headers_per_second": iterations / elapsed,
+        "lst_negotiation_ms": statistics.median(lst_times) * 1000,
+    }
+
+
+def bench_decode(size: int, payload_dir: Path = None) -> Dict[str, Dict[str, float]]:
+    data = SyntheticData(SimulatorSettings(size=size))
+    payloads = {
+        "all_conids": json.dumps(
+            [{"ticker": f"SYM{conid - 100000}", "conid": conid, "exchange": "NASDAQ"} for conid in data.conids]
+        ).encode("utf-8"),
+        "history": json.dumps(data.history(100000)).encode("utf-8"),
+        "scanner_params": json.dumps(data.scanner_params()).encode("utf-8"),
+    }
+    for path in sorted(payload_dir.glob("*.json")) if payload_dir else []:
+        payloads[path.stem] = path.read_bytes()
+
+    results = {}
+    for name, payload in payloads.items():
+        repeats = max(3, int(20_000_000 / max(len(payload), 1)) // 10)
+        elapsed = timed(lambda: [json.loads(payload.decode("utf-8")) for _ in range(repeats)])
+        results[name] = {"bytes": len(payload), "mb_per_second": len(payload) * repeats / elapsed / 1e6}
+    return results
+
+
+def bench_end_to_end(client: IBKRHttpClient, requests: int, workers: int) -> Dict[str, Dict[str, float]]:
+    def request() -> float:
+        return timed(lambda: client.get_portfolio_summary("U1000000"))
+
+    results = {}
+    started = time.perf_counter()
+    latencies = [request() for _ in range(requests)]
+    results["sequential"] = latency_stats(latencies, time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        started = time.perf_counter()
+        latencies = list(executor.map(lambda _: request(), range(requests)))
+        results["threaded"] = latency_stats(latencies, time.perf_counter() - started)
+
+    async def run_async() -> List[float]:
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return await asyncio.gather(*[loop.run_in_executor(executor, request) for _ in range(requests)])
+
+    started = time.perf_counter()
+    latencies = asyncio.run(run_async())
+    results["async"] = latency_stats(latencies, time.perf_counter() - started)
+    return results
+
+
+def build_transport(name: str, simulator: IBKRSimulator) -> Transport:
+    if name == "inprocess":
+        return create_transport(name, handler=simulator.handle)
+    return create_transport(name)
+
+
+def main(argv: List[str] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="small sizes, for smoke testing")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--signing-iterations", type=int, default=5000)
+    parser.add_argument("--payload-size", type=int, default=20000, help="rows of the synthetic decode payloads")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated server latency in seconds")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="requests")
+    parser.add_argument("--payload-dir", type=Path, help="directory of recorded *.json responses to decode")
+    parser.add_argument("--output", type=Path, help="write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.requests, args.signing_iterations, args.payload_size = 20, 200, 500
+
+    with tempfile.TemporaryDirectory() as directory:
+        credentials = SimulatorCredentials.generate(directory)
+        with IBKRSimulator(credentials, SimulatorSettings(latency=args.latency)) as simulator:
+            # pacing, coalescing and caching would hide the transport cost that is measured here
+            config = simulator.client_config(enforce_pacing=False, coalesce_endpoints=(), response_cache_ttls={})
+            client = IBKRHttpClient(config, LOGGER, build_transport(args.transport, simulator))
+            results = {
+                "meta": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "timestamp": int(time.time()),
+                    "args": {key: str(value) for key, value in vars(args).items()},
+                },
+                "signing": bench_signing(simulator, args.signing_iterations),
+                "decode": bench_decode(args.payload_size, args.payload_dir),
+                "end_to_end": bench_end_to_end(client, args.requests, args.workers),
+            }
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,14 @@ setup(
         "PyCryptodome",
         "urllib3",
         "cryptography",
+        "numpy",
         "pytest"
     ],
+    extras_require={
+        "pandas": ["pandas"],
+        "httpx": ["httpx[http2]"],
+        "streaming": ["websockets>=13"],
+    },
     python_requires=">=3.8",
     author="Nikita Sirons",
     author_email="nikita.sirons@gmail.com",
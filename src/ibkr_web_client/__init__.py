@@ -1,5 +1,88 @@
 from .client import IBKRHttpClient
 from .config import IBKRConfig
+from .order_feed import OrderTradeFeed, FeedEvent, FeedCycleStats, FeedItemKind, FeedAction
+from .trade_journal import TradeJournal
+from .pagination import iter_subaccounts, iter_positions
+from .pacing import Pacer, RateLimiter
+from .portfolio_snapshot import PortfolioSnapshot, fetch_portfolio_snapshot
+from .account_scheduler import AccountScheduler
+from .singleflight import SingleFlight
+from .cache import ResponseCache, CacheBackend, MemoryCacheBackend, SQLiteCacheBackend
+from .scanner_catalog import ScannerCatalog
+from .scanner_batch import ScanBatchRunner, ScanDefinition, ScanMatch, ScanBatchResult
+from .watchlist_sync import WatchlistSync, WatchlistSpec, WatchlistSyncReport
+from .alert_bulk import AlertManager, AlertOperationResult, AlertReconcileReport
+from .alert_evaluator import AlertEvaluator, AlertTrigger
+from .fx_matrix import FxMatrix
+from .transactions import TransactionTable, fetch_transactions
+from .performance import PerformanceData, PerformanceService
+from .simulator import IBKRSimulator, SimulatorCredentials, SimulatorSettings
+from .recording import CassetteMissError, CassettePlayer, CassetteRecorder
+from .transport import Transport, RequestsTransport, Urllib3Transport, HttpxTransport, InProcessTransport
+from .keepalive import SessionKeepalive, SessionRecovery, SessionState
+from .streaming import MarketDataStream, Tick
+from .subscriptions import MarketDataSubscriptions
+from .market_data_cache import LastValueCache
+from .polling import PolledInstrument, SnapshotPoller
 
 
-__all__ = ["IBKRHttpClient", "IBKRConfig"]
+__all__ = [
+    "IBKRHttpClient",
+    "IBKRConfig",
+    "OrderTradeFeed",
+    "FeedEvent",
+    "FeedCycleStats",
+    "FeedItemKind",
+    "FeedAction",
+    "TradeJournal",
+    "iter_subaccounts",
+    "iter_positions",
+    "Pacer",
+    "RateLimiter",
+    "PortfolioSnapshot",
+    "fetch_portfolio_snapshot",
+    "AccountScheduler",
+    "SingleFlight",
+    "ResponseCache",
+    "CacheBackend",
+    "MemoryCacheBackend",
+    "SQLiteCacheBackend",
+    "ScannerCatalog",
+    "ScanBatchRunner",
+    "ScanDefinition",
+    "ScanMatch",
+    "ScanBatchResult",
+    "WatchlistSync",
+    "WatchlistSpec",
+    "WatchlistSyncReport",
+    "AlertManager",
+    "AlertOperationResult",
+    "AlertReconcileReport",
+    "AlertEvaluator",
+    "AlertTrigger",
+    "FxMatrix",
+    "TransactionTable",
+    "fetch_transactions",
+    "PerformanceData",
+    "PerformanceService",
+    "IBKRSimulator",
+    "SimulatorCredentials",
+    "SimulatorSettings",
+    "CassetteMissError",
+    "CassettePlayer",
+    "CassetteRecorder",
+    "Transport",
+    "RequestsTransport",
+    "Urllib3Transport",
+    "HttpxTransport",
+    "InProcessTransport",
+    "SessionKeepalive",
+    "SessionRecovery",
+    "SessionState",
+    "MarketDataStream",
+    "Tick",
+    "MarketDataSubscriptions",
+    "LastValueCache",
+    "SnapshotPoller",
+    "PolledInstrument",
+]
@@ -0,0 +1,141 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Tuple
+
+from .client import IBKRHttpClient
+
+
+def _switch_accepted(response) -> bool:
+    """IBKR answers a switch with {"set": true, ...}, rejections come back as an error body."""
+    if not isinstance(response, dict):
+        return False
+    return response.get("set") is True or "already set" in str(response.get("success", "")).lower()
+
+
+class AccountScheduler:
+    """
+    Serializes account-scoped /iserver calls (#get_orders, #get_trades, ...) through one worker thread.
+    The brokerage session has a single selected account, so pending calls are grouped by account
+    and #switch_account is only called when the worker moves on to another account.
+
+    Calls for the currently selected account run first, then the account with the oldest pending call.
+    `max_batch` bounds how many calls run for one account before other accounts get their turn.
+    """
+
+    def __init__(
+        self,
+        client: IBKRHttpClient,
+        current_account: str = None,
+        max_batch: int = 50,
+        logger: logging.Logger = None,
+    ):
+        self.__client = client
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__current_account = current_account
+        self.__max_batch = max_batch
+        self.__pending: "OrderedDict[str, Deque[Tuple[Future, Callable, tuple, dict]]]" = OrderedDict()
+        self.__condition = threading.Condition()
+        self.__stopped = False
+        self.__yield_turn = False
+        self.__switches = 0
+        self.__calls = 0
+        self.__batches = 0
+        self.__worker = threading.Thread(target=self.__run, name="ibkr-account-scheduler", daemon=True)
+        self.__worker.start()
+
+    @property
+    def current_account(self) -> str:
+        return self.__current_account
+
+    @property
+    def stats(self) -> dict:
+        with self.__condition:
+            return {
+                "switches": self.__switches,
+                "calls": self.__calls,
+                "batches": self.__batches,
+                "pending": sum(len(queue) for queue in self.__pending.values()),
+            }
+
+    def submit(self, account_id: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Schedules fn(*args, **kwargs) to run while account_id is the selected account."""
+        future = Future()
+        with self.__condition:
+            if self.__stopped:
+                raise RuntimeError("Scheduler is stopped")
+            self.__pending.setdefault(account_id, deque()).append((future, fn, args, kwargs))
+            self.__condition.notify()
+        return future
+
+    def get_orders(self, account_id: str, filters: str = None, force: bool = None) -> Future:
+        return self.submit(account_id, self.__client.get_orders, filters=filters, force=force)
+
+    def get_trades(self, account_id: str, days: int = 7, force: bool = None) -> Future:
+        return self.submit(account_id, self.__client.get_trades, days=days, force=force)
+
+    def stop(self, wait: bool = True):
+        """Stops the worker after the already pending calls are done."""
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify()
+        if wait:
+            self.__worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __next_batch(self):
+        with self.__condition:
+            while not self.__pending and not self.__stopped:
+                self.__condition.wait()
+            if not self.__pending:
+                return None, []
+            if self.__current_account in self.__pending and not self.__yield_turn:
+                account_id = self.__current_account
+            else:
+                account_id = next(iter(self.__pending))
+            queue = self.__pending[account_id]
+            batch = [queue.popleft() for _ in range(min(self.__max_batch, len(queue)))]
+            # a capped batch lets the accounts waiting behind it go first
+            self.__yield_turn = bool(queue)
+            if queue:
+                self.__pending.move_to_end(account_id)
+            else:
+                del self.__pending[account_id]
+            return account_id, batch
+
+    def __run(self):
+        while True:
+            account_id, batch = self.__next_batch()
+            if account_id is None:
+                return
+
+            if account_id != self.__current_account:
+                try:
+                    response = self.__client.switch_account(account_id)
+                    if not _switch_accepted(response):
+                        raise RuntimeError(f"Switching to account {account_id} was rejected: {response}")
+                except Exception as e:
+                    self.__logger.error(f"Switching to account {account_id} failed: {e}")
+                    for future, _, _, _ in batch:
+                        future.set_exception(e)
+                    continue
+                with self.__condition:
+                    self.__current_account = account_id
+                    self.__switches += 1
+
+            for future, fn, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+            with self.__condition:
+                self.__calls += len(batch)
+                self.__batches += 1
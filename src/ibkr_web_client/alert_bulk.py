@@ -0,0 +1,226 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from .client import IBKRHttpClient
+from .ibkr_types import Alert
+
+
+CREATE = "create"
+MODIFY = "modify"
+ACTIVATE = "activate"
+DEACTIVATE = "deactivate"
+DELETE = "delete"
+DETAILS = "details"
+
+KEY_BY_NAME = "name"
+KEY_BY_CONIDEX = "conidex"
+
+
+@dataclass
+class AlertOperationResult:
+    operation: str
+    key: str
+    alert_id: Optional[int] = None
+    success: bool = False
+    response: Any = None
+    error: Optional[Exception] = None
+
+
+@dataclass
+class AlertReconcileReport:
+    results: List[AlertOperationResult] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    # desired alerts left alone because the details of a matching server alert could not be fetched
+    skipped: List[str] = field(default_factory=list)
+
+    @property
+    def failed(self) -> List[AlertOperationResult]:
+        return [result for result in self.results if not result.success]
+
+
+def _same_value(left, right) -> bool:
+    try:
+        return float(left) == float(right)
+    except (TypeError, ValueError):
+        return str(left) == str(right)
+
+
+def _alert_key(alert: Alert, key: str) -> str:
+    if key == KEY_BY_NAME:
+        return alert.alert_name
+    return "|".join(sorted(condition.conidex for condition in alert.conditions))
+
+
+def _details_key(details: dict, key: str) -> str:
+    if key == KEY_BY_NAME:
+        return details.get("alert_name") or details.get("alertName")
+    return "|".join(sorted(condition.get("conidex", "") for condition in details.get("conditions") or []))
+
+
+def _alert_differs(alert: Alert, details: dict) -> bool:
+    if alert.alert_name != _details_key(details, KEY_BY_NAME):
+        return True
+    if alert.alert_message != details.get("alert_message"):
+        return True
+    if not _same_value(alert.alert_repeatable, details.get("alert_repeatable")):
+        return True
+    if alert.tif != details.get("tif"):
+        return True
+    remote_conditions = details.get("conditions") or []
+    if len(alert.conditions) != len(remote_conditions):
+        return True
+    for condition, remote in zip(alert.conditions, remote_conditions):
+        if (
+            condition.conidex != remote.get("conidex")
+            or condition.operator != remote.get("condition_operator")
+            or condition.logic_bind != remote.get("condition_logic_bind")
+            or not _same_value(condition.type, remote.get("condition_type"))
+            or not _same_value(condition.value, remote.get("condition_value"))
+        ):
+            return True
+    return False
+
+
+class AlertManager:
+    """
+    Bulk operations on the alerts of one account.
+    Every call is dispatched concurrently (the client keeps them within the pacing limits)
+    and every item gets its own AlertOperationResult, one failure never aborts the batch.
+    """
+
+    def __init__(self, client: IBKRHttpClient, account_id: str, max_workers: int = 8, logger: logging.Logger = None):
+        self.__client = client
+        self.__account_id = account_id
+        self.__max_workers = max_workers
+        self.__logger = logger or logging.getLogger(__name__)
+
+    def fetch_details(self, alert_ids: Iterable[int] = None) -> Dict[int, AlertOperationResult]:
+        """
+        Fetches #get_alert_details for every alert id concurrently, by default for all alerts of the account.
+        """
+        if alert_ids is None:
+            alert_ids = [alert_obj["order_id"] for alert_obj in self.__client.get_alert_list(self.__account_id) or []]
+        jobs = [
+            (DETAILS, str(alert_id), alert_id, self.__client.get_alert_details, (alert_id,)) for alert_id in alert_ids
+        ]
+        return {result.alert_id: result for result in self.__dispatch(jobs)}
+
+    def create_many(self, alerts: Iterable[Alert]) -> List[AlertOperationResult]:
+        jobs = [
+            (CREATE, alert.alert_name, None, self.__client.create_alert, (self.__account_id, alert)) for alert in alerts
+        ]
+        return self.__dispatch(jobs)
+
+    def delete_many(self, alert_ids: Iterable[int]) -> List[AlertOperationResult]:
+        jobs = [
+            (DELETE, str(alert_id), alert_id, self.__client.delete_alert, (self.__account_id, alert_id))
+            for alert_id in alert_ids
+        ]
+        return self.__dispatch(jobs)
+
+    def set_activation_many(self, alert_ids: Iterable[int], active: bool) -> List[AlertOperationResult]:
+        operation = ACTIVATE if active else DEACTIVATE
+        set_activation = self.__client.set_alert_activation
+        jobs = [
+            (operation, str(alert_id), alert_id, set_activation, (self.__account_id, alert_id, active))
+            for alert_id in alert_ids
+        ]
+        return self.__dispatch(jobs)
+
+    def reconcile(
+        self,
+        desired: Iterable[Alert],
+        key: str = KEY_BY_NAME,
+        delete_missing: bool = False,
+        active: Optional[bool] = True,
+    ) -> AlertReconcileReport:
+        """
+        Matches desired alerts with the server state by name or by the conidex of their conditions.
+        Missing alerts are created, differing ones modified, and with delete_missing the server alerts
+        without a desired counterpart are deleted. Unless active is None, activation is brought in line as well.
+        A desired alert that may match a server alert whose details failed is skipped rather than created twice.
+        With the conidex key every failed details fetch leaves the conditions of that alert unknown,
+        so no alert is created in that case.
+        """
+        if key not in (KEY_BY_NAME, KEY_BY_CONIDEX):
+            raise ValueError(f"Unknown alert key {key}")
+
+        report = AlertReconcileReport()
+        alert_list = self.__client.get_alert_list(self.__account_id) or []
+        listed = {alert_obj["order_id"]: alert_obj for alert_obj in alert_list}
+        details = self.fetch_details(listed)
+        remote: Dict[str, dict] = {}
+        unknown_keys = set()
+        for alert_id, result in details.items():
+            if result.success:
+                remote[_details_key(result.response, key)] = result.response
+            else:
+                report.results.append(result)
+                # the alert list already carries the name, the conditions are only in the details
+                unknown_keys.add(_details_key(listed.get(alert_id) or {}, KEY_BY_NAME))
+        state_unknown = bool(unknown_keys) and key == KEY_BY_CONIDEX
+
+        jobs = []
+        desired_keys = set()
+        for alert in desired:
+            alert_key = _alert_key(alert, key)
+            desired_keys.add(alert_key)
+            job_count = len(jobs)
+            current = remote.get(alert_key)
+            if current is None and (state_unknown or alert_key in unknown_keys):
+                self.__logger.warning(f"Skipping alert {alert_key}, the server state of a matching alert is unknown")
+                report.skipped.append(alert_key)
+                continue
+            if current is None:
+                jobs.append((CREATE, alert_key, None, self.__client.create_alert, (self.__account_id, alert)))
+                continue
+            alert_id = current["order_id"]
+            if _alert_differs(alert, current):
+                args = (self.__account_id, alert_id, alert)
+                jobs.append((MODIFY, alert_key, alert_id, self.__client.modify_alert, args))
+            if active is not None and not _same_value(current.get("alert_active"), int(active)):
+                operation = ACTIVATE if active else DEACTIVATE
+                args = (self.__account_id, alert_id, active)
+                jobs.append((operation, alert_key, alert_id, self.__client.set_alert_activation, args))
+            if len(jobs) == job_count:
+                report.unchanged.append(alert_key)
+
+        if delete_missing:
+            for alert_key, current in remote.items():
+                if alert_key not in desired_keys:
+                    alert_id = current["order_id"]
+                    args = (self.__account_id, alert_id)
+                    jobs.append((DELETE, alert_key, alert_id, self.__client.delete_alert, args))
+
+        report.results.extend(self.__dispatch(jobs))
+        return report
+
+    def __dispatch(self, jobs: List[tuple]) -> List[AlertOperationResult]:
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="ibkr-alerts") as executor:
+            futures = [(job, executor.submit(job[3], *job[4])) for job in jobs]
+            return [self.__to_result(job, future) for job, future in futures]
+
+    def __to_result(self, job: tuple, future) -> AlertOperationResult:
+        operation, key, alert_id, _, _ = job
+        result = AlertOperationResult(operation, key, alert_id)
+        try:
+            result.response = future.result()
+        except Exception as e:
+            self.__logger.error(f"Alert {operation} failed for {key}: {e}")
+            result.error = e
+            return result
+        if isinstance(result.response, dict):
+            if result.alert_id is None:
+                result.alert_id = result.response.get("order_id")
+            if operation == DETAILS:
+                result.success = "order_id" in result.response
+            else:
+                # write endpoints report rejected requests in the body
+                result.success = result.response.get("success") is True
+        if not result.success:
+            self.__logger.error(f"Alert {operation} was not accepted for {key}: {result.response}")
+        return result
@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable, List
+
+import numpy as np
+
+from .ibkr_types import Alert, LogicBind, MarketDataField, Operator
+from .ibkr_types.alert import ConditionType
+from .utils_tables import parse_price
+
+
+SUPPORTED_CONDITION_TYPES = (ConditionType.PRICE.value, ConditionType.MARGIN.value)
+LAST_PRICE_FIELD = str(MarketDataField.LAST_PRICE.value)
+
+
+@dataclass
+class AlertTrigger:
+    key: Hashable
+    alert: Alert
+    triggered_at: float
+
+
+class AlertEvaluator:
+    """
+    Evaluates price and margin alert rules locally, without a server-side alert per rule.
+    Rules are compiled into arrays with one column per position in the condition chain, every batch
+    of snapshot data is evaluated in one vectorized pass over all rules.
+    Chains bind left to right like the server does: ((c0 op0 c1) op1 c2) ...
+    Triggers are edge based, a rule fires when its chain becomes true,
+    repeatable rules fire again after the chain turned false, the others only once.
+    """
+
+    def __init__(self, logger: logging.Logger = None):
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__rules: "OrderedDict[Hashable, Alert]" = OrderedDict()
+        self.__callbacks: List[Callable[[AlertTrigger], None]] = []
+        # rule key -> (was true on the last evaluation, fired and not repeatable), only while not compiled
+        self.__state: Dict[Hashable, tuple] = {}
+        # last known prices of all conids, also of the ones no rule depends on yet
+        self.__prices: Dict[int, float] = {}
+        self.__margin_cushion = np.nan
+        self.__compiled = None
+
+    def add(self, alert: Alert, key: Hashable = None) -> Hashable:
+        """Adds or replaces a rule, key defaults to the alert name."""
+        key = alert.alert_name if key is None else key
+        conditions = alert.conditions
+        if not conditions:
+            raise ValueError(f"Alert {key} has no conditions")
+        for condition in conditions:
+            if condition.type not in SUPPORTED_CONDITION_TYPES:
+                raise ValueError(f"Condition type {condition.type} of alert {key} can not be evaluated locally")
+            if np.isnan(parse_price(condition.value)):
+                raise ValueError(f"Condition value {condition.value} of alert {key} is not a number")
+        with self.__lock:
+            self.__invalidate()
+            self.__rules[key] = alert
+            self.__state.pop(key, None)
+        return key
+
+    def remove(self, key: Hashable):
+        with self.__lock:
+            self.__invalidate()
+            self.__rules.pop(key, None)
+            self.__state.pop(key, None)
+
+    def on_trigger(self, callback: Callable[[AlertTrigger], None]):
+        self.__callbacks.append(callback)
+
+    @property
+    def conids(self) -> List[int]:
+        """Contracts the price rules depend on, the ones to request snapshots for."""
+        with self.__lock:
+            compiled = self.__compile()
+        return compiled["conids"].tolist()
+
+    def __len__(self) -> int:
+        return len(self.__rules)
+
+    def evaluate(self, snapshot_lst: Iterable[dict] = (), margin_cushion: float = None) -> List[AlertTrigger]:
+        """
+        Feeds a batch of #get_live_market_data_snapshot rows (field 31 is used) and optionally the current
+        margin cushion, evaluates all rules and returns the triggers after running the callbacks.
+        Values not in the batch keep their last known value, conditions on unknown values are false.
+        """
+        prices = []
+        for snapshot in snapshot_lst:
+            try:
+                conid = int(snapshot.get("conid"))
+            except (TypeError, ValueError):
+                continue
+            price = parse_price(snapshot.get(LAST_PRICE_FIELD))
+            if not np.isnan(price):
+                prices.append((conid, price))
+
+        now = time.time()
+        with self.__lock:
+            compiled = self.__compile()
+            values = compiled["values"]
+            for conid, price in prices:
+                self.__prices[conid] = price
+                index = compiled["conid_indexes"].get(conid)
+                if index is not None:
+                    values[index] = price
+            if margin_cushion is not None:
+                # the last slot holds the margin cushion, padding positions point at it too but are masked out
+                values[-1] = self.__margin_cushion = float(margin_cushion)
+            if not len(compiled["keys"]):
+                return []
+
+            result = None
+            for position in range(compiled["thresholds"].shape[1]):
+                current = values[compiled["indexes"][:, position]]
+                thresholds = compiled["thresholds"][:, position]
+                with np.errstate(invalid="ignore"):
+                    matched = np.where(compiled["greater"][:, position], current >= thresholds, current <= thresholds)
+                if result is None:
+                    result = matched
+                    continue
+                valid = compiled["valid"][:, position]
+                combined = np.where(compiled["and_bind"][:, position - 1], result & matched, result | matched)
+                result = np.where(valid, combined, result)
+
+            fired = result & ~compiled["last"] & ~compiled["done"]
+            compiled["done"] |= fired & ~compiled["repeatable"]
+            compiled["last"] = result
+            keys = compiled["keys"]
+            triggers = [AlertTrigger(keys[i], self.__rules[keys[i]], now) for i in np.flatnonzero(fired).tolist()]
+
+        for trigger in triggers:
+            for callback in self.__callbacks:
+                try:
+                    callback(trigger)
+                except Exception as e:
+                    self.__logger.error(f"Alert callback failed for {trigger.key}: {e}")
+        return triggers
+
+    def __compile(self) -> dict:
+        """Builds the rule arrays, keeping the trigger state of rules that were compiled before."""
+        if self.__compiled is not None:
+            return self.__compiled
+        previous = self.__state
+        keys = list(self.__rules)
+        width = max((len(alert.conditions) for alert in self.__rules.values()), default=0)
+        conids = sorted(
+            {
+                int(condition.conidex.split("@", 1)[0])
+                for alert in self.__rules.values()
+                for condition in alert.conditions
+                if condition.type == ConditionType.PRICE.value
+            }
+        )
+        conid_indexes = {conid: index for index, conid in enumerate(conids)}
+        margin_index = len(conids)
+
+        shape = (len(keys), width)
+        indexes = np.full(shape, margin_index, dtype=np.int64)
+        thresholds = np.full(shape, np.nan)
+        greater = np.zeros(shape, dtype=bool)
+        and_bind = np.zeros(shape, dtype=bool)
+        valid = np.zeros(shape, dtype=bool)
+        for row, key in enumerate(keys):
+            for position, condition in enumerate(self.__rules[key].conditions):
+                if condition.type == ConditionType.PRICE.value:
+                    indexes[row, position] = conid_indexes[int(condition.conidex.split("@", 1)[0])]
+                thresholds[row, position] = parse_price(condition.value)
+                greater[row, position] = condition.operator == Operator.GREATER_THAN.value
+                and_bind[row, position] = condition.logic_bind == LogicBind.AND.value
+                valid[row, position] = True
+
+        values = np.array([self.__prices.get(conid, np.nan) for conid in conids] + [self.__margin_cushion])
+
+        self.__state = {}
+        self.__compiled = {
+            "keys": keys,
+            "conids": np.array(conids, dtype=np.int64),
+            "conid_indexes": conid_indexes,
+            "values": values,
+            "indexes": indexes,
+            "thresholds": thresholds,
+            "greater": greater,
+            "and_bind": and_bind,
+            "valid": valid,
+            "repeatable": np.array([bool(self.__rules[key].alert_repeatable) for key in keys], dtype=bool),
+            "last": np.array([previous.get(key, (False, False))[0] for key in keys], dtype=bool),
+            "done": np.array([previous.get(key, (False, False))[1] for key in keys], dtype=bool),
+        }
+        return self.__compiled
+
+    def __invalidate(self):
+        """Keeps the trigger state of the compiled rules so that changing one rule does not re-fire the others."""
+        if self.__compiled is None:
+            return
+        compiled = self.__compiled
+        for key, last, done in zip(compiled["keys"], compiled["last"].tolist(), compiled["done"].tolist()):
+            self.__state[key] = (last, done)
+        self.__compiled = None
@@ -3,23 +3,29 @@ import datetime
 import random
 import base64
 import requests
+import threading
 from Crypto.Hash import SHA1, HMAC, SHA256
-from urllib.parse import quote_plus, quote
+from urllib.parse import quote_plus, quote, urlsplit
 
 from .utils_encryption import DiffieHellmanResolver, get_decrypted_text, get_sha256_hash, create_rsa_signer
 from .config import IBKRConfig
+from .transport import Transport
 
 
 class IBKRAuthenticator:
-    def __init__(self, config: IBKRConfig, logger: logging.Logger):
+    def __init__(self, config: IBKRConfig, logger: logging.Logger, transport: Transport = None):
         self.__config = config
         self.__logger = logger
+        self.__transport = transport
         self.__dh_resolver = DiffieHellmanResolver(self.__config.dh_param_path)
         self.__live_session_token = None
         self.__live_session_token_expiration = datetime.datetime.now().timestamp()
+        self.__lock = threading.Lock()
 
     def get_headers(self, method: str, url: str) -> dict:
-        self.__update_live_session_token()
+        # Only one thread refreshes the live session token, the others wait for it
+        with self.__lock:
+            self.__update_live_session_token()
         return self.__generate_standard_headers(method, url)
 
     def __update_live_session_token(self):
@@ -37,7 +43,7 @@ class IBKRAuthenticator:
             self.__logger.info("Fetching new live session token")
             self.__live_session_token, self.__live_session_token_expiration = self.__fetch_live_session_token()
             self.__logger.info(
-                f"New live session token expires at {datetime.datetime.fromtimestamp(self.__live_session_token_expiration/1000)}"
+                f"New live session token expires at {datetime.datetime.fromtimestamp(self.__live_session_token_expiration)}"
             )
 
     def __generate_standard_headers(self, method: str, url: str) -> dict:
@@ -79,7 +85,7 @@ class IBKRAuthenticator:
     # TODO: move to a proper place
     def set_default_headers(self, headers: dict):
         headers["User-Agent"] = f"python/{self.__config.python_version}"
-        headers["Host"] = "api.ibkr.com"
+        headers["Host"] = urlsplit(self.__config.base_url).netloc
         headers["Accept"] = "*/*"
         headers["Accept-Encoding"] = "gzip,deflate"
         headers["Connection"] = "keep-alive"
@@ -132,7 +138,10 @@ class IBKRAuthenticator:
         self.set_default_headers(headers)
 
         self.__logger.info(f"Calling url={url} to get live session token")
-        lst_response = requests.post(url=url, headers=headers)
+        if self.__transport is not None:
+            lst_response = self.__transport.request(method, url, headers)
+        else:
+            lst_response = requests.post(url=url, headers=headers)
         # Check if request returned 200, proceed to compute LST if true, exit if false.
         if not lst_response.ok:
             self.__logger.error("ERROR: Request to /live_session_token failed. Exiting...")
@@ -148,9 +157,10 @@ class IBKRAuthenticator:
         lst_expiration = response_data["live_session_token_expiration"]
         self.__logger.debug(f"Live session token will expire at {datetime.datetime.fromtimestamp(lst_expiration/1000)}")
 
+        # The expiration is sent in milliseconds, it is compared with timestamps in seconds
         return (
             self.__compute_live_session_token(dh_response, lst_signature, prepend),
-            lst_expiration,
+            lst_expiration / 1000,
         )
 
     def __compute_live_session_token(self, dh_response: str, lst_signature: str, prepend: str) -> str:
@@ -0,0 +1,213 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+
+# Slow-changing reference data. Anything not listed here (market data, orders, trades, ...) is never cached.
+# /portfolio/accounts and /portfolio/subaccounts are left out on purpose: IBKR requires a real call to one of
+# them before the other /portfolio endpoints, a cache hit in a new process or session would skip it.
+DEFAULT_CACHE_TTLS: Dict[str, float] = {
+    "/portfolio/*/meta": 5 * 60,
+    "/iserver/scanner/params": 15 * 60,
+    "/iserver/currency/pairs": 60 * 60,
+    "/iserver/watchlists": 60,
+}
+
+
+class CacheBackend:
+    """Storage for cached responses, values are raw response bodies."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, expires_at: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def keys(self) -> List[str]:
+        raise NotImplementedError
+
+    @property
+    def evictions(self) -> int:
+        return 0
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU storage bounded by number of entries."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.__entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self.__entries[key]
+                return None
+            self.__entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, expires_at: float):
+        with self.__lock:
+            self.__entries[key] = (expires_at, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def delete(self, key: str):
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def keys(self) -> List[str]:
+        with self.__lock:
+            return list(self.__entries)
+
+    @property
+    def evictions(self) -> int:
+        return self.__evictions
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    On-disk LRU storage, the file can be shared by several processes on the same host.
+    """
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__evictions = 0
+        self.__connection = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, accessed_at REAL NOT NULL, value BLOB NOT NULL)"
+        )
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_idx ON responses (accessed_at)")
+        self.__connection.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self.__connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.__connection.commit()
+            return bytes(row[0])
+
+    def set(self, key: str, value: bytes, expires_at: float):
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, expires_at, time.time(), value)
+            )
+            evicted = self.__connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self.__connection.commit()
+            self.__evictions += max(0, evicted)
+
+    def delete(self, key: str):
+        with self.__lock:
+            self.__connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.__connection.commit()
+
+    def keys(self) -> List[str]:
+        with self.__lock:
+            return [row[0] for row in self.__connection.execute("SELECT key FROM responses")]
+
+    @property
+    def evictions(self) -> int:
+        return self.__evictions
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+
+class ResponseCache:
+    """
+    Caches GET responses of endpoints that have a TTL policy.
+    Policies map endpoints, or shell-style patterns like "/portfolio/*/meta", to a TTL in seconds.
+    Keys are prefixed with the namespace, so clients of different credentials can share one backend
+    without reading each other's accounts.
+    """
+
+    def __init__(self, ttls: Dict[str, float] = None, backend: CacheBackend = None, namespace: str = ""):
+        self.ttls = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        self.backend = backend or MemoryCacheBackend()
+        self.namespace = namespace
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict = None, json_content: dict = None) -> str:
+        endpoint = "/" + endpoint.lstrip("/")
+        key = f"{endpoint}?{json.dumps(params or {}, sort_keys=True, default=str)}"
+        if json_content:
+            key += f"#{json.dumps(json_content, sort_keys=True, default=str)}"
+        return key
+
+    def ttl_for(self, endpoint: str) -> Optional[float]:
+        endpoint = "/" + endpoint.lstrip("/")
+        if endpoint in self.ttls:
+            return self.ttls[endpoint] or None
+        for pattern, ttl in self.ttls.items():
+            if fnmatchcase(endpoint, pattern):
+                return ttl or None
+        return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.backend.get(self.namespace + key)
+        with self.__lock:
+            if value is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.backend.set(self.namespace + key, value, time.time() + ttl)
+
+    def invalidate(self, pattern: str = "*") -> int:
+        """
+        Drops cached responses of endpoints matching the pattern in this namespace,
+        returns the number of dropped entries.
+        """
+        pattern = "/" + pattern.lstrip("/")
+        dropped = 0
+        for key in self.backend.keys():
+            if not key.startswith(self.namespace):
+                continue
+            if fnmatchcase(key[len(self.namespace) :].split("?", 1)[0], pattern):
+                self.backend.delete(key)
+                dropped += 1
+        return dropped
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            hits, misses = self.__hits, self.__misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": self.backend.evictions,
+            "entries": len(self.backend.keys()),
+        }
@@ -1,18 +1,27 @@
 import requests
-from requests.adapters import HTTPAdapter, Retry
 import logging
 import json
+import hashlib
+import time
 from typing import List
 
 from .config import IBKRConfig
 from .auth import IBKRAuthenticator
+from .pacing import Pacer
+from .singleflight import SingleFlight
+from .cache import ResponseCache, MemoryCacheBackend, SQLiteCacheBackend
+from .recording import CassettePlayer, CassetteRecorder
+from .transport import Transport, RequestsTransport
+from .keepalive import SessionRecovery, IDEMPOTENT_METHODS, is_session_error
+from .subscriptions import MarketDataSubscriptions
+from .market_data_cache import LastValueCache
 
 from .ibkr_types import SortingOrder, Period, Alert, Exchange, OrderRule, BaseCurrency, MarketDataField
 
 from time import sleep
 
 class IBKRHttpClient:
-    def __init__(self, config: IBKRConfig, logger: logging.Logger = None):
+    def __init__(self, config: IBKRConfig, logger: logging.Logger = None, transport: Transport = None):
         self.__config = config
         if logger is None:
             self.__logger = logging.getLogger(__name__)
@@ -26,18 +35,43 @@ class IBKRHttpClient:
             self.__logger.addHandler(file_handler)
         else:
             self.__logger = logger
-        self.__authenticator = IBKRAuthenticator(config, self.__logger)
+        self.__player = None
+        if config.replay_path is not None:
+            self.__player = CassettePlayer(config.replay_path, config.replay_speed, self.__logger)
+        self.__recorder = CassetteRecorder(config.record_path) if config.record_path else None
+
+        # requests.Session with retries unless another transport is given
+        self.transport = transport or RequestsTransport(
+            pool_connections=config.pool_connections, pool_maxsize=config.pool_maxsize, pool_block=config.pool_block
+        )
+        self.session = getattr(self.transport, "session", None)
+
+        # Replaying needs neither credentials nor a live session token
+        self.__authenticator = None
+        if self.__player is None:
+            # The live session token is fetched over the same pooled connections as the API calls
+            self.__authenticator = IBKRAuthenticator(config, self.__logger, self.transport)
 
         self.headers = {}
-        self.__authenticator.set_default_headers(self.headers)
-
-        # Create an internal Session instance
-        self.session = requests.Session()
-        self.session.headers = self.headers
-        # Attach a retry strategy for handling retries
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-        adapter = HTTPAdapter(max_retries=retries)
-        self.session.mount("https://", adapter)
+        if self.__authenticator is not None:
+            self.__authenticator.set_default_headers(self.headers)
+        if config.warmup_connections and self.__player is None:
+            opened = self.transport.warmup(config.base_url, config.warmup_connections)
+            self.__logger.info(f"Opened {opened} keep-alive connections to {config.base_url}")
+        # Shared by all threads using this client, so concurrent callers stay within the pacing limits together
+        self.pacer = Pacer() if config.enforce_pacing and self.__player is None else None
+        self.singleflight = SingleFlight(config.coalesce_endpoints, config.coalesce_excluded_endpoints)
+        self.response_cache = self.__create_response_cache(config)
+        self.market_data_subscriptions = MarketDataSubscriptions(
+            self.__unsubscribe_market_data,
+            self.__unsubscribe_all_market_data,
+            config.market_data_line_budget,
+            logger=self.__logger,
+        )
+        self.market_data_cache = LastValueCache(logger=self.__logger)
+        self.session_recovery = None
+        if config.recover_session and self.__player is None:
+            self.session_recovery = SessionRecovery(self.__reinitialize_session, self.__logger)
 
         # Initialize brokerage session to get access to trading and market data (/iserver/* endpoints)
         self.init_brokerage_session()
@@ -54,6 +88,32 @@ class IBKRHttpClient:
 
         return self.__post(endpoint, json_content)
 
+    def tickle(self):
+        """
+        Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#tickle
+        NOTE: Keeps the session alive, should be called about every minute. See #SessionKeepalive
+        """
+        endpoint = "/tickle"
+
+        return self.__post(endpoint)
+
+    def websocket_url(self) -> str:
+        """
+        Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#websockets
+        NOTE: The connection must send the cookie "api=<session>" with the session returned by #tickle.
+        """
+        scheme, address = self.__config.base_url.split("://", 1)
+        return f"{'wss' if scheme == 'https' else 'ws'}://{address}/ws?oauth_token={self.__config.token_access}"
+
+    def recover_session(self) -> bool:
+        """
+        Re-initializes the brokerage session, e.g. after a timeout or a competing login.
+        Concurrent callers share one recovery. Returns whether the session was re-initialized.
+        """
+        if self.session_recovery is None:
+            return False
+        return self.session_recovery.recover(self.session_recovery.generation)
+
     def logout(self):
         """
         Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#logout
@@ -160,7 +220,10 @@ class IBKRHttpClient:
         """
         endpoint = f"/portfolio/{account_id}/positions/invalidate"
 
-        return self.__post(endpoint)
+        response = self.__post(endpoint)
+        self.invalidate_response_cache(f"/portfolio/{account_id}/*")
+        self.invalidate_response_cache(f"/portfolio2/{account_id}/*")
+        return response
 
     def get_portfolio_summary(self, account_id: str):
         """
@@ -220,8 +283,8 @@ class IBKRHttpClient:
         Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#create-alert
         """
         endpoint = f"/iserver/account/{account_id}/alert"
-        json_content = alert.__dict__
-        json_content["order_id"] = alert_id
+        # build a new payload instead of mutating the alert's serialized form
+        json_content = {**alert.__dict__, "order_id": alert_id}
 
         return self.__post(endpoint, json_content=json_content)
 
@@ -279,7 +342,9 @@ class IBKRHttpClient:
             "rows": [{"C": contract_id} for contract_id in contract_id_lst],
         }
 
-        return self.__post(endpoint, json_content=json_content)
+        response = self.__post(endpoint, json_content=json_content)
+        self.invalidate_response_cache("/iserver/watchlist*")
+        return response
 
     def get_all_watchlists(self):
         """
@@ -306,7 +371,9 @@ class IBKRHttpClient:
         endpoint = f"/iserver/watchlist"
         params = {"id": watchlist_id}
 
-        return self.__delete(endpoint, params=params)
+        response = self.__delete(endpoint, params=params)
+        self.invalidate_response_cache("/iserver/watchlist*")
+        return response
 
     def get_iserver_scanner_params(self):
         """
@@ -405,14 +472,47 @@ class IBKRHttpClient:
 
         return self.__get(endpoint, params=params)
     
-    def get_live_market_data_snapshot(self, contract_id_lst: List[int], field_lst: List[MarketDataField]):
+    def get_live_market_data_snapshot(
+        self, contract_id_lst: List[int], field_lst: List[MarketDataField], merged: bool = False
+    ):
         """
         Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#md-snapshot
+        NOTE: After the first call IBKR often returns only the fields that changed. Every response is merged into
+        #market_data_cache, with merged=True the merged rows with the latest value of each requested field are returned.
         """
         endpoint = "/iserver/marketdata/snapshot"
         params = {"conids": ",".join(map(str, contract_id_lst)), "fields": ",".join(map(lambda x: str(x.value), field_lst))}
+        # Every conid becomes a market data subscription, free lines first if the budget requires it
+        self.market_data_subscriptions.acquire(contract_id_lst, [str(field.value) for field in field_lst])
+
+        try:
+            response = self.__get(endpoint, params=params)
+        except Exception:
+            # lines of a failed snapshot would otherwise count against the budget and evict live subscriptions
+            self.market_data_subscriptions.rollback(contract_id_lst)
+            raise
+        if not isinstance(response, list):
+            self.market_data_subscriptions.rollback(contract_id_lst)
+            return response
+        self.market_data_subscriptions.confirm(contract_id_lst)
+        self.market_data_cache.update(response)
+        if merged:
+            return self.market_data_cache.rows(contract_id_lst, field_lst)
+        return response
 
-        return self.__get(endpoint, params=params)
+    def unsubscribe_market_data(self, contract_id: int):
+        """
+        Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#unsubscribe-md
+        """
+        self.market_data_subscriptions.forget([contract_id])
+        return self.__unsubscribe_market_data(contract_id)
+
+    def unsubscribe_all_market_data(self):
+        """
+        Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#unsubscribe-all-md
+        """
+        self.market_data_subscriptions.forget()
+        return self.__unsubscribe_all_market_data()
     
     def get_historical_data(self, contract_id: str, bar_size: str = "1hrs", outsideRth: bool = True, period: str = "7d", barType: str = "Last"):
         """
@@ -495,51 +595,131 @@ class IBKRHttpClient:
         Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#switch-account
         for requests like #get_orders and #get_trades
         """
-        self._logger.debug(f"Switching account to {account_id}")
+        self.__logger.debug(f"Switching account to {account_id}")
         endpoint = f"/iserver/account"
         params = {"acctId": account_id}
         response = self.__post(endpoint, json_content=params)
-        self._logger.debug(f"Response: {response}")
+        self.__logger.debug(f"Response: {response}")
         return response
 
-    def __get(self, endpoint: str, json_content: dict = {}, params: dict = {}) -> dict:
-        method = "GET"
-        url = f"{self.__config.base_url}/{endpoint.lstrip('/')}"
+    def close(self):
+        """
+        Closes the transport and finishes the cassette when recording.
+        """
+        if self.__recorder is not None:
+            self.__recorder.close()
+        self.transport.close()
 
-        headers = self.__authenticator.get_headers(method, url)
-        self.session.headers.update(headers)
+    def pool_stats(self) -> dict:
+        """
+        Connections created, reused and discarded by the transport, empty if it does not pool connections.
+        """
+        return self.transport.pool_stats() or {}
 
-        self.__logger.debug(f"{method} request to {url} with params: {params} and json_content: {json_content}")
-        response = self.session.get(url=url, json=json_content, params=params)
+    def invalidate_response_cache(self, endpoint_pattern: str = "*") -> int:
+        """
+        Drops locally cached responses of endpoints matching the shell-style pattern, e.g. "/portfolio/*".
+        """
+        if self.response_cache is None:
+            return 0
+        return self.response_cache.invalidate(endpoint_pattern)
 
-        self._log_response(response)
+    @staticmethod
+    def __create_response_cache(config: IBKRConfig):
+        if config.response_cache_ttls is not None and len(config.response_cache_ttls) == 0:
+            return None
+        if config.response_cache_path is not None:
+            backend = SQLiteCacheBackend(config.response_cache_path, config.response_cache_max_entries)
+        else:
+            backend = MemoryCacheBackend(config.response_cache_max_entries)
+        # a shared cache file must not serve the accounts of one set of credentials to another
+        credentials = f"{config.consumer_key}:{config.token_access}".encode("utf-8")
+        namespace = hashlib.sha256(credentials).hexdigest()[:16] + ":"
+        return ResponseCache(config.response_cache_ttls, backend, namespace)
+
+    def __get(self, endpoint: str, json_content: dict = {}, params: dict = {}) -> dict:
+        cache_ttl = self.response_cache.ttl_for(endpoint) if self.response_cache is not None else None
+        if cache_ttl:
+            cache_key = ResponseCache.make_key(endpoint, params, json_content)
+            content = self.response_cache.get(cache_key)
+            if content is not None:
+                self.__logger.debug(f"GET {endpoint} served from response cache")
+                return json.loads(content.decode("utf-8"))
+
+        if self.singleflight.enabled_for(endpoint):
+            # Identical concurrent reads share one HTTP response, every caller still decodes its own copy
+            key = SingleFlight.make_key("GET", endpoint, params, json_content)
+            response = self.singleflight.do(key, lambda: self.__send("GET", endpoint, json_content, params))
+        else:
+            response = self.__send("GET", endpoint, json_content, params)
+
+        if cache_ttl and response.ok:
+            self.response_cache.set(cache_key, response.content, cache_ttl)
         return json.loads(response.content.decode("utf-8"))
 
     def __post(self, endpoint: str, json_content: dict = {}, params: dict = {}) -> dict:
-        method = "POST"
-        url = f"{self.__config.base_url}/{endpoint.lstrip('/')}"
+        response = self.__send("POST", endpoint, json_content, params)
 
-        headers = self.__authenticator.get_headers(method, url)
-        self.session.headers.update(headers)
+        return json.loads(response.content.decode("utf-8"))
 
-        self.__logger.debug(f"{method} request to {url} with params: {params} and json_content: {json_content}")
-        response = self.session.post(url=url, json=json_content, params=params)
+    def __delete(self, endpoint: str, json_content: dict = {}, params: dict = {}):
+        response = self.__send("DELETE", endpoint, json_content, params)
 
-        self._log_response(response)
         return json.loads(response.content.decode("utf-8"))
 
-    def __delete(self, endpoint: str, json_content: dict = {}, params: dict = {}):
-        method = "DELETE"
+    def __send(self, method: str, endpoint: str, json_content: dict, params: dict) -> requests.Response:
         url = f"{self.__config.base_url}/{endpoint.lstrip('/')}"
 
-        headers = self.__authenticator.get_headers(method, url)
-        self.session.headers.update(headers)
+        if self.__player is not None:
+            self.__logger.debug(f"Replaying {method} request to {url} with params: {params}")
+            response, _ = self.__player.play(method, endpoint, params, json_content)
+            self._log_response(response)
+            return response
+
+        recovery = self.session_recovery
+        generation = recovery.generation if recovery is not None else None
+        response = self.__request(method, url, endpoint, json_content, params)
+        if recovery is None or recovery.recovering or not is_session_error(endpoint, response):
+            return response
+
+        recovery.count("session_errors")
+        if recovery.recover(generation) and method in IDEMPOTENT_METHODS:
+            self.__logger.info(f"Sending {method} {endpoint} again after the brokerage session was recovered")
+            recovery.count("replays")
+            response = self.__request(method, url, endpoint, json_content, params)
+        return response
+
+    def __unsubscribe_market_data(self, contract_id: int):
+        endpoint = "/iserver/marketdata/unsubscribe"
+        json_content = {"conid": int(contract_id)}
+
+        return self.__post(endpoint, json_content)
+
+    def __unsubscribe_all_market_data(self):
+        endpoint = "/iserver/marketdata/unsubscribeall"
+
+        return self.__get(endpoint)
+
+    def __reinitialize_session(self):
+        status = self.init_brokerage_session()
+        if not isinstance(status, dict) or not status.get("authenticated"):
+            raise RuntimeError(f"Brokerage session was not re-initialized: {status}")
+        self.get_brokerage_accounts()
+
+    def __request(self, method: str, url: str, endpoint: str, json_content: dict, params: dict) -> requests.Response:
+        if self.pacer is not None:
+            self.pacer.acquire(endpoint)
+        # Signed headers are passed per request, the transport is shared between threads
+        headers = {**self.headers, **self.__authenticator.get_headers(method, url)}
 
         self.__logger.debug(f"{method} request to {url} with params: {params} and json_content: {json_content}")
-        response = self.session.delete(url=url, json=json_content, params=params)
+        started = time.perf_counter()
+        response = self.transport.request(method, url, headers, params, json_content)
+        if self.__recorder is not None:
+            self.__recorder.record(method, endpoint, params, json_content, response, time.perf_counter() - started)
 
         self._log_response(response)
-        return json.loads(response.content.decode("utf-8"))
+        return response
 
     def _log_response(self, response: requests.Response):
         if response.ok:
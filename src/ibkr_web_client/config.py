@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 import sys
 
 from .ibkr_types.enums import IBKRRealms
@@ -14,8 +15,35 @@ class IBKRConfig:
     dh_private_encryption_path: Path
     dh_private_signature_path: Path
     update_session_interval: int = 60 * 5  # 5 minutes
+    api_url: str = "https://api.ibkr.com/v1/api"  # e.g. the url of a local IBKRSimulator
+    enforce_pacing: bool = True  # wait for IBKR pacing limits instead of running into 429 responses
+    # GET endpoints (shell-style patterns) for which identical in-flight requests are coalesced
+    coalesce_endpoints: Tuple[str, ...] = ("*",)
+    coalesce_excluded_endpoints: Tuple[str, ...] = ()
+    # TTL in seconds per GET endpoint pattern, None uses cache.DEFAULT_CACHE_TTLS and an empty dict disables caching
+    response_cache_ttls: Optional[Dict[str, float]] = None
+    response_cache_max_entries: int = 1024
+    # SQLite file shared between processes, in-memory if not set. Entries are namespaced by the credentials
+    response_cache_path: Optional[Path] = None
+    # Connection pool of the default transport, pool_maxsize should cover the number of concurrent requests
+    pool_connections: int = 10  # hosts pooled
+    pool_maxsize: int = 10  # connections kept open per host
+    pool_block: bool = False  # wait for a free connection instead of opening one that is discarded afterwards
+    warmup_connections: int = 0  # keep-alive connections opened at startup, the first calls skip the TLS handshake
+    # Market data lines snapshots may hold, 100 for accounts without quote boosters. None only tracks subscriptions
+    market_data_line_budget: Optional[int] = None
+    recover_session: bool = True  # re-initialize a lost brokerage session and replay the failed GET once
+    record_path: Optional[Path] = None  # cassette file all request/response pairs are recorded to
+    replay_path: Optional[Path] = None  # cassette file responses are replayed from, no network or credentials needed
+    replay_speed: float = 0.0  # 1 replays at the recorded timing, 2 twice as fast, 0 without delay
 
     def __post_init__(self):
+        if self.record_path is not None and self.replay_path is not None:
+            raise ValueError("Recording and replaying at the same time is not supported")
+        if self.replay_path is not None:
+            if not Path(self.replay_path).exists():
+                raise ValueError("Replay path must point to existing cassette file")
+            return
         # Validation of the configs
         if self.token_access is None or len(self.token_access) == 0:
             raise ValueError("Token access is required")
@@ -40,4 +68,4 @@ class IBKRConfig:
 
     @property
     def base_url(self) -> str:
-        return "https://api.ibkr.com/v1/api"
+        return self.api_url.rstrip("/")
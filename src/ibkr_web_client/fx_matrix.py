@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+from .client import IBKRHttpClient
+from .ibkr_types import BaseCurrency
+
+
+DEFAULT_FX_TTL = 60.0
+
+Currency = Union[BaseCurrency, str]
+
+
+def _currency_code(currency: Currency) -> str:
+    return currency.value if isinstance(currency, BaseCurrency) else str(currency)
+
+
+def _base_currency(currency: Currency) -> BaseCurrency:
+    try:
+        return BaseCurrency(_currency_code(currency))
+    except ValueError:
+        code = _currency_code(currency)
+        raise ValueError(f"Currency {code} is not supported by the exchange rate endpoint") from None
+
+
+class FxMatrix:
+    """
+    Dense cross-rate matrix for a set of currencies, indexed in the order of `currencies`.
+    Only N-1 rates against the anchor currency are fetched, concurrently, all cross rates are derived locally:
+    matrix[i, j] is the amount of currency j one unit of currency i is worth.
+    The rates are refreshed on access once they are older than ttl seconds.
+    """
+
+    def __init__(
+        self,
+        client: IBKRHttpClient,
+        currencies: Sequence[BaseCurrency] = tuple(BaseCurrency),
+        anchor: BaseCurrency = BaseCurrency.USD,
+        ttl: float = DEFAULT_FX_TTL,
+        max_workers: int = 8,
+        logger: logging.Logger = None,
+    ):
+        # unsupported codes fail here instead of on every refresh
+        codes = [_base_currency(currency).value for currency in currencies]
+        if _base_currency(anchor).value not in codes:
+            codes.append(_base_currency(anchor).value)
+        self.currencies = codes
+        self.anchor = _currency_code(anchor)
+        self.ttl = ttl
+        self.fetched_at = None
+        self.errors: Dict[str, Exception] = {}
+        self.__client = client
+        self.__max_workers = max_workers
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__indexes = {code: index for index, code in enumerate(codes)}
+        # value of one unit of every currency in the anchor currency
+        self.__anchor_rates = np.full(len(codes), np.nan)
+        self.__anchor_rates[self.__indexes[self.anchor]] = 1.0
+        self.__matrix = None
+
+    def index(self, currency: Currency) -> int:
+        code = _currency_code(currency)
+        if code not in self.__indexes:
+            raise ValueError(f"Currency {code} is not part of the matrix")
+        return self.__indexes[code]
+
+    def is_stale(self) -> bool:
+        return self.fetched_at is None or time.time() - self.fetched_at > self.ttl
+
+    def refresh(self) -> np.ndarray:
+        """Fetches the anchor rates and rebuilds the matrix, a failed rate keeps its previous value."""
+        with self.__lock:
+            return self.__refresh()
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self.__matrix is None or self.is_stale():
+            with self.__lock:
+                # another thread may have refreshed while this one waited for the lock
+                if self.__matrix is None or self.is_stale():
+                    return self.__refresh()
+        return self.__matrix
+
+    def __refresh(self) -> np.ndarray:
+        to_fetch = [code for code in self.currencies if code != self.anchor]
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="ibkr-fx") as executor:
+            futures = {
+                code: executor.submit(
+                    self.__client.get_currency_exchange_rate, BaseCurrency(self.anchor), BaseCurrency(code)
+                )
+                for code in to_fetch
+            }
+            for code, future in futures.items():
+                try:
+                    rate = float(future.result()["rate"])
+                    if not rate > 0:
+                        raise ValueError(f"Invalid rate {rate}")
+                except Exception as e:
+                    self.__logger.error(f"Fetching {code}.{self.anchor} rate failed: {e}")
+                    errors[code] = e
+                    continue
+                self.__anchor_rates[self.__indexes[code]] = rate
+
+        self.errors = errors
+        self.fetched_at = time.time()
+        self.__matrix = self.__anchor_rates[:, np.newaxis] / self.__anchor_rates[np.newaxis, :]
+        return self.__matrix
+
+    def rate(self, source: Currency, target: Currency) -> float:
+        """Amount of target currency one unit of source currency is worth, nan if a rate is missing."""
+        return float(self.matrix[self.index(source), self.index(target)])
+
+    def convert(self, amounts, from_currencies, to_currency: Currency) -> np.ndarray:
+        """
+        Converts every amount from its currency to to_currency, e.g.
+        convert(ledger["cashbalance"], ledger["currency"], BaseCurrency.USD).
+        from_currencies is either one currency for all amounts or one per amount.
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        matrix = self.matrix
+        target = self.index(to_currency)
+        if isinstance(from_currencies, (BaseCurrency, str)):
+            return amounts * matrix[self.index(from_currencies), target]
+        codes = np.asarray(from_currencies)
+        if not codes.size:
+            return amounts * 1.0
+        if codes.dtype == object:
+            codes = np.array([_currency_code(currency) for currency in codes.tolist()], dtype=str)
+        # resolve every distinct currency once, then gather the rates for all amounts
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        rates = matrix[[self.index(code) for code in unique_codes.tolist()], target]
+        return amounts * rates[inverse]
@@ -5,19 +5,19 @@ class BaseCurrency(Enum):
     """
     Source: https://www.interactivebrokers.com/campus/glossary-terms/base-currency/
     """
-    AUD = "AUD",
-    CAD = "CAD",
-    CHF = "CHF",
-    CZK = "CZK",
-    DKK = "DKK",
-    EUR = "EUR",
-    GBP = "GBP",
-    HKD = "HKD",
-    HUF = "HUF",
-    JPY = "JPY",
-    MXN = "MXN",
-    NOK = "NOK",
-    NZD = "NZD",
-    SEK = "SEK",
-    SGD = "SGD",
+    AUD = "AUD"
+    CAD = "CAD"
+    CHF = "CHF"
+    CZK = "CZK"
+    DKK = "DKK"
+    EUR = "EUR"
+    GBP = "GBP"
+    HKD = "HKD"
+    HUF = "HUF"
+    JPY = "JPY"
+    MXN = "MXN"
+    NOK = "NOK"
+    NZD = "NZD"
+    SEK = "SEK"
+    SGD = "SGD"
     USD = "USD"
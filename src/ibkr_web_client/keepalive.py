@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import requests
+
+
+DEFAULT_TICKLE_INTERVAL = 60.0  # the brokerage session times out after about 5 idle minutes
+# Replayed after the session was recovered, requests that change state are not sent twice
+IDEMPOTENT_METHODS = ("GET",)
+_NOT_AUTHENTICATED_MARKERS = (b"not authenticated", b"no bridge")
+
+
+def is_session_error(endpoint: str, response: requests.Response) -> bool:
+    """True if an /iserver response failed because the brokerage session is gone."""
+    endpoint = endpoint.lstrip("/")
+    # failures of the session init itself are reported by the recovery, not recovered again
+    if response.ok or not endpoint.startswith("iserver/") or endpoint.startswith("iserver/auth/"):
+        return False
+    if response.status_code == 401:
+        return True
+    content = response.content[:512].lower()
+    return any(marker in content for marker in _NOT_AUTHENTICATED_MARKERS)
+
+
+@dataclass
+class SessionState:
+    """Brokerage session state as last reported by /tickle."""
+
+    authenticated: Optional[bool] = None
+    competing: Optional[bool] = None
+    connected: Optional[bool] = None
+    checked_at: Optional[float] = None
+
+    @classmethod
+    def from_tickle(cls, response: dict) -> "SessionState":
+        auth_status = ((response or {}).get("iserver") or {}).get("authStatus") or {}
+        return cls(
+            auth_status.get("authenticated"), auth_status.get("competing"), auth_status.get("connected"), time.time()
+        )
+
+
+class SessionRecovery:
+    """
+    Restarts the brokerage session once per interruption, however many threads run into it.
+    Every recovery starts a new generation, a thread whose request failed in an older generation
+    than the current one only needs to retry.
+    """
+
+    def __init__(self, reinitialize: Callable[[], None], logger: logging.Logger = None):
+        self.__reinitialize = reinitialize
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__generation = 0
+        self.__recovered = True
+        self.__stats: Counter = Counter()
+        self.__last_interruption: Optional[float] = None
+
+    @property
+    def generation(self) -> int:
+        return self.__generation
+
+    @property
+    def recovering(self) -> bool:
+        """True within the thread running the recovery, its own requests must not trigger another one."""
+        return getattr(self.__local, "recovering", False)
+
+    def count(self, name: str, value: int = 1):
+        with self.__lock:
+            self.__stats[name] += value
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self.__lock:
+            stats = dict(self.__stats)
+        for name in ("interruptions", "recoveries", "recovery_failures", "replays", "session_errors"):
+            stats.setdefault(name, 0)
+        stats["generation"] = self.__generation
+        stats["last_interruption"] = self.__last_interruption
+        return stats
+
+    def recover(self, failed_generation: int) -> bool:
+        """
+        Re-initializes the session unless that already happened since failed_generation,
+        in which case the outcome of that recovery is returned. Returns whether the session is expected to work again.
+        """
+        if self.recovering:
+            return False
+        with self.__lock:
+            if self.__generation != failed_generation:
+                return self.__recovered
+            self.__stats["interruptions"] += 1
+            self.__last_interruption = time.time()
+            self.__local.recovering = True
+            started = time.perf_counter()
+            try:
+                self.__logger.warning("Brokerage session was interrupted, re-initializing it")
+                self.__reinitialize()
+                self.__recovered = True
+            except Exception as e:
+                self.__recovered = False
+                self.__logger.error(f"Brokerage session recovery failed: {e}")
+            finally:
+                self.__local.recovering = False
+                self.__generation += 1
+            elapsed = time.perf_counter() - started
+            if self.__recovered:
+                self.__stats["recoveries"] += 1
+                self.__stats["recovery_seconds"] += elapsed
+                self.__logger.info(f"Brokerage session recovered in {elapsed:.3f}s")
+            else:
+                self.__stats["recovery_failures"] += 1
+            return self.__recovered
+
+
+class SessionKeepalive:
+    """
+    Calls /tickle on a fixed interval in a background thread so the brokerage session does not time out,
+    tracks the reported authenticated/competing state and recovers the session when it was lost.
+
+        with SessionKeepalive(client):
+            ...
+    """
+
+    def __init__(self, client, interval: float = DEFAULT_TICKLE_INTERVAL, logger: logging.Logger = None):
+        self.interval = interval
+        self.state = SessionState()
+        self.stats: Counter = Counter()
+        self.__client = client
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__stop_event = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    def tickle(self) -> SessionState:
+        """One keepalive cycle: tickle, update the state and recover the session if it is not authenticated."""
+        try:
+            state = SessionState.from_tickle(self.__client.tickle())
+        except Exception as e:
+            self.stats["tickle_failures"] += 1
+            self.__logger.error(f"Tickle failed: {e}")
+            return self.state
+        self.stats["tickles"] += 1
+        previous, self.state = self.state, state
+        if state.competing and not previous.competing:
+            self.stats["competing"] += 1
+            self.__logger.warning("Another session competes for the brokerage session")
+        if state.authenticated is False:
+            self.stats["unauthenticated"] += 1
+            if self.__client.recover_session():
+                self.state = SessionState(True, False, state.connected, time.time())
+        return self.state
+
+    def run(self, stop_event: threading.Event = None):
+        """Tickles until stop_event is set."""
+        stop_event = stop_event or self.__stop_event
+        while not stop_event.wait(self.interval):
+            self.tickle()
+
+    def start(self) -> "SessionKeepalive":
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__stop_event.clear()
+            self.__thread = threading.Thread(target=self.run, name="ibkr-keepalive", daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __enter__(self) -> "SessionKeepalive":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
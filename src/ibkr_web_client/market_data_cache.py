@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .ibkr_types import MarketDataField
+from .utils_tables import parse_price
+
+
+FieldKey = Union[MarketDataField, str, int]
+ChangeCallback = Callable[[int, Dict[str, str]], None]
+
+
+def _field_id(field_key: FieldKey) -> str:
+    return str(field_key.value) if isinstance(field_key, MarketDataField) else str(field_key)
+
+
+class LastValueCache:
+    """
+    Latest value of every market data field per conid, merged from snapshot rows that may only carry the fields
+    that changed since the previous snapshot.
+
+    Values are kept in arrays with one row per conid and one column per field: the raw strings, their numeric value
+    (nan if not numeric, "C"/"H" price prefixes stripped) and the time of the last update in seconds.
+    Queries over many conids are answered from these arrays without a network call.
+    Change callbacks get the conid and only the fields whose value changed.
+    """
+
+    def __init__(self, fields: Sequence[FieldKey] = (), capacity: int = 1024, logger: logging.Logger = None):
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__callbacks: List[ChangeCallback] = []
+        self.__rows: Dict[int, int] = {}
+        self.__columns: Dict[str, int] = {}
+        self.__capacity = max(1, capacity)
+        self.__values = np.full((self.__capacity, 0), None, dtype=object)
+        self.__numbers = np.full((self.__capacity, 0), np.nan)
+        self.__updated = np.full((self.__capacity, 0), np.nan)
+        self.__merged_rows = 0
+        self.__changed_fields = 0
+        for field_key in fields:
+            self.__column(_field_id(field_key))
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def __contains__(self, conid: int) -> bool:
+        return int(conid) in self.__rows
+
+    @property
+    def conids(self) -> List[int]:
+        return list(self.__rows)
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.__columns)
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "conids": len(self.__rows),
+                "fields": len(self.__columns),
+                "merged_rows": self.__merged_rows,
+                "changed_fields": self.__changed_fields,
+            }
+
+    def on_change(self, callback: ChangeCallback):
+        self.__callbacks.append(callback)
+
+    def remove_callback(self, callback: ChangeCallback):
+        self.__callbacks.remove(callback)
+
+    def update(self, rows: Iterable[dict], received_at: float = None) -> Dict[int, Dict[str, str]]:
+        """
+        Merges snapshot rows in place. Fields missing from a row keep their previous value.
+        Returns the changed fields per conid.
+        """
+        received_at = received_at or time.time()
+        changes: Dict[int, Dict[str, str]] = {}
+        with self.__lock:
+            for row in rows:
+                if not isinstance(row, dict) or row.get("conid") is None:
+                    continue
+                conid = int(row["conid"])
+                index = self.__row(conid)
+                updated = row["_updated"] / 1000 if isinstance(row.get("_updated"), (int, float)) else received_at
+                changed = {}
+                for key, value in row.items():
+                    if not key.isdigit():
+                        continue
+                    column = self.__column(key)
+                    if self.__values[index, column] != value:
+                        self.__values[index, column] = value
+                        self.__numbers[index, column] = parse_price(value)
+                        changed[key] = value
+                    self.__updated[index, column] = updated
+                self.__merged_rows += 1
+                if changed:
+                    self.__changed_fields += len(changed)
+                    changes[conid] = changed
+        for conid, changed in changes.items():
+            for callback in self.__callbacks:
+                try:
+                    callback(conid, changed)
+                except Exception as e:
+                    self.__logger.error(f"Market data change callback failed for {conid}: {e}")
+        return changes
+
+    def get(self, conids: Sequence[int], fields: Sequence[FieldKey]) -> np.ndarray:
+        """Numeric values as (conids x fields) matrix, nan where unknown or not numeric."""
+        return self.__lookup(self.__numbers, conids, fields, np.nan, float)
+
+    def get_values(self, conids: Sequence[int], fields: Sequence[FieldKey]) -> np.ndarray:
+        """Raw string values as (conids x fields) object matrix, None where unknown."""
+        return self.__lookup(self.__values, conids, fields, None, object)
+
+    def updated_at(self, conids: Sequence[int], fields: Sequence[FieldKey]) -> np.ndarray:
+        """Time of the last update in seconds as (conids x fields) matrix, nan where never updated."""
+        return self.__lookup(self.__updated, conids, fields, np.nan, float)
+
+    def row(self, conid: int, fields: Sequence[FieldKey] = None) -> Optional[dict]:
+        """The merged snapshot row of conid, only known fields, None for an unknown conid."""
+        if int(conid) not in self.__rows:
+            return None
+        return self.rows([conid], fields)[0]
+
+    def rows(self, conids: Sequence[int], fields: Sequence[FieldKey] = None) -> List[dict]:
+        """Merged snapshot rows in the shape of #IBKRHttpClient.get_live_market_data_snapshot, all fields if None."""
+        with self.__lock:
+            field_ids = list(self.__columns) if fields is None else [_field_id(f) for f in fields]
+        values = self.get_values(conids, field_ids)
+        result = []
+        for conid, row_values in zip(conids, values):
+            row = {"conid": int(conid)}
+            row.update((field_id, value) for field_id, value in zip(field_ids, row_values) if value is not None)
+            result.append(row)
+        return result
+
+    def __lookup(self, table: np.ndarray, conids: Sequence[int], fields: Sequence[FieldKey], fill, dtype):
+        with self.__lock:
+            row_index = np.array([self.__rows.get(int(conid), -1) for conid in conids], dtype=np.int64)
+            column_index = np.array([self.__columns.get(_field_id(f), -1) for f in fields], dtype=np.int64)
+            result = np.full((len(row_index), len(column_index)), fill, dtype=dtype)
+            known = (row_index >= 0)[:, None] & (column_index >= 0)[None, :]
+            if known.any():
+                # -1 indexes are masked out, clipped to stay inside the table
+                result[known] = table[np.ix_(row_index.clip(0), column_index.clip(0))][known]
+            return result
+
+    def __row(self, conid: int) -> int:
+        index = self.__rows.get(conid)
+        if index is None:
+            index = len(self.__rows)
+            if index == self.__capacity:
+                self.__grow_rows()
+            self.__rows[conid] = index
+        return index
+
+    def __column(self, field_id: str) -> int:
+        column = self.__columns.get(field_id)
+        if column is None:
+            column = len(self.__columns)
+            self.__columns[field_id] = column
+            rows = self.__capacity
+            self.__values = np.hstack([self.__values, np.full((rows, 1), None, dtype=object)])
+            self.__numbers = np.hstack([self.__numbers, np.full((rows, 1), np.nan)])
+            self.__updated = np.hstack([self.__updated, np.full((rows, 1), np.nan)])
+        return column
+
+    def __grow_rows(self):
+        rows, columns = self.__capacity, len(self.__columns)
+        self.__values = np.vstack([self.__values, np.full((rows, columns), None, dtype=object)])
+        self.__numbers = np.vstack([self.__numbers, np.full((rows, columns), np.nan)])
+        self.__updated = np.vstack([self.__updated, np.full((rows, columns), np.nan)])
+        self.__capacity *= 2
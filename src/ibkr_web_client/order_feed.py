@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .client import IBKRHttpClient
+
+
+class FeedItemKind(Enum):
+    ORDER = "order"
+    TRADE = "trade"
+
+
+class FeedAction(Enum):
+    INSERT = "insert"
+    UPDATE = "update"
+
+
+@dataclass
+class FeedEvent:
+    kind: FeedItemKind
+    action: FeedAction
+    key: str
+    data: dict
+    previous: Optional[dict] = None
+
+
+@dataclass
+class FeedCycleStats:
+    started_at: float
+    orders_latency: float = 0.0
+    trades_latency: float = 0.0
+    diff_latency: float = 0.0
+    orders_seen: int = 0
+    trades_seen: int = 0
+    inserts: int = 0
+    updates: int = 0
+
+    @property
+    def total_latency(self) -> float:
+        return self.orders_latency + self.trades_latency + self.diff_latency
+
+
+# Fields that define a meaningful order change; everything else (timestamps, display strings) is noise
+DEFAULT_ORDER_FIELDS = ("status", "filledQuantity", "remainingQuantity", "avgPrice", "price", "auxPrice", "orderType")
+DEFAULT_TRADE_FIELDS = ("size", "price", "commission", "net_amount")
+
+
+class OrderTradeFeed:
+    """
+    Change feed on top of #get_orders and #get_trades.
+    Keeps the last known state keyed by orderId / execution_id and emits only inserts and updates.
+
+    The first cycle runs the pre-flight requests required by both endpoints,
+    later cycles read the already refreshed server-side state with a single request each.
+    """
+
+    def __init__(
+        self,
+        client: IBKRHttpClient,
+        order_filters: str = None,
+        trade_days: int = 1,
+        order_fields: Sequence[str] = DEFAULT_ORDER_FIELDS,
+        trade_fields: Sequence[str] = DEFAULT_TRADE_FIELDS,
+        track_orders: bool = True,
+        track_trades: bool = True,
+        stats_history: int = 100,
+        logger: logging.Logger = None,
+    ):
+        self.__client = client
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__order_filters = order_filters
+        self.__trade_days = trade_days
+        self.__order_fields = tuple(order_fields)
+        self.__trade_fields = tuple(trade_fields)
+        self.__track_orders = track_orders
+        self.__track_trades = track_trades
+
+        self.__orders: Dict[str, Tuple[tuple, dict]] = {}
+        self.__trades: Dict[str, Tuple[tuple, dict]] = {}
+        self.__callbacks: List[Callable[[FeedEvent], None]] = []
+        self.__stats = deque(maxlen=stats_history)
+        self.__preflight_done = False
+        self.__lock = threading.Lock()
+
+    @property
+    def orders(self) -> Dict[str, dict]:
+        return {key: data for key, (_, data) in self.__orders.items()}
+
+    @property
+    def trades(self) -> Dict[str, dict]:
+        return {key: data for key, (_, data) in self.__trades.items()}
+
+    @property
+    def stats(self) -> List[FeedCycleStats]:
+        return list(self.__stats)
+
+    def add_callback(self, callback: Callable[[FeedEvent], None]):
+        self.__callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[FeedEvent], None]):
+        self.__callbacks.remove(callback)
+
+    def poll(self) -> List[FeedEvent]:
+        """
+        Runs one polling cycle and returns the events produced by it.
+        Callbacks are called for every event in the order they were produced.
+        """
+        with self.__lock:
+            stats = FeedCycleStats(started_at=time.time())
+            order_lst, trade_lst = [], []
+
+            if self.__track_orders:
+                start = time.perf_counter()
+                order_lst = self.__fetch_orders()
+                stats.orders_latency = time.perf_counter() - start
+            if self.__track_trades:
+                start = time.perf_counter()
+                trade_lst = self.__fetch_trades()
+                stats.trades_latency = time.perf_counter() - start
+            self.__preflight_done = True
+
+            start = time.perf_counter()
+            events = self.__diff(FeedItemKind.ORDER, order_lst, "orderId", self.__order_fields, self.__orders)
+            events += self.__diff(FeedItemKind.TRADE, trade_lst, "execution_id", self.__trade_fields, self.__trades)
+            stats.diff_latency = time.perf_counter() - start
+
+            stats.orders_seen = len(order_lst)
+            stats.trades_seen = len(trade_lst)
+            stats.inserts = sum(1 for event in events if event.action == FeedAction.INSERT)
+            stats.updates = len(events) - stats.inserts
+            self.__stats.append(stats)
+
+        self.__logger.debug(
+            f"Feed cycle: {stats.orders_seen} orders, {stats.trades_seen} trades, "
+            f"{stats.inserts} inserts, {stats.updates} updates in {stats.total_latency:.3f}s"
+        )
+        for event in events:
+            for callback in self.__callbacks:
+                try:
+                    callback(event)
+                except Exception as e:
+                    self.__logger.error(f"Feed callback failed for {event.kind.value} {event.key}: {e}")
+        return events
+
+    def run(self, interval: float = 5.0, stop_event: threading.Event = None):
+        """
+        Polls until stop_event is set, keeping a fixed interval between cycle starts.
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                self.__logger.error(f"Feed cycle failed: {e}")
+            stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    async def events(self, interval: float = 5.0):
+        """
+        Async iterator over feed events, the blocking HTTP calls run in a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            started = time.monotonic()
+            try:
+                events = await loop.run_in_executor(None, self.poll)
+            except Exception as e:
+                self.__logger.error(f"Feed cycle failed: {e}")
+                events = []
+            for event in events:
+                yield event
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def __fetch_orders(self) -> List[dict]:
+        # get_orders(force=None) runs the pre-flight request and waits, afterwards the cached view is up to date
+        force = None if not self.__preflight_done else False
+        response = self.__client.get_orders(filters=self.__order_filters, force=force)
+        if isinstance(response, dict):
+            return response.get("orders") or []
+        return []
+
+    def __fetch_trades(self) -> List[dict]:
+        force = None if not self.__preflight_done else False
+        response = self.__client.get_trades(days=self.__trade_days, force=force)
+        return response if isinstance(response, list) else []
+
+    @staticmethod
+    def __diff(
+        kind: FeedItemKind,
+        item_lst: List[dict],
+        key_name: str,
+        tracked_fields: Tuple[str, ...],
+        state: Dict[str, Tuple[tuple, dict]],
+    ) -> List[FeedEvent]:
+        events = []
+        for item in item_lst:
+            if key_name not in item:
+                continue
+            key = str(item[key_name])
+            fingerprint = tuple(item.get(field_name) for field_name in tracked_fields)
+            known = state.get(key)
+            if known is None:
+                events.append(FeedEvent(kind, FeedAction.INSERT, key, item))
+            elif known[0] != fingerprint:
+                events.append(FeedEvent(kind, FeedAction.UPDATE, key, item, previous=known[1]))
+            else:
+                continue
+            state[key] = (fingerprint, item)
+        return events
@@ -0,0 +1,111 @@
+import threading
+import time
+from fnmatch import fnmatchcase
+from typing import Dict, Optional, Tuple
+
+
+# Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#pacing-limits
+# Only windows of a few seconds are enforced by blocking, long windows (/pa/*, /iserver/scanner/params 1 req/15 mins)
+# would stall callers for minutes and are better served by caching the responses.
+GLOBAL_PACING_LIMIT = (50, 1.0)
+IBKR_PACING_LIMITS: Dict[str, Tuple[int, float]] = {
+    "/iserver/account/orders": (1, 5.0),
+    "/iserver/account/trades": (1, 5.0),
+    "/iserver/marketdata/snapshot": (10, 1.0),
+    "/iserver/scanner/run": (1, 1.0),
+    "/portfolio/accounts": (1, 5.0),
+    "/portfolio/subaccounts": (1, 5.0),
+    "/tickle": (1, 1.0),
+    "/fyi/*": (1, 1.0),
+}
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `max_calls` per `period` seconds.
+    Callers reserve a slot and sleep outside of the lock, so waiting threads are served in arrival order.
+    """
+
+    def __init__(self, max_calls: int, period: float):
+        if max_calls <= 0 or period <= 0:
+            raise ValueError("max_calls and period must be positive")
+        self.max_calls = max_calls
+        self.period = period
+        self.__rate = max_calls / period
+        self.__tokens = float(max_calls)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def __refill(self, now: float):
+        self.__tokens = min(float(self.max_calls), self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+
+    @property
+    def available(self) -> float:
+        """Number of calls that can be made right now without waiting."""
+        with self.__lock:
+            self.__refill(time.monotonic())
+            return max(0.0, self.__tokens)
+
+    def reserve(self) -> float:
+        """Reserves one call and returns how many seconds the caller has to wait before making it."""
+        with self.__lock:
+            self.__refill(time.monotonic())
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.__rate
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class Pacer:
+    """
+    Applies the global and the per-endpoint pacing limits before a request is sent.
+    Endpoint limits are matched with shell-style patterns, e.g. "/fyi/*".
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[int, float]] = None,
+        global_limit: Optional[Tuple[int, float]] = GLOBAL_PACING_LIMIT,
+    ):
+        limits = IBKR_PACING_LIMITS if limits is None else limits
+        self.__global = RateLimiter(*global_limit) if global_limit else None
+        self.__limiters = {pattern: RateLimiter(*limit) for pattern, limit in limits.items()}
+        self.__lock = threading.Lock()
+        self.__waits = 0
+        self.__wait_time = 0.0
+
+    def limiter_for(self, endpoint: str) -> Optional[RateLimiter]:
+        endpoint = "/" + endpoint.lstrip("/")
+        limiter = self.__limiters.get(endpoint)
+        if limiter is not None:
+            return limiter
+        for pattern, limiter in self.__limiters.items():
+            if fnmatchcase(endpoint, pattern):
+                return limiter
+        return None
+
+    def acquire(self, endpoint: str) -> float:
+        """Blocks until a request to the endpoint is allowed, returns the time spent waiting."""
+        waited = 0.0
+        limiter = self.limiter_for(endpoint)
+        if limiter is not None:
+            waited += limiter.acquire()
+        if self.__global is not None:
+            waited += self.__global.acquire()
+        if waited > 0:
+            with self.__lock:
+                self.__waits += 1
+                self.__wait_time += waited
+        return waited
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            return {"waits": self.__waits, "wait_time": self.__wait_time}
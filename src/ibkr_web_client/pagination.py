@@ -0,0 +1,115 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Tuple
+
+from .client import IBKRHttpClient
+
+
+# /portfolio/{accountId}/positions/{pageId} returns up to 100 positions per page
+POSITIONS_PAGE_SIZE = 100
+
+
+def iter_pages(
+    fetch_page: Callable[[int], Any],
+    extract_items: Callable[[Any], List[Any]],
+    is_last_page: Callable[[Any, List[Any]], bool] = None,
+    start_page: int = 0,
+    prefetch: int = 2,
+) -> Iterator[Tuple[int, List[Any]]]:
+    """
+    Walks pages starting from start_page and yields (page_number, items) tuples.
+    While the caller processes a page, up to `prefetch` following pages are already requested in the background.
+    Iteration stops on the first empty page or when is_last_page returns True, pages fetched speculatively
+    past the end are dropped.
+    """
+    if prefetch <= 0:
+        page_number = start_page
+        while True:
+            response = fetch_page(page_number)
+            items = extract_items(response)
+            if not items:
+                return
+            yield page_number, items
+            if is_last_page is not None and is_last_page(response, items):
+                return
+            page_number += 1
+
+    executor = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="ibkr-prefetch")
+    pending = deque()
+    next_page = start_page
+    try:
+        for _ in range(prefetch + 1):
+            pending.append((next_page, executor.submit(fetch_page, next_page)))
+            next_page += 1
+
+        while pending:
+            page_number, future = pending.popleft()
+            response = future.result()
+            items = extract_items(response)
+            if not items:
+                return
+            if is_last_page is not None and is_last_page(response, items):
+                yield page_number, items
+                return
+            # keep the window full before handing the page to the caller
+            pending.append((next_page, executor.submit(fetch_page, next_page)))
+            next_page += 1
+            yield page_number, items
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _flatten(pages: Iterator[Tuple[int, List[Any]]], batches: bool) -> Iterator[Any]:
+    for _, items in pages:
+        if batches:
+            yield items
+        else:
+            yield from items
+
+
+def iter_subaccounts(client: IBKRHttpClient, prefetch: int = 2, batches: bool = False) -> Iterator[Any]:
+    """
+    Iterates over all subaccounts of a large account structure, see #portfolio_subaccounts_large.
+    Yields single subaccounts, or one list per page when batches is True.
+    """
+
+    def extract_items(response) -> list:
+        if not isinstance(response, dict):
+            return []
+        return response.get("subaccounts") or []
+
+    def is_last_page(response, items) -> bool:
+        metadata = response.get("metadata") or {}
+        try:
+            return (int(metadata["pageNum"]) + 1) * int(metadata["pageSize"]) >= int(metadata["total"])
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    pages = iter_pages(client.portfolio_subaccounts_large, extract_items, is_last_page, prefetch=prefetch)
+    return _flatten(pages, batches)
+
+
+def iter_positions(
+    client: IBKRHttpClient,
+    account_id: str,
+    prefetch: int = 2,
+    batches: bool = False,
+    page_size: int = POSITIONS_PAGE_SIZE,
+) -> Iterator[Any]:
+    """
+    Iterates over all positions of the account, see #get_positions.
+    Yields single positions, or one list per page when batches is True.
+    """
+
+    def extract_items(response) -> list:
+        return response if isinstance(response, list) else []
+
+    def is_last_page(response, items) -> bool:
+        return len(items) < page_size
+
+    pages = iter_pages(
+        lambda page_id: client.get_positions(account_id, page_id), extract_items, is_last_page, prefetch=prefetch
+    )
+    return _flatten(pages, batches)
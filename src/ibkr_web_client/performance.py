@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .client import IBKRHttpClient
+from .ibkr_types import Period
+
+
+# /pa/performance is paced at 1 req/15 mins, shorter periods change faster so they expire first
+DEFAULT_PERFORMANCE_TTLS: Dict[Period, float] = {
+    Period.ONE_DAY: 15 * 60,
+    Period.ONE_WEEK: 30 * 60,
+    Period.MONTH_TO_DATE: 60 * 60,
+    Period.ONE_MONTH: 60 * 60,
+    Period.YEAR_TO_DATE: 4 * 60 * 60,
+    Period.ONE_YEAR: 4 * 60 * 60,
+}
+
+Series = Dict[str, np.ndarray]
+
+
+def _parse_dates(dates: Sequence[str]) -> np.ndarray:
+    """Performance dates are "YYYYMMDD" for daily and "YYYYMM" for monthly series."""
+    iso = []
+    for date in dates:
+        date = str(date)
+        iso.append(f"{date[:4]}-{date[4:6]}-{date[6:8] or '01'}" if len(date) in (6, 8) else "NaT")
+    return np.array(iso, dtype="datetime64[D]")
+
+
+def _decode(section: dict, values_key: str) -> Tuple[np.ndarray, Series]:
+    """Decodes a nav, cps or tpps section into its dates and one value array per account aligned to them."""
+    section = section or {}
+    dates = _parse_dates(section.get("dates") or [])
+    series: Series = {}
+    for account_obj in section.get("data") or []:
+        values = np.array([np.nan if value is None else value for value in account_obj.get(values_key) or []])
+        aligned = np.full(len(dates), np.nan)
+        # accounts opened within the period have shorter series, starting at their own start date
+        if account_obj.get("start") and len(values) < len(dates):
+            offset = int(np.searchsorted(dates, _parse_dates([account_obj["start"]])[0]))
+        else:
+            offset = len(dates) - len(values)
+        offset = min(max(offset, 0), len(dates) - min(len(values), len(dates)))
+        aligned[offset : offset + len(values)] = values[: len(dates)]
+        series[str(account_obj.get("id"))] = aligned
+    return dates, series
+
+
+@dataclass
+class PerformanceData:
+    """
+    Decoded #get_accounts_performance response. Each series maps account ids to NumPy arrays
+    aligned to the dates of that series, missing values are nan.
+    """
+
+    period: Period
+    nav_dates: np.ndarray
+    nav: Series
+    cumulative_return_dates: np.ndarray
+    cumulative_returns: Series
+    period_return_dates: np.ndarray
+    period_returns: Series
+    fetched_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_response(cls, period: Period, response: dict) -> "PerformanceData":
+        nav_dates, nav = _decode(response.get("nav"), "navs")
+        cps_dates, cps = _decode(response.get("cps"), "returns")
+        tpps_dates, tpps = _decode(response.get("tpps"), "returns")
+        return cls(period, nav_dates, nav, cps_dates, cps, tpps_dates, tpps)
+
+    @property
+    def accounts(self) -> List[str]:
+        return list(self.nav)
+
+    @staticmethod
+    def stack(series: Series, dates: np.ndarray) -> np.ndarray:
+        """Returns an (accounts x dates) matrix, rows in the order of the series."""
+        if not series:
+            return np.empty((0, len(dates)))
+        return np.vstack(list(series.values()))
+
+    def total_nav(self) -> np.ndarray:
+        """NAV summed across accounts per date, nan where no account has a value."""
+        matrix = self.stack(self.nav, self.nav_dates)
+        totals = np.nansum(matrix, axis=0)
+        totals[np.all(np.isnan(matrix), axis=0)] = np.nan
+        return totals
+
+    def weighted_cumulative_return(self) -> np.ndarray:
+        """Cumulative returns averaged across accounts, weighted by the NAV of each account on the same date."""
+        if not self.cumulative_returns:
+            return np.full(len(self.cumulative_return_dates), np.nan)
+        if not np.array_equal(self.cumulative_return_dates, self.nav_dates):
+            raise ValueError("Cumulative returns and NAV are not on the same dates")
+        returns = self.stack(self.cumulative_returns, self.cumulative_return_dates)
+        missing = np.full(len(self.nav_dates), np.nan)
+        weights = np.vstack([self.nav.get(account, missing) for account in self.cumulative_returns])
+        mask = ~(np.isnan(returns) | np.isnan(weights))
+        weights = np.where(mask, weights, 0.0)
+        total_weights = weights.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weighted = (np.where(mask, returns, 0.0) * weights).sum(axis=0) / total_weights
+        return np.where(total_weights > 0, weighted, np.nan)
+
+
+class PerformanceService:
+    """
+    Serves #get_accounts_performance as PerformanceData cached per (accounts, period), with a TTL per period.
+    Concurrent requests for the same key share one call.
+    """
+
+    def __init__(self, client: IBKRHttpClient, ttls: Dict[Period, float] = None, logger: logging.Logger = None):
+        self.ttls = dict(DEFAULT_PERFORMANCE_TTLS if ttls is None else ttls)
+        self.__client = client
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__key_locks: Dict[tuple, threading.Lock] = {}
+        self.__entries: Dict[tuple, PerformanceData] = {}
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, account_ids: Sequence[str], period: Period, force: bool = False) -> PerformanceData:
+        key = (tuple(sorted(account_ids)), period)
+        with self.__lock:
+            key_lock = self.__key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self.__lock:
+                data = self.__entries.get(key)
+            if not force and data is not None and time.time() - data.fetched_at < self.ttls.get(period, 0):
+                with self.__lock:
+                    self.__hits += 1
+                return data
+            with self.__lock:
+                self.__misses += 1
+            self.__logger.debug(f"Fetching {period.value} performance of {key[0]}")
+            response = self.__client.get_accounts_performance(list(key[0]), period)
+            data = PerformanceData.from_response(period, response or {})
+            with self.__lock:
+                self.__entries[key] = data
+            return data
+
+    def invalidate(self, period: Period = None):
+        with self.__lock:
+            for key in list(self.__entries):
+                if period is None or key[1] == period:
+                    del self.__entries[key]
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            return {"hits": self.__hits, "misses": self.__misses, "entries": len(self.__entries)}
@@ -0,0 +1,298 @@
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .client import IBKRHttpClient
+from .ibkr_types import MarketDataField
+from .pacing import IBKR_PACING_LIMITS, RateLimiter
+
+
+SNAPSHOT_ENDPOINT = "/iserver/marketdata/snapshot"
+DEFAULT_MAX_BATCH = 50  # conids per snapshot call
+DEFAULT_STALENESS_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)  # upper bounds in seconds
+# 6509 availability codes of frozen data, the last recorded values at market close
+FROZEN_AVAILABILITY = ("Z", "Y")
+
+
+@dataclass
+class PolledInstrument:
+    """Polling state of one conid, times are time.monotonic() seconds."""
+
+    conid: int
+    fields: Tuple[MarketDataField, ...]
+    target_freshness: float
+    priority: int = 0
+    interval: float = 0.0
+    change_rate: float = 1.0  # moving average of the share of polls that returned a changed value
+    next_poll: float = 0.0
+    last_refresh: Optional[float] = None
+    paused: bool = False
+
+
+class SnapshotPoller:
+    """
+    Polls #IBKRHttpClient.get_live_market_data_snapshot for many conids within the snapshot pacing limit.
+
+    Every conid has a target freshness and a priority. Due conids with the same fields are packed into batched
+    snapshot calls, highest priority first. A conid whose values rarely change is polled less often, up to
+    max_slowdown times its target freshness. When the pacing limit leaves no room for all due conids, the rest
+    waits for the next round and lower priority conids are slowed down until the backlog clears.
+    Conids whose market is closed (frozen data, or a last price that is the previous close) are paused and only
+    checked again every closed_recheck_interval. Every batch also requests the market data availability field
+    for this check, a custom market_open(conid, row) can decide instead.
+
+    Polled values are merged into client.market_data_cache, #staleness_histogram counts how old the values of a
+    conid were when they were refreshed.
+
+        with SnapshotPoller(client) as poller:
+            poller.add(hot_conids, [MarketDataField.LAST_PRICE], target_freshness=1, priority=10)
+            poller.add(cold_conids, [MarketDataField.LAST_PRICE], target_freshness=60)
+    """
+
+    def __init__(
+        self,
+        client: IBKRHttpClient,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        pacing_share: float = 0.5,
+        max_slowdown: float = 8.0,
+        smoothing: float = 0.3,
+        closed_recheck_interval: float = 300.0,
+        market_open: Callable[[int, dict], bool] = None,
+        staleness_buckets: Sequence[float] = DEFAULT_STALENESS_BUCKETS,
+        logger: logging.Logger = None,
+    ):
+        if not 0 < pacing_share <= 1:
+            raise ValueError("pacing_share must be in (0, 1]")
+        line_budget = client.market_data_subscriptions.line_budget
+        self.max_batch = min(max_batch, line_budget) if line_budget else max_batch
+        self.max_slowdown = max_slowdown
+        self.smoothing = smoothing
+        self.closed_recheck_interval = closed_recheck_interval
+        self.stats: Counter = Counter()
+        self.__client = client
+        self.__market_open = market_open
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__instruments: Dict[int, PolledInstrument] = {}
+        # the share of the snapshot pacing limit used by the poller, the rest stays with other snapshot callers
+        self.__pacing = client.pacer.limiter_for(SNAPSHOT_ENDPOINT) if client.pacer is not None else None
+        max_calls, period = self.__snapshot_limit()
+        self.__budget = RateLimiter(max(1, int(max_calls * pacing_share)), period)
+        self.__pressure = 1.0
+        self.__buckets = np.asarray(staleness_buckets, dtype=float)
+        self.__histogram = np.zeros(len(self.__buckets) + 1, dtype=np.int64)
+        self.__stop_event = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def instruments(self) -> Dict[int, PolledInstrument]:
+        with self.__lock:
+            return dict(self.__instruments)
+
+    @property
+    def pressure(self) -> float:
+        """Slowdown applied to lower priority conids while the pacing limit is exhausted, 1 without backlog."""
+        return self.__pressure
+
+    @property
+    def staleness_histogram(self) -> Dict[float, int]:
+        """Refresh counts by the age of the replaced values, keyed by the bucket upper bound in seconds."""
+        with self.__lock:
+            bounds = list(self.__buckets) + [float("inf")]
+            return {float(bound): int(count) for bound, count in zip(bounds, self.__histogram)}
+
+    def staleness(self, now: float = None) -> Dict[int, float]:
+        """Seconds since the values of every conid were last refreshed, inf if never."""
+        now = time.monotonic() if now is None else now
+        with self.__lock:
+            return {
+                conid: now - instrument.last_refresh if instrument.last_refresh is not None else float("inf")
+                for conid, instrument in self.__instruments.items()
+            }
+
+    def add(
+        self,
+        conids: Iterable[int],
+        fields: Sequence[MarketDataField],
+        target_freshness: float = 5.0,
+        priority: int = 0,
+    ):
+        """Polls conids so that their values are at most target_freshness seconds old. Replaces earlier settings."""
+        if target_freshness <= 0:
+            raise ValueError("target_freshness must be positive")
+        with self.__lock:
+            for conid in conids:
+                self.__instruments[int(conid)] = PolledInstrument(
+                    int(conid), tuple(fields), target_freshness, priority, interval=target_freshness
+                )
+
+    def remove(self, conids: Iterable[int]):
+        with self.__lock:
+            for conid in conids:
+                self.__instruments.pop(int(conid), None)
+
+    def poll(self, now: float = None) -> int:
+        """One scheduling round: polls the due conids as far as the pacing budget allows. Returns the calls made."""
+        now = time.monotonic() if now is None else now
+        with self.__lock:
+            due = [instrument for instrument in self.__instruments.values() if instrument.next_poll <= now]
+            due.sort(key=lambda instrument: (-instrument.priority, instrument.next_poll))
+            batches = self.__batches(due)
+        calls = 0
+        for index, (fields, batch) in enumerate(batches):
+            if not self.__has_headroom():
+                deferred = sum(len(rest) for _, rest in batches[index:])
+                self.stats["deferred"] += deferred
+                self.__logger.debug(f"Pacing limit reached, {deferred} due conids wait for the next round")
+                break
+            self.__budget.reserve()
+            self.__poll_batch(fields, batch, now)
+            calls += 1
+        else:
+            self.__pressure = max(1.0, self.__pressure / 2)
+            return calls
+        self.__pressure = min(self.max_slowdown, self.__pressure * 2)
+        return calls
+
+    def next_poll(self) -> Optional[float]:
+        """time.monotonic() of the next due conid, None without conids."""
+        with self.__lock:
+            return min((instrument.next_poll for instrument in self.__instruments.values()), default=None)
+
+    def run(self, stop_event: threading.Event = None, idle_wait: float = 1.0):
+        """Polls until stop_event is set."""
+        stop_event = stop_event or self.__stop_event
+        max_calls, period = self.__snapshot_limit()
+        min_wait = period / max_calls
+        while not stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.__logger.error(f"Snapshot polling round failed: {e}")
+            next_poll = self.next_poll()
+            wait = idle_wait if next_poll is None else min(idle_wait, next_poll - time.monotonic())
+            stop_event.wait(max(min_wait, wait))
+
+    def start(self) -> "SnapshotPoller":
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__stop_event.clear()
+            self.__thread = threading.Thread(target=self.run, name="ibkr-snapshot-poller", daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __enter__(self) -> "SnapshotPoller":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __snapshot_limit(self) -> Tuple[int, float]:
+        if self.__pacing is not None:
+            return self.__pacing.max_calls, self.__pacing.period
+        return IBKR_PACING_LIMITS[SNAPSHOT_ENDPOINT]
+
+    def __has_headroom(self) -> bool:
+        # other snapshot callers draw from the client pacer too, a call now would block on it
+        if self.__pacing is not None and self.__pacing.available < 1:
+            return False
+        return self.__budget.available >= 1
+
+    def __batches(self, due: List[PolledInstrument]) -> List[Tuple[Tuple[MarketDataField, ...], list]]:
+        """Packs due conids with the same fields into batches of max_batch, in the order of their first conid."""
+        batches = []
+        open_batches: Dict[Tuple[MarketDataField, ...], list] = {}
+        for instrument in due:
+            batch = open_batches.get(instrument.fields)
+            if batch is None or len(batch) == self.max_batch:
+                batch = open_batches[instrument.fields] = []
+                batches.append((instrument.fields, batch))
+            batch.append(instrument)
+        return batches
+
+    @staticmethod
+    def __requested_fields(fields: Tuple[MarketDataField, ...]) -> List[MarketDataField]:
+        # availability tells a closed market apart for every conid, whatever fields it is polled for
+        availability = MarketDataField.MARKET_DATA_AVAILABILITY
+        return list(fields) if availability in fields else [*fields, availability]
+
+    def __poll_batch(self, fields: Tuple[MarketDataField, ...], batch: List[PolledInstrument], now: float):
+        conids = [instrument.conid for instrument in batch]
+        cache = self.__client.market_data_cache
+        before = cache.get_values(conids, fields)
+        self.stats["polls"] += 1
+        try:
+            response = self.__client.get_live_market_data_snapshot(conids, self.__requested_fields(fields))
+        except Exception as e:
+            self.stats["failures"] += 1
+            self.__logger.error(f"Polling snapshot of {len(conids)} conids failed: {e}")
+            with self.__lock:
+                for instrument in batch:
+                    instrument.next_poll = now + instrument.target_freshness
+            return
+        field_ids = [str(field.value) for field in fields]
+        rows = response if isinstance(response, list) else []
+        received = {
+            int(row["conid"])
+            for row in rows
+            if isinstance(row, dict) and "conid" in row and any(field_id in row for field_id in field_ids)
+        }
+        changed = (before != cache.get_values(conids, fields)).any(axis=1)
+        ages = []
+        with self.__lock:
+            top_priority = max(instrument.priority for instrument in self.__instruments.values())
+            for instrument, is_changed in zip(batch, changed):
+                if instrument.conid not in received:
+                    # first snapshots of a conid and conids without a free market data line come back empty
+                    self.stats["empty"] += 1
+                    instrument.next_poll = now + instrument.target_freshness
+                    continue
+                if instrument.last_refresh is not None and not instrument.paused:
+                    ages.append(now - instrument.last_refresh)
+                instrument.last_refresh = now
+                instrument.change_rate += self.smoothing * (float(is_changed) - instrument.change_rate)
+                self.stats["refreshed"] += 1
+                self.stats["changed"] += int(is_changed)
+                self.__schedule(instrument, top_priority, now)
+            if ages:
+                np.add.at(self.__histogram, np.searchsorted(self.__buckets, ages), 1)
+
+    def __schedule(self, instrument: PolledInstrument, top_priority: int, now: float):
+        if self.__is_market_closed(instrument.conid):
+            if not instrument.paused:
+                self.stats["paused"] += 1
+                self.__logger.info(f"Market of {instrument.conid} is closed, pausing its polling")
+            instrument.paused = True
+            instrument.next_poll = now + self.closed_recheck_interval
+            return
+        if instrument.paused:
+            self.stats["resumed"] += 1
+            instrument.paused = False
+        # rarely changing values are polled less often, down to 1 / max_slowdown of the target rate
+        interval = instrument.target_freshness / max(instrument.change_rate, 1 / self.max_slowdown)
+        if instrument.priority < top_priority:
+            interval *= self.__pressure
+        instrument.interval = interval
+        instrument.next_poll = now + interval
+
+    def __is_market_closed(self, conid: int) -> bool:
+        row = self.__client.market_data_cache.row(conid) or {"conid": conid}
+        if self.__market_open is not None:
+            try:
+                return not self.__market_open(conid, row)
+            except Exception as e:
+                self.__logger.error(f"market_open failed for {conid}: {e}")
+                return False
+        availability = str(row.get(str(MarketDataField.MARKET_DATA_AVAILABILITY.value), ""))
+        last_price = str(row.get(str(MarketDataField.LAST_PRICE.value), ""))
+        return availability[:1] in FROZEN_AVAILABILITY or last_price.startswith("C")
@@ -0,0 +1,171 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .client import IBKRHttpClient
+from .ibkr_types import SortingOrder
+from .utils_tables import columns_to_dataframe, to_float, to_int
+
+
+SUMMARY = "summary"
+LEDGER = "ledger"
+ALLOCATION = "allocation"
+POSITIONS = "positions"
+ALL_CALLS = (SUMMARY, LEDGER, ALLOCATION, POSITIONS)
+
+SUMMARY_KEYS = (
+    "netliquidation",
+    "totalcashvalue",
+    "grosspositionvalue",
+    "buyingpower",
+    "availablefunds",
+    "excessliquidity",
+    "maintmarginreq",
+    "initmarginreq",
+)
+LEDGER_KEYS = (
+    "netliquidationvalue",
+    "cashbalance",
+    "settledcash",
+    "stockmarketvalue",
+    "unrealizedpnl",
+    "realizedpnl",
+    "exchangerate",
+)
+POSITION_FLOAT_KEYS = ("position", "avgCost", "avgPrice", "marketPrice", "marketValue", "unrealizedPnl", "realizedPnl")
+POSITION_STR_KEYS = ("currency", "description", "secType", "assetClass")
+
+Columns = Dict[str, np.ndarray]
+
+
+def _columns(rows: List[tuple], names: Sequence[str], dtypes: Sequence[type]) -> Columns:
+    if not rows:
+        return {name: np.array([], dtype=dtype) for name, dtype in zip(names, dtypes)}
+    return {name: np.array(values, dtype=dtype) for name, dtype, values in zip(names, dtypes, zip(*rows))}
+
+
+@dataclass
+class PortfolioSnapshot:
+    """
+    Result of #fetch_portfolio_snapshot.
+    Tables are dicts of equally sized NumPy columns, every row carries the account it belongs to.
+    Failed calls are reported per account in `errors` and leave the other results untouched.
+    """
+
+    summary: Columns
+    ledger: Columns
+    positions: Columns
+    allocation: Dict[str, dict]
+    errors: Dict[str, Dict[str, Exception]] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def failed_accounts(self) -> List[str]:
+        return sorted(self.errors)
+
+    def net_liquidation_by_currency(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum of ledger net liquidation values across accounts per currency, the BASE rows are excluded."""
+        mask = self.ledger["currency"] != "BASE"
+        currencies, inverse = np.unique(self.ledger["currency"][mask], return_inverse=True)
+        totals = np.zeros(len(currencies))
+        np.add.at(totals, inverse, np.nan_to_num(self.ledger["netliquidationvalue"][mask]))
+        return currencies, totals
+
+    def market_value_by_conid(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum of position market values across accounts per contract id."""
+        conids, inverse = np.unique(self.positions["conid"], return_inverse=True)
+        totals = np.zeros(len(conids))
+        np.add.at(totals, inverse, np.nan_to_num(self.positions["marketValue"]))
+        return conids, totals
+
+    def to_dataframe(self, table: str):
+        """Returns one of the summary, ledger or positions tables as pandas DataFrame, pandas must be installed."""
+        return columns_to_dataframe(getattr(self, table))
+
+
+def fetch_portfolio_snapshot(
+    client: IBKRHttpClient,
+    account_ids: Sequence[str],
+    calls: Sequence[str] = ALL_CALLS,
+    max_workers: int = 8,
+    sorting_order: SortingOrder = SortingOrder.DESCENDING,
+    logger: logging.Logger = None,
+) -> PortfolioSnapshot:
+    """
+    Fetches summary, ledger, allocation and positions for all accounts concurrently and stacks the results
+    into columnar tables. Pacing is left to the client, so max_workers only bounds the number of open requests.
+    """
+    logger = logger or logging.getLogger(__name__)
+    fetchers = {
+        SUMMARY: client.get_portfolio_summary,
+        LEDGER: client.get_portfolio_ledger,
+        ALLOCATION: client.portfolio_account_allocation,
+        POSITIONS: lambda account_id: client.get_all_positions(account_id, sorting_order),
+    }
+    unknown = set(calls) - set(fetchers)
+    if unknown:
+        raise ValueError(f"Unknown snapshot calls: {sorted(unknown)}")
+
+    started = time.perf_counter()
+    results: Dict[Tuple[str, str], object] = {}
+    errors: Dict[str, Dict[str, Exception]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ibkr-snapshot") as executor:
+        futures = {
+            (account_id, call): executor.submit(fetchers[call], account_id) for account_id in account_ids for call in calls
+        }
+        for (account_id, call), future in futures.items():
+            try:
+                results[(account_id, call)] = future.result()
+            except Exception as e:
+                logger.error(f"Snapshot call {call} failed for account {account_id}: {e}")
+                errors.setdefault(account_id, {})[call] = e
+
+    summary_rows, ledger_rows, position_rows, allocation = [], [], [], {}
+    for (account_id, call), response in results.items():
+        # a malformed response only fails its own account and call
+        try:
+            if call == SUMMARY and isinstance(response, dict):
+                summary_rows.append((account_id, *(to_float(response.get(key)) for key in SUMMARY_KEYS)))
+            elif call == LEDGER and isinstance(response, dict):
+                # built completely before extending, a failing row leaves no partial account behind
+                ledger_rows.extend(
+                    [
+                        (account_id, currency, *(to_float(entry.get(key)) for key in LEDGER_KEYS))
+                        for currency, entry in response.items()
+                        if isinstance(entry, dict)
+                    ]
+                )
+            elif call == POSITIONS and isinstance(response, list):
+                position_rows.extend(
+                    [
+                        (
+                            account_id,
+                            to_int(position.get("conid")),
+                            *(to_float(position.get(key)) for key in POSITION_FLOAT_KEYS),
+                            *(str(position.get(key) or "") for key in POSITION_STR_KEYS),
+                        )
+                        for position in response
+                    ]
+                )
+            elif call == ALLOCATION:
+                allocation[account_id] = response
+        except Exception as e:
+            logger.error(f"Snapshot call {call} returned an unexpected response for account {account_id}: {e}")
+            errors.setdefault(account_id, {})[call] = e
+
+    return PortfolioSnapshot(
+        summary=_columns(summary_rows, ("account", *SUMMARY_KEYS), (str,) + (float,) * len(SUMMARY_KEYS)),
+        ledger=_columns(ledger_rows, ("account", "currency", *LEDGER_KEYS), (str, str) + (float,) * len(LEDGER_KEYS)),
+        positions=_columns(
+            position_rows,
+            ("account", "conid", *POSITION_FLOAT_KEYS, *POSITION_STR_KEYS),
+            (str, np.int64) + (float,) * len(POSITION_FLOAT_KEYS) + (str,) * len(POSITION_STR_KEYS),
+        ),
+        allocation=allocation,
+        errors=errors,
+        elapsed=time.perf_counter() - started,
+    )
@@ -0,0 +1,172 @@
+import gzip
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Tuple, Union
+
+import requests
+
+
+CASSETTE_VERSION = 1
+# Only these response headers are kept, nothing that identifies the session
+RECORDED_HEADERS = ("Content-Type",)
+# Response body fields that carry credentials, e.g. the /tickle session authenticates the websocket
+SCRUBBED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "/tickle": ("session",),
+}
+SCRUBBED_VALUE = "<scrubbed>"
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode for a request that is not on the cassette."""
+
+
+def request_key(method: str, endpoint: str, params: dict = None, json_content: dict = None) -> str:
+    """
+    Normalized request identity: params are compared as the strings requests sends, None values are dropped.
+    """
+    endpoint = "/" + endpoint.lstrip("/")
+    normalized_params = {str(k): str(v) for k, v in (params or {}).items() if v is not None}
+    key = f"{method.upper()} {endpoint}?{json.dumps(normalized_params, sort_keys=True)}"
+    if json_content:
+        key += f"#{json.dumps(json_content, sort_keys=True, default=str)}"
+    return key
+
+
+def read_cassette(path: Union[str, Path]) -> Iterator[dict]:
+    """Yields the recorded interactions, a cassette cut off by a crash is read up to its last complete line."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                entry = json.loads(line)
+                if "version" in entry:
+                    if entry["version"] != CASSETTE_VERSION:
+                        raise ValueError(f"Unsupported cassette version {entry['version']}")
+                    continue
+                yield entry
+        except EOFError:
+            return
+
+
+def scrub_body(endpoint: str, body: str) -> str:
+    """Replaces the SCRUBBED_FIELDS of the endpoint in a JSON body, at any depth."""
+    fields = SCRUBBED_FIELDS.get("/" + endpoint.lstrip("/"))
+    if not fields:
+        return body
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+
+    def scrub(value):
+        if isinstance(value, dict):
+            return {k: SCRUBBED_VALUE if k in fields else scrub(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [scrub(item) for item in value]
+        return value
+
+    return json.dumps(scrub(payload))
+
+
+def build_response(status: int, headers: Dict[str, str], body: bytes, url: str = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers)
+    response._content = body
+    response.url = url
+    response.encoding = "utf-8"
+    return response
+
+
+class CassetteRecorder:
+    """
+    Appends request/response pairs to a gzip compressed JSON lines cassette.
+    Request headers are never written and SCRUBBED_FIELDS are replaced in response bodies,
+    so credentials and signatures do not end up on disk.
+    Every entry is flushed, the cassette stays readable if the process dies.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.__lock = threading.Lock()
+        self.__started = time.monotonic()
+        self.__file = gzip.open(self.path, "wb")
+        self.__write({"version": CASSETTE_VERSION, "recorded_at": time.time()})
+
+    def record(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict,
+        json_content: dict,
+        response: requests.Response,
+        elapsed: float,
+    ):
+        self.__write(
+            {
+                "key": request_key(method, endpoint, params, json_content),
+                "offset": round(time.monotonic() - self.__started, 6),
+                "elapsed": round(elapsed, 6),
+                "status": response.status_code,
+                "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+                "body": scrub_body(endpoint, response.content.decode("utf-8", errors="replace")),
+            }
+        )
+
+    def close(self):
+        with self.__lock:
+            if not self.__file.closed:
+                self.__file.close()
+
+    def __write(self, entry: dict):
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with self.__lock:
+            self.__file.write(line)
+            self.__file.flush(zlib.Z_SYNC_FLUSH)
+
+
+class CassettePlayer:
+    """
+    Serves responses from a cassette without network access.
+    Repeated identical requests get the recorded responses in order, the last one is repeated afterwards.
+    With speed > 0 every response is delayed by its recorded elapsed time divided by speed,
+    speed 1 is the original timing and 0 replays without delay.
+    """
+
+    def __init__(self, path: Union[str, Path], speed: float = 0.0, logger: logging.Logger = None):
+        self.path = Path(path)
+        self.speed = speed
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__entries: Dict[str, Deque[dict]] = {}
+        for entry in read_cassette(self.path):
+            self.__entries.setdefault(entry["key"], deque()).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.__entries.values())
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self.__entries)
+
+    def play(
+        self, method: str, endpoint: str, params: dict = None, json_content: dict = None
+    ) -> Tuple[requests.Response, float]:
+        """Returns the recorded response and its recorded elapsed time."""
+        key = request_key(method, endpoint, params, json_content)
+        with self.__lock:
+            entries = self.__entries.get(key)
+            if not entries:
+                raise CassetteMissError(f"No recorded response for {key} in {self.path}")
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+        if self.speed > 0:
+            time.sleep(entry["elapsed"] / self.speed)
+        self.__logger.debug(f"Replaying {key}")
+        response = build_response(entry["status"], entry["headers"], entry["body"].encode("utf-8"), endpoint)
+        return response, entry["elapsed"]
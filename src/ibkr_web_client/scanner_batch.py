@@ -0,0 +1,183 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from .client import IBKRHttpClient
+from .ibkr_types import MarketDataField
+from .scanner_catalog import ScannerCatalog
+
+
+@dataclass
+class ScanDefinition:
+    instrument: str
+    location: str
+    scan_type: str
+    filter_lst: List[dict] = field(default_factory=list)
+    name: str = None
+
+    @property
+    def key(self) -> str:
+        if self.name:
+            return self.name
+        key = f"{self.instrument}/{self.location}/{self.scan_type}"
+        if self.filter_lst:
+            key += json.dumps(self.filter_lst, sort_keys=True, separators=(",", ":"))
+        return key
+
+
+@dataclass
+class ScanMatch:
+    conid: int
+    symbol: str
+    contract: dict
+    # scan key -> 0 based rank of the contract in that scan
+    ranks: Dict[str, int] = field(default_factory=dict)
+    snapshot: Optional[dict] = None
+
+
+@dataclass
+class ScanBatchResult:
+    entries: Dict[int, ScanMatch]
+    errors: Dict[str, Exception]
+    # conids that appeared or disappeared since the previous run of the same runner
+    added: Set[int]
+    removed: Set[int]
+    elapsed: float
+
+
+def _contract_conid(contract: dict) -> Optional[int]:
+    conid = contract.get("con_id", contract.get("conid"))
+    if conid is None and contract.get("conidex"):
+        conid = str(contract["conidex"]).split("@", 1)[0]
+    try:
+        return int(conid)
+    except (TypeError, ValueError):
+        return None
+
+
+class ScanBatchRunner:
+    """
+    Runs many #iserver_market_scanner definitions concurrently and merges the results by conid.
+    The client paces /iserver/scanner/run, so max_workers only bounds the number of open requests.
+    """
+
+    def __init__(
+        self,
+        client: IBKRHttpClient,
+        max_workers: int = 4,
+        catalog: ScannerCatalog = None,
+        logger: logging.Logger = None,
+    ):
+        self.__client = client
+        self.__max_workers = max_workers
+        self.__catalog = catalog
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__previous: Dict[int, ScanMatch] = {}
+
+    def run(
+        self, definitions: Sequence[ScanDefinition], enrich_fields: List[MarketDataField] = None
+    ) -> ScanBatchResult:
+        """
+        Runs all definitions and returns the merged matches.
+        With enrich_fields the merged conids are enriched with a single snapshot request.
+        """
+        started = time.perf_counter()
+        errors: Dict[str, Exception] = {}
+        to_run = []
+        for definition in definitions:
+            if self.__catalog is not None:
+                try:
+                    self.__catalog.validate(
+                        definition.instrument, definition.location, definition.scan_type, definition.filter_lst
+                    )
+                except ValueError as e:
+                    errors[definition.key] = e
+                    continue
+            to_run.append(definition)
+
+        responses = {}
+        with ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="ibkr-scanner") as executor:
+            futures = {
+                definition.key: executor.submit(
+                    self.__client.iserver_market_scanner,
+                    definition.instrument,
+                    definition.location,
+                    definition.scan_type,
+                    definition.filter_lst,
+                )
+                for definition in to_run
+            }
+            for key, future in futures.items():
+                try:
+                    responses[key] = future.result()
+                except Exception as e:
+                    self.__logger.error(f"Scan {key} failed: {e}")
+                    errors[key] = e
+
+        entries: Dict[int, ScanMatch] = {}
+        for key, response in responses.items():
+            contracts = response.get("contracts") if isinstance(response, dict) else None
+            if contracts is None:
+                errors[key] = ValueError(f"Unexpected scanner response: {response}")
+                continue
+            for rank, contract in enumerate(contracts):
+                conid = _contract_conid(contract)
+                if conid is None:
+                    continue
+                match = entries.get(conid)
+                if match is None:
+                    match = entries[conid] = ScanMatch(conid, contract.get("symbol"), contract)
+                match.ranks[key] = rank
+
+        if enrich_fields and entries:
+            self.__enrich(entries, enrich_fields)
+
+        # A failed scan says nothing about its previous matches, they are not reported as removed
+        # and are carried forward, so they are not reported as added once the scan succeeds again
+        unknown = {
+            conid: match
+            for conid, match in self.__previous.items()
+            if conid not in entries and any(key in errors for key in match.ranks)
+        }
+        removed = set(self.__previous) - set(entries) - set(unknown)
+        added = set(entries) - set(self.__previous)
+        self.__previous = {**entries, **unknown}
+        return ScanBatchResult(entries, errors, added, removed, time.perf_counter() - started)
+
+    def run_periodically(
+        self,
+        definitions: Sequence[ScanDefinition],
+        interval: float,
+        callback: Callable[[ScanBatchResult], None],
+        stop_event: threading.Event,
+        enrich_fields: List[MarketDataField] = None,
+    ):
+        """
+        Re-runs the definitions every interval seconds until stop_event is set.
+        The callback receives every result, `added`/`removed` hold the changes since the previous run.
+        """
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                callback(self.run(definitions, enrich_fields))
+            except Exception as e:
+                self.__logger.error(f"Periodic scan failed: {e}")
+            stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def __enrich(self, entries: Dict[int, ScanMatch], fields: List[MarketDataField]):
+        try:
+            snapshot_lst = self.__client.get_live_market_data_snapshot(list(entries), fields)
+        except Exception as e:
+            self.__logger.error(f"Snapshot enrichment failed: {e}")
+            return
+        for snapshot in snapshot_lst if isinstance(snapshot_lst, list) else []:
+            try:
+                match = entries.get(int(snapshot.get("conid")))
+            except (TypeError, ValueError):
+                continue
+            if match is not None:
+                match.snapshot = snapshot
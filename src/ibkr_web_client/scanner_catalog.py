@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from .client import IBKRHttpClient
+
+
+DEFAULT_CATALOG_TTL = 24 * 60 * 60  # scanner parameters change rarely, /iserver/scanner/params is paced at 1 req/15 mins
+
+
+class ScannerCatalog:
+    """
+    Indexed view of the #get_iserver_scanner_params document.
+    All lookups are dictionary based, so building and validating #iserver_market_scanner calls needs no tree walk.
+    """
+
+    def __init__(self, params: dict, fetched_at: float = None):
+        self.params = params
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+        self.__instruments: Dict[str, dict] = {
+            instrument["type"]: instrument for instrument in params.get("instrument_list", [])
+        }
+        self.__filters: Dict[str, dict] = {
+            filter_obj["code"]: filter_obj for filter_obj in params.get("filter_list", [])
+        }
+        self.__scan_types: Dict[str, dict] = {
+            scan_type["code"]: scan_type for scan_type in params.get("scan_type_list", [])
+        }
+
+        self.__scan_types_by_instrument: Dict[str, List[dict]] = {}
+        for scan_type in params.get("scan_type_list", []):
+            for instrument in scan_type.get("instruments", []):
+                self.__scan_types_by_instrument.setdefault(instrument, []).append(scan_type)
+
+        self.__locations: Dict[str, Dict[str, dict]] = {}
+        for root in params.get("location_tree", []):
+            locations = self.__locations.setdefault(root["type"], {})
+            stack = list(root.get("locations", []))
+            while stack:
+                location = stack.pop()
+                locations[location["type"]] = location
+                stack.extend(location.get("locations") or [])
+
+    @classmethod
+    def from_client(cls, client: IBKRHttpClient) -> "ScannerCatalog":
+        return cls(client.get_iserver_scanner_params())
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "ScannerCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["params"], data["fetched_at"])
+
+    @classmethod
+    def load(
+        cls,
+        client: IBKRHttpClient,
+        path: Union[str, Path],
+        ttl: float = DEFAULT_CATALOG_TTL,
+        logger: logging.Logger = None,
+    ) -> "ScannerCatalog":
+        """
+        Returns the catalog persisted at path if it is younger than ttl seconds,
+        otherwise fetches the scanner parameters and persists them.
+        """
+        logger = logger or logging.getLogger(__name__)
+        path = Path(path)
+        if path.exists():
+            try:
+                catalog = cls.from_file(path)
+                if not catalog.is_stale(ttl):
+                    return catalog
+                logger.info(f"Scanner catalog at {path} is stale, refreshing")
+            except (ValueError, KeyError) as e:
+                logger.error(f"Scanner catalog at {path} is corrupted, refreshing: {e}")
+        catalog = cls.from_client(client)
+        catalog.save(path)
+        return catalog
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "params": self.params}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def is_stale(self, ttl: float = DEFAULT_CATALOG_TTL) -> bool:
+        return time.time() - self.fetched_at > ttl
+
+    @property
+    def instrument_types(self) -> List[str]:
+        return list(self.__instruments)
+
+    def instrument(self, instrument_type: str) -> Optional[dict]:
+        return self.__instruments.get(instrument_type)
+
+    def locations_for(self, instrument_type: str) -> List[str]:
+        return list(self.__locations.get(instrument_type, {}))
+
+    def location(self, instrument_type: str, location_code: str) -> Optional[dict]:
+        return self.__locations.get(instrument_type, {}).get(location_code)
+
+    def scan_type(self, code: str) -> Optional[dict]:
+        return self.__scan_types.get(code)
+
+    def scan_types_for(self, instrument_type: str, location_code: str = None) -> List[dict]:
+        """Scan types valid for the instrument, e.g. scan_types_for("STK", "STK.US.MAJOR")."""
+        if location_code is not None and self.location(instrument_type, location_code) is None:
+            raise ValueError(f"Location {location_code} is not valid for instrument {instrument_type}")
+        return list(self.__scan_types_by_instrument.get(instrument_type, []))
+
+    def filter(self, code: str) -> Optional[dict]:
+        return self.__filters.get(code)
+
+    def filters_for(self, instrument_type: str) -> List[dict]:
+        instrument = self.__instruments.get(instrument_type) or {}
+        return [self.__filters[code] for code in instrument.get("filters", []) if code in self.__filters]
+
+    def validate(self, instrument: str, location: str, scan_type: str, filter_lst: List[dict] = None):
+        """
+        Raises ValueError if the arguments of #iserver_market_scanner do not fit the catalog.
+        """
+        instrument_obj = self.__instruments.get(instrument)
+        if instrument_obj is None:
+            raise ValueError(f"Unknown scanner instrument {instrument}")
+        if self.location(instrument, location) is None:
+            raise ValueError(f"Location {location} is not valid for instrument {instrument}")
+        scan_type_obj = self.__scan_types.get(scan_type)
+        if scan_type_obj is None:
+            raise ValueError(f"Unknown scan type {scan_type}")
+        if instrument not in scan_type_obj.get("instruments", []):
+            raise ValueError(f"Scan type {scan_type} is not valid for instrument {instrument}")
+        allowed_filters = set(instrument_obj.get("filters", []))
+        for filter_obj in filter_lst or []:
+            code = filter_obj.get("code")
+            if code not in self.__filters:
+                raise ValueError(f"Unknown scanner filter {code}")
+            if allowed_filters and code not in allowed_filters:
+                raise ValueError(f"Filter {code} is not valid for instrument {instrument}")
@@ -0,0 +1,1009 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, quote, quote_plus, unquote_plus, urlsplit
+
+from Crypto.Cipher import PKCS1_v1_5
+from Crypto.Hash import HMAC, SHA1, SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import pkcs1_15
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import dh
+
+from .config import IBKRConfig
+
+
+API_PREFIX = "/v1/api"
+# RFC 3526 2048-bit MODP group 14, generating fresh DH parameters takes minutes
+RFC3526_GROUP14_PRIME = int(
+    "FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DD"
+    "EF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED"
+    "EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF0598DA48361C55D39A69163FA8FD24CF5F"
+    "83655D23DCA3AD961C62F356208552BB9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3B"
+    "E39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF6955817183995497CEA956AE515D2261898FA0510"
+    "15728E5A8AACAA68FFFFFFFFFFFFFFFF",
+    16,
+)
+RFC3526_GROUP14_GENERATOR = 2
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+def _k_bytes(k: int) -> bytes:
+    """Same encoding of the shared DH secret as DiffieHellmanResolver#get_k."""
+    hex_str_k = hex(k)[2:]
+    if len(hex_str_k) % 2:
+        hex_str_k = "0" + hex_str_k
+    k_bytes = bytes.fromhex(hex_str_k)
+    if len(bin(k)[2:]) % 8 == 0:
+        k_bytes = bytes(1) + k_bytes
+    return k_bytes
+
+
+def _parse_oauth_header(value: str) -> Dict[str, str]:
+    return dict(re.findall(r'(\w+)="([^"]*)"', value or ""))
+
+
+def _oauth_params_string(oauth_params: Dict[str, str]) -> str:
+    params = {k: v for k, v in oauth_params.items() if k not in ("oauth_signature", "realm")}
+    return "&".join([f"{k}={v}" for k, v in sorted(params.items())])
+
+
+@dataclass
+class SimulatorCredentials:
+    """
+    OAuth test credentials for #IBKRSimulator: DH parameters, RSA encryption and signature keys
+    and an access token secret encrypted with the encryption key, the same way IBKR issues them.
+    """
+
+    directory: Path
+    consumer_key: str
+    token_access: str
+    token_secret: str
+    # hex of the decrypted access token secret, the prepend of the live session token computation
+    prepend: str
+
+    @property
+    def dh_param_path(self) -> Path:
+        return self.directory / "dhparam.pem"
+
+    @property
+    def dh_private_encryption_path(self) -> Path:
+        return self.directory / "private_encryption.pem"
+
+    @property
+    def dh_private_signature_path(self) -> Path:
+        return self.directory / "private_signature.pem"
+
+    @classmethod
+    def generate(
+        cls, directory: Union[str, Path], consumer_key: str = "TESTCONS", key_size: int = 2048
+    ) -> "SimulatorCredentials":
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        parameters = dh.DHParameterNumbers(RFC3526_GROUP14_PRIME, RFC3526_GROUP14_GENERATOR).parameters(
+            default_backend()
+        )
+        encryption_key = RSA.generate(key_size)
+        signature_key = RSA.generate(key_size)
+        secret = os.urandom(32)
+        token_secret = base64.b64encode(PKCS1_v1_5.new(encryption_key.publickey()).encrypt(secret)).decode("utf-8")
+
+        credentials = cls(directory, consumer_key, os.urandom(10).hex(), token_secret, secret.hex())
+        credentials.dh_param_path.write_bytes(
+            parameters.parameter_bytes(serialization.Encoding.PEM, serialization.ParameterFormat.PKCS3)
+        )
+        credentials.dh_private_encryption_path.write_bytes(encryption_key.export_key("PEM"))
+        credentials.dh_private_signature_path.write_bytes(signature_key.export_key("PEM"))
+        return credentials
+
+    def config(self, api_url: str, **overrides) -> IBKRConfig:
+        return IBKRConfig(
+            token_access=self.token_access,
+            token_secret=self.token_secret,
+            consumer_key=self.consumer_key,
+            dh_param_path=self.dh_param_path,
+            dh_private_encryption_path=self.dh_private_encryption_path,
+            dh_private_signature_path=self.dh_private_signature_path,
+            api_url=api_url,
+            **overrides,
+        )
+
+
+@dataclass
+class SimulatorSettings:
+    """
+    Size of the synthetic data and the injected faults, can be changed while the simulator runs.
+    Faults only apply to endpoints matching fault_endpoints, never to the live session token handshake.
+    """
+
+    size: int = 100  # contracts, positions, bars, ... per response
+    accounts: int = 2
+    latency: float = 0.0  # seconds added to every response
+    latency_jitter: float = 0.0  # uniformly distributed extra seconds
+    throttle_probability: float = 0.0  # share of requests answered with 429
+    max_requests_per_second: Optional[int] = None  # requests above this rate are answered with 429
+    error_probability: float = 0.0  # share of requests answered with error_status
+    error_status: int = 500
+    fault_endpoints: Tuple[str, ...] = ("*",)
+    lst_lifetime: float = 24 * 60 * 60
+    verify_signatures: bool = True
+    market_data_lines: Optional[int] = None  # snapshots of conids beyond this many subscriptions have no fields
+    seed: int = 0
+
+
+class SyntheticData:
+    """Deterministic synthetic payloads shaped like the IBKR Web API responses."""
+
+    def __init__(self, settings: SimulatorSettings):
+        self.settings = settings
+        self.account_ids = [f"U{1000000 + i}" for i in range(settings.accounts)]
+        self.conids = [100000 + i for i in range(settings.size)]
+
+    def random(self, *salt) -> random.Random:
+        return random.Random(f"{self.settings.seed}:{':'.join(map(str, salt))}")
+
+    def contract(self, conid: int) -> dict:
+        return {
+            "conid": conid,
+            "symbol": f"SYM{conid - 100000}",
+            "companyName": f"Company {conid - 100000}",
+            "exchange": "NASDAQ",
+            "currency": "USD",
+            "secType": "STK",
+            "instrument_type": "STK",
+        }
+
+    def price(self, conid: int) -> float:
+        return round(10 + self.random("price", conid).random() * 490, 2)
+
+    def account(self, account_id: str) -> dict:
+        return {
+            "id": account_id,
+            "accountId": account_id,
+            "accountVan": account_id,
+            "accountTitle": f"Account {account_id}",
+            "displayName": account_id,
+            "currency": "USD",
+            "type": "INDIVIDUAL",
+            "tradingType": "STKNOPT",
+        }
+
+    def position(self, account_id: str, conid: int) -> dict:
+        rng = self.random("position", account_id, conid)
+        quantity = rng.randint(-100, 500) or 1
+        price = self.price(conid)
+        avg_cost = round(price * (0.8 + rng.random() * 0.4), 2)
+        return {
+            "acctId": account_id,
+            "conid": conid,
+            "contractDesc": f"SYM{conid - 100000}",
+            "position": quantity,
+            "mktPrice": price,
+            "mktValue": round(quantity * price, 2),
+            "avgCost": avg_cost,
+            "avgPrice": avg_cost,
+            "unrealizedPnl": round(quantity * (price - avg_cost), 2),
+            "realizedPnl": 0.0,
+            "currency": "USD",
+            "assetClass": "STK",
+        }
+
+    def positions(self, account_id: str) -> List[dict]:
+        return [self.position(account_id, conid) for conid in self.conids]
+
+    def summary(self, account_id: str) -> dict:
+        rng = self.random("summary", account_id)
+        keys = ("netliquidation", "totalcashvalue", "grosspositionvalue", "buyingpower", "availablefunds")
+        return {
+            key: {"amount": round(rng.random() * 1e6, 2), "currency": "USD", "isNull": False, "timestamp": 0}
+            for key in keys
+        }
+
+    def ledger(self, account_id: str) -> dict:
+        rng = self.random("ledger", account_id)
+        values = {
+            "netliquidationvalue": round(rng.random() * 1e6, 2),
+            "cashbalance": round(rng.random() * 1e5, 2),
+            "stockmarketvalue": round(rng.random() * 1e6, 2),
+            "unrealizedpnl": round(rng.random() * 1e4, 2),
+            "realizedpnl": 0.0,
+            "exchangerate": 1,
+        }
+        return {
+            "USD": dict(values, currency="USD", acctcode=account_id),
+            "BASE": dict(values, currency="BASE", acctcode=account_id),
+        }
+
+    def snapshot(self, conid: int, fields: List[str]) -> dict:
+        rng = self.random("snapshot", conid, int(time.time()))
+        price = self.price(conid) * (1 + (rng.random() - 0.5) / 100)
+        values = {"31": f"{price:.2f}", "55": f"SYM{conid - 100000}", "84": f"{price - 0.01:.2f}"}
+        values["86"] = f"{price + 0.01:.2f}"
+        row = {"conid": conid, "conidEx": str(conid), "_updated": int(time.time() * 1000)}
+        for field_id in fields:
+            row[field_id] = values.get(field_id, f"{rng.random() * 100:.2f}")
+        return row
+
+    def history(self, conid: int) -> dict:
+        rng = self.random("history", conid)
+        price = self.price(conid)
+        start_ms = int(time.time() // 3600 * 3600 * 1000) - self.settings.size * 3600 * 1000
+        bars = []
+        for i in range(self.settings.size):
+            close = price * (1 + (rng.random() - 0.5) / 50)
+            bars.append(
+                {
+                    "o": round(price, 2),
+                    "c": round(close, 2),
+                    "h": round(max(price, close) * 1.002, 2),
+                    "l": round(min(price, close) * 0.998, 2),
+                    "v": rng.randint(1000, 100000),
+                    "t": start_ms + i * 3600 * 1000,
+                }
+            )
+            price = close
+        return {"symbol": f"SYM{conid - 100000}", "data": bars, "points": len(bars), "barLength": 3600}
+
+    def orders(self) -> List[dict]:
+        return [
+            {
+                "acct": self.account_ids[0],
+                "orderId": 1000 + i,
+                "conid": conid,
+                "ticker": f"SYM{conid - 100000}",
+                "side": "BUY" if i % 2 else "SELL",
+                "status": "Submitted" if i % 3 else "Filled",
+                "totalSize": 10.0,
+                "filledQuantity": 0.0 if i % 3 else 10.0,
+                "price": str(self.price(conid)),
+                "lastExecutionTime_r": int(time.time() * 1000),
+            }
+            for i, conid in enumerate(self.conids)
+        ]
+
+    def trades(self, days: int) -> List[dict]:
+        now_ms = int(time.time() * 1000)
+        return [
+            {
+                "execution_id": f"0000e0d5.{i:08x}.01.01",
+                "account": self.account_ids[0],
+                "conid": conid,
+                "symbol": f"SYM{conid - 100000}",
+                "side": "B" if i % 2 else "S",
+                "size": 10.0,
+                "price": str(self.price(conid)),
+                "trade_time_r": now_ms - i * 60 * 1000 * max(1, days),
+            }
+            for i, conid in enumerate(self.conids)
+        ]
+
+    def scanner_params(self) -> dict:
+        size = self.settings.size
+        return {
+            "scan_type_list": [
+                {"display_name": f"Scan {i}", "code": f"SCAN_{i}", "instruments": ["STK"]} for i in range(size)
+            ],
+            "instrument_list": [
+                {"display_name": "US Stocks", "type": "STK", "filters": [f"filter{i}" for i in range(size)]}
+            ],
+            "filter_list": [
+                {"group": "PriceGroup", "display_name": f"Filter {i}", "code": f"filter{i}", "type": "range"}
+                for i in range(size)
+            ],
+            "location_tree": [
+                {
+                    "display_name": "US Stocks",
+                    "type": "STK",
+                    "locations": [{"display_name": "Major", "type": "STK.US.MAJOR", "locations": []}],
+                }
+            ],
+        }
+
+    def scanner_run(self, scan_type: str) -> dict:
+        rng = self.random("scan", scan_type)
+        conids = rng.sample(self.conids, min(50, len(self.conids)))
+        contracts = [
+            {
+                "server_id": f"q{rank}",
+                "symbol": f"SYM{conid - 100000}",
+                "conidex": str(conid),
+                "con_id": conid,
+                "contract_description_1": f"SYM{conid - 100000}",
+                "listing_exchange": "NASDAQ",
+                "sec_type": "STK",
+            }
+            for rank, conid in enumerate(conids)
+        ]
+        return {"contracts": contracts, "scan_data_column_name": "Chg%"}
+
+    def performance(self, account_ids: List[str]) -> dict:
+        size = self.settings.size
+        dates = [time.strftime("%Y%m%d", time.gmtime(time.time() - (size - i) * 86400)) for i in range(size)]
+        nav, cps = [], []
+        for account_id in account_ids:
+            rng = self.random("performance", account_id)
+            value, navs, returns = 1e5, [], []
+            for _ in dates:
+                value *= 1 + (rng.random() - 0.5) / 50
+                navs.append(round(value, 2))
+                returns.append(round(value / 1e5 - 1, 6))
+            nav.append({"id": account_id, "idType": "acctid", "start": dates[0], "end": dates[-1], "navs": navs})
+            cps.append({"id": account_id, "idType": "acctid", "start": dates[0], "end": dates[-1], "returns": returns})
+        tpps = [{"id": account_id, "idType": "acctid", "returns": [0.01]} for account_id in account_ids]
+        return {
+            "currencyType": "base",
+            "nav": {"data": nav, "dates": dates, "freq": "D"},
+            "cps": {"data": cps, "dates": dates, "freq": "D"},
+            "tpps": {"data": tpps, "dates": [dates[-1][:6]], "freq": "M"},
+            "included": account_ids,
+            "pm": "TWR",
+        }
+
+    def transactions(self, account_ids: List[str], conids: List[int], currency: str) -> dict:
+        transactions = []
+        for account_id in account_ids:
+            for conid in conids:
+                rng = self.random("transactions", account_id, conid)
+                quantity = rng.randint(-50, 50) or 1
+                price = self.price(int(conid))
+                transactions.append(
+                    {
+                        "date": time.strftime("%a %b %d 00:00:00 EST %Y", time.gmtime(time.time() - 86400)),
+                        "cur": currency,
+                        "fxRate": 1,
+                        "pr": price,
+                        "qty": quantity,
+                        "acctid": account_id,
+                        "amt": round(-quantity * price, 2),
+                        "conid": int(conid),
+                        "type": "Buy" if quantity > 0 else "Sell",
+                        "desc": f"Company {int(conid) - 100000}",
+                    }
+                )
+        return {"currency": currency, "transactions": transactions, "includesRealTime": True}
+
+
+class IBKRSimulator:
+    """
+    Local stand-in for the IBKR Web API, for benchmarks and tests that must not touch a real account.
+    It implements the OAuth live session token handshake against #SimulatorCredentials, verifies the
+    signature of every request and serves synthetic data for the endpoints used by #IBKRHttpClient.
+    #handle is independent of the HTTP server and can be called in-process.
+    """
+
+    def __init__(
+        self,
+        credentials: SimulatorCredentials,
+        settings: SimulatorSettings = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        logger: logging.Logger = None,
+    ):
+        self.credentials = credentials
+        self.settings = settings or SimulatorSettings()
+        self.data = SyntheticData(self.settings)
+        self.stats: Counter = Counter()
+        self.__host = host
+        self.__port = port
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__rng = random.Random(self.settings.seed)
+        self.__signature_key = RSA.importKey(credentials.dh_private_signature_path.read_bytes()).publickey()
+        # live session token -> expiration timestamp in seconds
+        self.__live_session_tokens: Dict[str, float] = {}
+        self.__request_times: List[float] = []
+        self.__alerts: Dict[int, dict] = {}
+        self.__next_alert_id = 1
+        self.__watchlists: Dict[str, dict] = {}
+        # conids with a market data subscription, every snapshot subscribes
+        self.__market_data_subscriptions: Dict[int, None] = {}
+        # the brokerage session behind /iserver/*, restarted by /iserver/auth/ssodh/init after an interruption
+        self.__brokerage_session = {"authenticated": True, "competing": False, "connected": True}
+        self.__server: Optional[ThreadingHTTPServer] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__routes = [
+            ("POST", r"/tickle", self.__tickle),
+            ("POST", r"/iserver/auth/ssodh/init", self.__init_brokerage_session),
+            ("POST", r"/logout", lambda m, q, b: {"status": True}),
+            ("GET", r"/iserver/accounts", self.__brokerage_accounts),
+            ("POST", r"/iserver/account", lambda m, q, b: {"set": True, "acctId": b.get("acctId")}),
+            ("GET", r"/portfolio/accounts", self.__accounts),
+            ("GET", r"/portfolio/subaccounts", self.__accounts),
+            ("GET", r"/portfolio/subaccounts2", self.__subaccounts_large),
+            ("POST", r"/portfolio/allocation", lambda m, q, b: self.__allocation(None, None, None)),
+            ("GET", r"/portfolio/positions/(?P<conid>\d+)", self.__position_info),
+            ("GET", r"/portfolio/(?P<account>[^/]+)/meta", lambda m, q, b: self.data.account(m["account"])),
+            ("GET", r"/portfolio/(?P<account>[^/]+)/allocation", self.__allocation),
+            ("GET", r"/portfolio/(?P<account>[^/]+)/combo/positions", lambda m, q, b: []),
+            ("POST", r"/portfolio/(?P<account>[^/]+)/positions/invalidate", lambda m, q, b: {"message": "success"}),
+            ("GET", r"/portfolio/(?P<account>[^/]+)/positions/(?P<page>\d+)", self.__positions_page),
+            ("GET", r"/portfolio2/(?P<account>[^/]+)/positions", lambda m, q, b: self.data.positions(m["account"])),
+            ("GET", r"/portfolio/(?P<account>[^/]+)/position/(?P<conid>\d+)", self.__position),
+            ("GET", r"/portfolio/(?P<account>[^/]+)/summary", lambda m, q, b: self.data.summary(m["account"])),
+            ("GET", r"/portfolio/(?P<account>[^/]+)/ledger", lambda m, q, b: self.data.ledger(m["account"])),
+            ("POST", r"/pa/performance", lambda m, q, b: self.data.performance(b.get("acctIds") or [])),
+            ("POST", r"/pa/transactions", self.__transactions),
+            ("POST", r"/iserver/account/(?P<account>[^/]+)/alert/activate", self.__activate_alert),
+            ("POST", r"/iserver/account/(?P<account>[^/]+)/alert", self.__upsert_alert),
+            ("GET", r"/iserver/account/(?P<account>[^/]+)/alerts", self.__alert_list),
+            ("DELETE", r"/iserver/account/(?P<account>[^/]+)/alert/(?P<alert_id>\d+)", self.__delete_alert),
+            ("GET", r"/iserver/account/alert/(?P<alert_id>\d+)", self.__alert_details),
+            ("POST", r"/iserver/watchlist", self.__create_watchlist),
+            ("GET", r"/iserver/watchlists", self.__watchlists_list),
+            ("GET", r"/iserver/watchlist", self.__watchlist_info),
+            ("DELETE", r"/iserver/watchlist", self.__delete_watchlist),
+            ("GET", r"/iserver/scanner/params", lambda m, q, b: self.data.scanner_params()),
+            ("POST", r"/iserver/scanner/run", lambda m, q, b: self.data.scanner_run(str(b.get("type")))),
+            ("GET", r"/hmds/scanner/params", lambda m, q, b: self.data.scanner_params()),
+            ("GET", r"/hmds/history", lambda m, q, b: self.data.history(int(q.get("conid", 0)))),
+            ("GET", r"/trsrv/secdef", self.__secdef),
+            ("GET", r"/trsrv/all-conids", self.__all_conids),
+            ("GET", r"/trsrv/futures", self.__futures),
+            ("GET", r"/trsrv/stocks", self.__stocks),
+            ("GET", r"/iserver/contract/(?P<conid>\d+)/info", lambda m, q, b: self.data.contract(int(m["conid"]))),
+            ("GET", r"/iserver/contract/(?P<conid>\d+)/info-and-rules", self.__info_and_rules),
+            ("GET", r"/iserver/currency/pairs", self.__currency_pairs),
+            ("GET", r"/iserver/exchangerate", self.__exchange_rate),
+            ("GET", r"/iserver/marketdata/snapshot", self.__snapshot),
+            ("POST", r"/iserver/marketdata/unsubscribe", self.__unsubscribe_market_data),
+            ("GET", r"/iserver/marketdata/unsubscribeall", self.__unsubscribe_all_market_data),
+            ("GET", r"/iserver/account/orders", lambda m, q, b: {"orders": self.data.orders(), "snapshot": True}),
+            ("GET", r"/iserver/account/trades", lambda m, q, b: self.data.trades(int(q.get("days", 7)))),
+        ]
+        self.__routes = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in self.__routes]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.__host}:{self.__port}{API_PREFIX}"
+
+    def client_config(self, **overrides) -> IBKRConfig:
+        return self.credentials.config(self.base_url, **overrides)
+
+    def start(self) -> "IBKRSimulator":
+        handle, logger = self.handle, self.__logger
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, with Nagle every keep-alive response waits for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def respond(self):
+                parts = urlsplit(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                url = f"http://{self.headers.get('Host', '')}{parts.path}"
+                status, headers, content = handle(
+                    self.command, url, dict(parse_qsl(parts.query, keep_blank_values=True)), body, dict(self.headers)
+                )
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_DELETE = respond
+
+        self.__server = ThreadingHTTPServer((self.__host, self.__port), RequestHandler)
+        self.__server.daemon_threads = True
+        self.__port = self.__server.server_address[1]
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name="ibkr-simulator", daemon=True)
+        self.__thread.start()
+        self.__logger.info(f"IBKR simulator listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__thread.join()
+            self.__server = None
+
+    @property
+    def market_data_subscriptions(self) -> List[int]:
+        with self.__lock:
+            return list(self.__market_data_subscriptions)
+
+    def interrupt_brokerage_session(self, competing: bool = False):
+        """Ends the brokerage session as an idle timeout or, with competing, a login elsewhere would."""
+        with self.__lock:
+            self.__brokerage_session.update(authenticated=False, competing=competing)
+
+    def __enter__(self) -> "IBKRSimulator":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def handle(self, method: str, url: str, query: Dict[str, str], body: bytes, headers: Dict[str, str]) -> Response:
+        """
+        Answers one request. url is the full request url without the query string, as it was signed.
+        Returns the status code, the response headers and the response body.
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        path = urlsplit(url).path
+        if not path.startswith(API_PREFIX):
+            return self.__json(404, {"error": "Not found"})
+        endpoint = path[len(API_PREFIX) :] or "/"
+        self.__count("requests")
+        oauth_params = _parse_oauth_header(headers.get("authorization"))
+        if method == "POST" and endpoint == "/oauth/live_session_token":
+            return self.__json(*self.__live_session_token(method, url, oauth_params))
+
+        if any(fnmatchcase(endpoint, pattern) for pattern in self.settings.fault_endpoints):
+            fault = self.__inject_faults()
+            if fault is not None:
+                return fault
+
+        for route_method, pattern, handler in self.__routes:
+            match = pattern.match(endpoint)
+            if match is None or route_method != method:
+                continue
+            if not self.__is_signed(method, url, oauth_params):
+                self.__count("unauthorized")
+                return self.__json(401, {"error": "not authenticated"})
+            if endpoint.startswith("/iserver/") and not endpoint.startswith("/iserver/auth/"):
+                with self.__lock:
+                    authenticated = self.__brokerage_session["authenticated"]
+                if not authenticated:
+                    self.__count("brokerage_unauthenticated")
+                    return self.__json(401, {"error": "not authenticated"})
+            try:
+                payload = json.loads(body.decode("utf-8")) if body else {}
+            except ValueError:
+                return self.__json(400, {"error": "invalid json"})
+            try:
+                return self.__json(200, handler(match.groupdict(), query, payload if isinstance(payload, dict) else {}))
+            except KeyError as e:
+                return self.__json(404, {"error": f"Not found: {e}"})
+        return self.__json(404, {"error": f"Unknown endpoint {method} {endpoint}"})
+
+    def __count(self, name: str, value: int = 1):
+        with self.__lock:
+            self.stats[name] += value
+
+    def __inject_faults(self) -> Optional[Response]:
+        settings = self.settings
+        with self.__lock:
+            delay = settings.latency + self.__rng.random() * settings.latency_jitter
+            throttled = self.__rng.random() < settings.throttle_probability
+            failed = self.__rng.random() < settings.error_probability
+            if settings.max_requests_per_second:
+                now = time.monotonic()
+                self.__request_times = [t for t in self.__request_times if now - t < 1.0]
+                if len(self.__request_times) >= settings.max_requests_per_second:
+                    throttled = True
+                else:
+                    self.__request_times.append(now)
+        if delay > 0:
+            time.sleep(delay)
+        if throttled:
+            self.__count("throttled")
+            return self.__json(429, {"error": "Too many requests"})
+        if failed:
+            self.__count("errors")
+            return self.__json(settings.error_status, {"error": "Simulated error"})
+        return None
+
+    def __is_signed(self, method: str, url: str, oauth_params: Dict[str, str]) -> bool:
+        if not self.settings.verify_signatures:
+            return True
+        if oauth_params.get("oauth_token") != self.credentials.token_access:
+            return False
+        base_string = f"{method}&{quote_plus(url)}&{quote(_oauth_params_string(oauth_params))}".encode("utf-8")
+        signature = unquote_plus(oauth_params.get("oauth_signature", ""))
+        now = time.time()
+        with self.__lock:
+            live_session_tokens = [lst for lst, expires in self.__live_session_tokens.items() if expires > now]
+        for live_session_token in live_session_tokens:
+            expected = HMAC.new(key=base64.b64decode(live_session_token), msg=base_string, digestmod=SHA256).digest()
+            if base64.b64encode(expected).decode("utf-8") == signature:
+                return True
+        return False
+
+    def __live_session_token(self, method: str, url: str, oauth_params: Dict[str, str]) -> Tuple[int, dict]:
+        self.__count("live_session_tokens")
+        credentials = self.credentials
+        if (
+            oauth_params.get("oauth_consumer_key") != credentials.consumer_key
+            or oauth_params.get("oauth_token") != credentials.token_access
+            or "diffie_hellman_challenge" not in oauth_params
+        ):
+            return 401, {"error": "invalid consumer"}
+        base_string = f"{credentials.prepend}{method}&{quote_plus(url)}&{quote(_oauth_params_string(oauth_params))}"
+        try:
+            signature = base64.b64decode(unquote_plus(oauth_params.get("oauth_signature", "")))
+            pkcs1_15.new(self.__signature_key).verify(SHA256.new(base_string.encode("utf-8")), signature)
+        except (ValueError, TypeError):
+            return 401, {"error": "invalid signature"}
+
+        dh_random = random.getrandbits(256)
+        dh_response = pow(RFC3526_GROUP14_GENERATOR, dh_random, RFC3526_GROUP14_PRIME)
+        k = pow(int(oauth_params["diffie_hellman_challenge"], 16), dh_random, RFC3526_GROUP14_PRIME)
+        live_session_token = base64.b64encode(
+            HMAC.new(key=_k_bytes(k), msg=bytes.fromhex(credentials.prepend), digestmod=SHA1).digest()
+        ).decode("utf-8")
+        lst_signature = HMAC.new(
+            key=base64.b64decode(live_session_token), msg=credentials.consumer_key.encode("utf-8"), digestmod=SHA1
+        ).hexdigest()
+        expiration = time.time() + self.settings.lst_lifetime
+        with self.__lock:
+            self.__live_session_tokens[live_session_token] = expiration
+        return 200, {
+            "diffie_hellman_response": hex(dh_response)[2:],
+            "live_session_token_signature": lst_signature,
+            "live_session_token_expiration": int(expiration * 1000),
+        }
+
+    @staticmethod
+    def __json(status: int, payload) -> Response:
+        return status, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8")
+
+    def __tickle(self, match, query, body) -> dict:
+        with self.__lock:
+            auth_status = dict(self.__brokerage_session)
+        return {"session": os.urandom(16).hex(), "iserver": {"authStatus": auth_status}}
+
+    def __init_brokerage_session(self, match, query, body) -> dict:
+        self.__count("brokerage_sessions")
+        with self.__lock:
+            self.__brokerage_session.update(authenticated=True, competing=False)
+            return dict(self.__brokerage_session)
+
+    def __brokerage_accounts(self, match, query, body) -> dict:
+        return {"accounts": self.data.account_ids, "selectedAccount": self.data.account_ids[0]}
+
+    def __accounts(self, match, query, body) -> List[dict]:
+        return [self.data.account(account_id) for account_id in self.data.account_ids]
+
+    def __subaccounts_large(self, match, query, body) -> dict:
+        page, page_size = int(query.get("page", 0)), 100
+        account_ids = self.data.account_ids
+        subaccounts = [self.data.account(account_id) for account_id in account_ids[page * page_size :][:page_size]]
+        return {
+            "metadata": {"total": len(account_ids), "pageSize": page_size, "pageNum": page},
+            "subaccounts": subaccounts,
+        }
+
+    def __allocation(self, match, query, body) -> dict:
+        return {
+            "assetClass": {"long": {"STK": 1000.0, "CASH": 500.0}, "short": {}},
+            "sector": {"long": {"Technology": 1000.0}, "short": {}},
+            "group": {"long": {"Computers": 1000.0}, "short": {}},
+        }
+
+    def __positions_page(self, match, query, body) -> List[dict]:
+        page = int(match["page"])
+        return self.data.positions(match["account"])[page * 100 : (page + 1) * 100]
+
+    def __position(self, match, query, body) -> List[dict]:
+        return [self.data.position(match["account"], int(match["conid"]))]
+
+    def __position_info(self, match, query, body) -> dict:
+        conid = int(match["conid"])
+        return {account_id: [self.data.position(account_id, conid)] for account_id in self.data.account_ids}
+
+    def __transactions(self, match, query, body) -> dict:
+        return self.data.transactions(body.get("acctIds") or [], body.get("conids") or [], body.get("currency", "USD"))
+
+    def __upsert_alert(self, match, query, body) -> dict:
+        with self.__lock:
+            alert_id = body.get("order_id")
+            if alert_id is None:
+                alert_id = self.__next_alert_id
+                self.__next_alert_id += 1
+            elif int(alert_id) not in self.__alerts:
+                return {"success": False, "text": f"Alert {alert_id} does not exist"}
+            alert_id = int(alert_id)
+            active = self.__alerts.get(alert_id, {}).get("alert_active", 1)
+            self.__alerts[alert_id] = {
+                "account": match["account"],
+                "order_id": alert_id,
+                "alert_name": body.get("alertName"),
+                "alert_message": body.get("alertMessage"),
+                "alert_active": active,
+                "alert_repeatable": body.get("alertRepeatable"),
+                "tif": body.get("tif"),
+                "expire_time": body.get("expireTime"),
+                "conditions": [
+                    {
+                        "conidex": condition.get("conidex"),
+                        "condition_type": condition.get("type"),
+                        "condition_operator": condition.get("operator"),
+                        "condition_logic_bind": condition.get("logicBind"),
+                        "condition_value": condition.get("value"),
+                        "condition_trigger_method": condition.get("triggerMethod"),
+                    }
+                    for condition in body.get("conditions") or []
+                ],
+            }
+        return {"request_id": None, "order_id": alert_id, "success": True, "text": "Submitted"}
+
+    def __activate_alert(self, match, query, body) -> dict:
+        with self.__lock:
+            alert = self.__alerts.get(int(body.get("alertId", -1)))
+            if alert is None:
+                return {"success": False, "text": "Alert does not exist"}
+            alert["alert_active"] = int(body.get("alertActive", 1))
+        return {"request_id": None, "order_id": alert["order_id"], "success": True, "text": "Request was submitted"}
+
+    def __alert_list(self, match, query, body) -> List[dict]:
+        with self.__lock:
+            return [
+                {key: alert[key] for key in ("order_id", "account", "alert_name", "alert_active")}
+                for alert in self.__alerts.values()
+                if alert["account"] == match["account"]
+            ]
+
+    def __delete_alert(self, match, query, body) -> dict:
+        alert_id = int(match["alert_id"])
+        with self.__lock:
+            if alert_id == 0:
+                self.__alerts = {k: v for k, v in self.__alerts.items() if v["account"] != match["account"]}
+            elif self.__alerts.pop(alert_id, None) is None:
+                return {"success": False, "text": f"Alert {alert_id} does not exist"}
+        return {"request_id": None, "order_id": alert_id, "success": True, "text": "Request was submitted"}
+
+    def __alert_details(self, match, query, body) -> dict:
+        with self.__lock:
+            return dict(self.__alerts[int(match["alert_id"])])
+
+    def __create_watchlist(self, match, query, body) -> dict:
+        watchlist_id = str(body.get("id"))
+        instruments = [{"C": str(row.get("C")), "conid": int(row.get("C"))} for row in body.get("rows") or []]
+        with self.__lock:
+            self.__watchlists[watchlist_id] = {"id": watchlist_id, "name": body.get("name"), "instruments": instruments}
+        return {"id": watchlist_id, "hash": str(int(time.time() * 1000)), "name": body.get("name"), "readOnly": False}
+
+    def __watchlists_list(self, match, query, body) -> dict:
+        with self.__lock:
+            user_lists = [
+                {"id": watchlist["id"], "name": watchlist["name"], "read_only": False, "type": "watchlist"}
+                for watchlist in self.__watchlists.values()
+            ]
+        return {"data": {"scanners_only": False, "show_scanners": False, "user_lists": user_lists}, "action": "content"}
+
+    def __watchlist_info(self, match, query, body) -> dict:
+        with self.__lock:
+            return dict(self.__watchlists[query.get("id")])
+
+    def __delete_watchlist(self, match, query, body) -> dict:
+        with self.__lock:
+            deleted = self.__watchlists.pop(query.get("id"), None)
+        if deleted is None:
+            raise KeyError(query.get("id"))
+        return {"data": {"deleted": deleted["id"]}, "action": "context", "MID": "1"}
+
+    def __secdef(self, match, query, body) -> dict:
+        conids = [int(conid) for conid in query.get("conids", "").split(",") if conid]
+        return {"secdef": [self.data.contract(conid) for conid in conids]}
+
+    def __all_conids(self, match, query, body) -> List[dict]:
+        return [
+            {"ticker": f"SYM{conid - 100000}", "conid": conid, "exchange": query.get("exchange")}
+            for conid in self.data.conids
+        ]
+
+    def __futures(self, match, query, body) -> dict:
+        return {
+            symbol: [
+                {"symbol": symbol, "conid": 500000 + i, "underlyingConid": 100000, "expirationDate": 20300101 + i}
+                for i in range(3)
+            ]
+            for symbol in query.get("symbols", "").split(",")
+            if symbol
+        }
+
+    def __stocks(self, match, query, body) -> dict:
+        return {
+            symbol: [
+                {
+                    "name": f"{symbol} Inc",
+                    "assetClass": "STK",
+                    "contracts": [{"conid": 100000 + sum(map(ord, symbol)), "exchange": "NASDAQ", "isUS": True}],
+                }
+            ]
+            for symbol in query.get("symbols", "").split(",")
+            if symbol
+        }
+
+    def __info_and_rules(self, match, query, body) -> dict:
+        conid = int(match["conid"])
+        return dict(self.data.contract(conid), rules={"orderTypes": ["limit", "market"], "defaultSize": 100})
+
+    def __currency_pairs(self, match, query, body) -> dict:
+        currency = query.get("currency", "USD")
+        pairs = [{"symbol": f"{currency}.{target}", "conid": 12087792, "ccyPair": target} for target in ("EUR", "GBP")]
+        return {currency: pairs}
+
+    def __exchange_rate(self, match, query, body) -> dict:
+        rng = self.data.random("fx", query.get("source"), query.get("target"))
+        return {"rate": 1.0 if query.get("source") == query.get("target") else round(0.5 + rng.random(), 6)}
+
+    def __snapshot(self, match, query, body) -> List[dict]:
+        conids = [int(conid) for conid in query.get("conids", "").split(",") if conid]
+        fields = [field_id for field_id in query.get("fields", "").split(",") if field_id]
+        lines = self.settings.market_data_lines
+        with self.__lock:
+            for conid in conids:
+                if conid not in self.__market_data_subscriptions:
+                    if lines is not None and len(self.__market_data_subscriptions) >= lines:
+                        continue
+                    self.__market_data_subscriptions[conid] = None
+            subscribed = set(self.__market_data_subscriptions)
+        self.__count("line_limit_misses", sum(conid not in subscribed for conid in conids))
+        # like IBKR, contracts without a free market data line only get their conid back
+        return [self.data.snapshot(conid, fields) if conid in subscribed else {"conid": conid} for conid in conids]
+
+    def __unsubscribe_market_data(self, match, query, body) -> dict:
+        with self.__lock:
+            found = self.__market_data_subscriptions.pop(int(body.get("conid", 0)), False) is None
+        return {"success": f"uid: {body.get('conid')} unsubscribed"} if found else {"error": "unsubscribe failed"}
+
+    def __unsubscribe_all_market_data(self, match, query, body) -> dict:
+        with self.__lock:
+            self.__market_data_subscriptions.clear()
+        return {"unsubscribed": True}
+
+
+class StreamSimulator:
+    """
+    Local stand-in for the /ws websocket of the Web API, for #MarketDataStream benchmarks and tests.
+    Accepts connections with the oauth_token of the simulator credentials and an api session cookie and answers
+    smd+/umd+ market data subscriptions with one tick per subscribed conid every tick_interval.
+    Needs `websockets`, the server runs on its own event loop in a background thread.
+    """
+
+    def __init__(
+        self,
+        simulator: IBKRSimulator,
+        tick_interval: float = 0.05,
+        heartbeat_interval: float = 1.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        logger: logging.Logger = None,
+    ):
+        self.simulator = simulator
+        self.tick_interval = tick_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stats: Counter = Counter()
+        self.__host = host
+        self.__port = port
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__connections: Dict[object, Dict[int, List[str]]] = {}
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__server = None
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.__host}:{self.__port}{API_PREFIX}/ws?oauth_token={self.simulator.credentials.token_access}"
+
+    @property
+    def subscriptions(self) -> List[Dict[int, List[str]]]:
+        """The subscriptions of every open connection."""
+        return [dict(subscriptions) for subscriptions in list(self.__connections.values())]
+
+    def start(self) -> "StreamSimulator":
+        try:
+            from websockets.asyncio.server import serve
+        except ImportError as e:
+            raise ImportError("StreamSimulator needs websockets, install it with `pip install websockets`") from e
+        self.__loop = asyncio.new_event_loop()
+        started = threading.Event()
+        errors = []
+
+        async def listen():
+            return await serve(self.__serve, self.__host, self.__port, process_request=self.__authorize)
+
+        def run():
+            asyncio.set_event_loop(self.__loop)
+            try:
+                self.__server = self.__loop.run_until_complete(listen())
+                self.__port = self.__server.sockets[0].getsockname()[1]
+            except Exception as e:
+                errors.append(e)
+                return
+            finally:
+                started.set()
+            self.__loop.run_forever()
+
+        self.__thread = threading.Thread(target=run, name="ibkr-stream-simulator", daemon=True)
+        self.__thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        self.__logger.info(f"IBKR stream simulator listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self.__server is not None:
+            asyncio.run_coroutine_threadsafe(self.__shutdown(), self.__loop).result()
+            self.__loop.call_soon_threadsafe(self.__loop.stop)
+            self.__thread.join()
+            self.__loop.close()
+            self.__server = None
+
+    def drop_connections(self):
+        """Closes every open connection as a network failure or server restart would."""
+        asyncio.run_coroutine_threadsafe(self.__drop_connections(), self.__loop).result()
+
+    def __enter__(self) -> "StreamSimulator":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    async def __shutdown(self):
+        self.__server.close()
+        await self.__server.wait_closed()
+
+    async def __drop_connections(self):
+        for connection in list(self.__connections):
+            await connection.close(1012, "service restart")
+
+    def __authorize(self, connection, request):
+        parts = urlsplit(request.path)
+        if parts.path != f"{API_PREFIX}/ws":
+            return connection.respond(404, "Not found\n")
+        oauth_token = dict(parse_qsl(parts.query)).get("oauth_token")
+        if oauth_token != self.simulator.credentials.token_access or "api=" not in request.headers.get("Cookie", ""):
+            self.stats["rejected"] += 1
+            return connection.respond(401, "not authenticated\n")
+        return None
+
+    async def __serve(self, connection):
+        self.stats["connections"] += 1
+        subscriptions: Dict[int, List[str]] = {}
+        self.__connections[connection] = subscriptions
+        await connection.send(json.dumps({"topic": "system", "success": "user"}))
+        await connection.send(json.dumps({"topic": "sts", "args": {"authenticated": True, "competing": False}}))
+        publisher = asyncio.ensure_future(self.__publish(connection, subscriptions))
+        try:
+            async for message in connection:
+                self.__receive(message, subscriptions)
+        except Exception as e:
+            self.__logger.debug(f"Stream connection closed: {e}")
+        finally:
+            publisher.cancel()
+            self.__connections.pop(connection, None)
+
+    def __receive(self, message: Union[str, bytes], subscriptions: Dict[int, List[str]]):
+        message = message.decode("utf-8") if isinstance(message, bytes) else message
+        if message == "tic":
+            self.stats["heartbeats"] += 1
+        elif message.startswith("smd+"):
+            _, conid, args = (message.split("+", 2) + [""])[:3]
+            subscriptions[int(conid)] = [str(field_id) for field_id in json.loads(args or "{}").get("fields", [])]
+            self.stats["subscribes"] += 1
+        elif message.startswith("umd+"):
+            subscriptions.pop(int(message.split("+", 2)[1]), None)
+            self.stats["unsubscribes"] += 1
+
+    async def __publish(self, connection, subscriptions: Dict[int, List[str]]):
+        next_heartbeat = time.monotonic() + self.heartbeat_interval
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            for conid, fields in list(subscriptions.items()):
+                tick = self.simulator.data.snapshot(conid, fields)
+                await connection.send(json.dumps(dict(tick, topic=f"smd+{conid}")))
+                self.stats["ticks"] += 1
+            if time.monotonic() >= next_heartbeat:
+                await connection.send(json.dumps({"topic": "system", "hb": int(time.time() * 1000)}))
+                next_heartbeat += self.heartbeat_interval
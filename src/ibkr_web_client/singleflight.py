@@ -0,0 +1,77 @@
+import json
+import threading
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, Hashable, Sequence
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight requests: while a call for a key is running, later callers with the same key
+    wait for its result instead of sending a duplicate request.
+    Endpoints are selected with shell-style patterns, `exclude` wins over `include`.
+    """
+
+    def __init__(self, include: Sequence[str] = ("*",), exclude: Sequence[str] = ()):
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.__lock = threading.Lock()
+        self.__calls: Dict[Hashable, _Call] = {}
+        self.__executed = 0
+        self.__coalesced = 0
+
+    @staticmethod
+    def make_key(method: str, endpoint: str, params: dict = None, json_content: dict = None) -> Hashable:
+        endpoint = "/" + endpoint.lstrip("/")
+        return (
+            method,
+            endpoint,
+            json.dumps(params or {}, sort_keys=True, default=str),
+            json.dumps(json_content or {}, sort_keys=True, default=str),
+        )
+
+    def enabled_for(self, endpoint: str) -> bool:
+        endpoint = "/" + endpoint.lstrip("/")
+        if any(fnmatchcase(endpoint, pattern) for pattern in self.exclude):
+            return False
+        return any(fnmatchcase(endpoint, pattern) for pattern in self.include)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Runs fn once for all concurrent callers with the same key and returns (or raises) its outcome."""
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.__calls[key] = call
+                self.__executed += 1
+            else:
+                self.__coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+        return call.result
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            return {"executed": self.__executed, "coalesced": self.__coalesced, "in_flight": len(self.__calls)}
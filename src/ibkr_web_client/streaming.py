@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .client import IBKRHttpClient
+from .ibkr_types import MarketDataField
+
+
+DEFAULT_HEARTBEAT_INTERVAL = 25.0  # seconds between "tic" messages, IBKR closes idle websockets after about a minute
+DEFAULT_QUEUE_SIZE = 10000
+
+
+@dataclass
+class Tick:
+    """
+    A market data update of one contract. fields holds only the fields that changed, keyed by field id
+    as in #IBKRHttpClient.get_live_market_data_snapshot rows.
+    """
+
+    conid: int
+    fields: Dict[str, str]
+    updated: Optional[int] = None  # server timestamp in ms
+    received_at: float = field(default_factory=time.time)
+
+    def get(self, market_data_field: MarketDataField, default: str = None) -> Optional[str]:
+        return self.fields.get(str(market_data_field.value), default)
+
+    def as_snapshot_row(self) -> dict:
+        """The tick in the shape of a snapshot row, e.g. for #AlertEvaluator.evaluate."""
+        return {"conid": self.conid, "_updated": self.updated, **self.fields}
+
+
+class MarketDataStream:
+    """
+    Streams market data over the Web API websocket instead of polling snapshots.
+
+    The connection is authenticated with the OAuth access token and the session cookie returned by /tickle,
+    subscriptions are kept and sent again after every reconnect. A "tic" heartbeat keeps the connection open.
+    Ticks are delivered to callbacks and to the async iterator, a slow consumer loses the oldest ticks first.
+
+        async with MarketDataStream(client) as stream:
+            await stream.subscribe(265598, [MarketDataField.LAST_PRICE, MarketDataField.BID_PRICE])
+            async for tick in stream:
+                print(tick.conid, tick.get(MarketDataField.LAST_PRICE))
+
+    Needs `websockets` (`pip install ibkr_web_client[streaming]`).
+    """
+
+    def __init__(
+        self,
+        client: IBKRHttpClient,
+        url: str = None,
+        heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        logger: logging.Logger = None,
+    ):
+        try:
+            from websockets.asyncio.client import connect
+        except ImportError as e:
+            raise ImportError("MarketDataStream needs websockets, install it with `pip install websockets`") from e
+        self.url = url or client.websocket_url()
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.stats: Counter = Counter()
+        self.authenticated: Optional[bool] = None
+        self.__connect = connect
+        self.__client = client
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__subscriptions: Dict[int, Tuple[str, ...]] = {}
+        self.__callbacks: List[Callable[[Tick], None]] = []
+        self.__queue: Optional[asyncio.Queue] = None
+        self.__queue_size = queue_size
+        self.__websocket = None
+        self.__task: Optional[asyncio.Task] = None
+        self.__connected: Optional[asyncio.Event] = None
+        self.__closed = False
+
+    @property
+    def subscriptions(self) -> Dict[int, Tuple[str, ...]]:
+        return dict(self.__subscriptions)
+
+    @property
+    def connected(self) -> bool:
+        return self.__websocket is not None
+
+    def on_tick(self, callback: Callable[[Tick], None]):
+        self.__callbacks.append(callback)
+
+    async def subscribe(self, conid: int, fields: Sequence[Union[MarketDataField, str]]):
+        field_ids = tuple(str(f.value) if isinstance(f, MarketDataField) else str(f) for f in fields)
+        self.__subscriptions[int(conid)] = field_ids
+        await self.__send(self.__subscribe_message(int(conid), field_ids))
+
+    async def unsubscribe(self, conid: int):
+        if self.__subscriptions.pop(int(conid), None) is not None:
+            await self.__send(f"umd+{int(conid)}+{{}}")
+
+    async def connect(self, timeout: float = None) -> "MarketDataStream":
+        """Starts the connection in the background and waits until it is open."""
+        if self.__task is None:
+            self.__closed = False
+            self.__queue = asyncio.Queue(self.__queue_size)
+            self.__connected = asyncio.Event()
+            self.__task = asyncio.ensure_future(self.__run())
+        await asyncio.wait_for(self.__connected.wait(), timeout)
+        return self
+
+    async def close(self):
+        self.__closed = True
+        if self.__websocket is not None:
+            await self.__websocket.close()
+        if self.__task is not None:
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+            self.__task = None
+        if self.__queue is not None:
+            self.__put(None)
+
+    async def ticks(self) -> AsyncIterator[Tick]:
+        """Yields ticks until the stream is closed."""
+        while True:
+            tick = await self.__queue.get()
+            if tick is None:
+                return
+            yield tick
+
+    def __aiter__(self) -> AsyncIterator[Tick]:
+        return self.ticks()
+
+    async def __aenter__(self) -> "MarketDataStream":
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @staticmethod
+    def __subscribe_message(conid: int, field_ids: Tuple[str, ...]) -> str:
+        return f"smd+{conid}+{json.dumps({'fields': list(field_ids)})}"
+
+    async def __send(self, message: str):
+        websocket = self.__websocket
+        if websocket is None:
+            # sent on the next connect
+            return
+        try:
+            await websocket.send(message)
+        except Exception as e:
+            self.__logger.warning(f"Could not send {message}, it is sent again after reconnecting: {e}")
+
+    async def __run(self):
+        loop = asyncio.get_running_loop()
+        delay = self.reconnect_delay
+        while not self.__closed:
+            try:
+                # /tickle is a blocking HTTP call, it returns the session the websocket is authenticated with
+                tickle = await loop.run_in_executor(None, self.__client.tickle)
+                session = (tickle or {}).get("session")
+                if not session:
+                    raise ConnectionError(f"No session in tickle response: {tickle}")
+                async with self.__connect(self.url, additional_headers={"Cookie": f"api={session}"}) as websocket:
+                    await self.__on_connect(websocket)
+                    delay = self.reconnect_delay
+                    heartbeat = asyncio.ensure_future(self.__heartbeat(websocket))
+                    try:
+                        async for message in websocket:
+                            self.__dispatch(message)
+                    finally:
+                        heartbeat.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.__logger.warning(f"Market data stream disconnected: {e}")
+            finally:
+                self.__websocket = None
+                self.__connected.clear()
+            if self.__closed:
+                break
+            self.stats["reconnects"] += 1
+            self.__logger.info(f"Reconnecting market data stream in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def __on_connect(self, websocket):
+        # set first, subscriptions added while the others are sent go out directly
+        self.__websocket = websocket
+        self.stats["connects"] += 1
+        for conid, field_ids in list(self.__subscriptions.items()):
+            await websocket.send(self.__subscribe_message(conid, field_ids))
+            if self.stats["connects"] > 1:
+                self.stats["resubscriptions"] += 1
+        self.__connected.set()
+        self.__logger.info(f"Market data stream connected with {len(self.__subscriptions)} subscriptions")
+
+    async def __heartbeat(self, websocket):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await websocket.send("tic")
+            self.stats["heartbeats_sent"] += 1
+
+    def __dispatch(self, message: Union[str, bytes]):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            self.__logger.debug(f"Ignoring non JSON message {message!r}")
+            return
+        if not isinstance(payload, dict):
+            return
+        topic = str(payload.get("topic", ""))
+        if topic.startswith("smd+"):
+            try:
+                conid = int(payload.get("conid") or topic[4:])
+            except ValueError:
+                return
+            if conid not in self.__subscriptions:
+                return
+            fields = {key: value for key, value in payload.items() if key.isdigit()}
+            self.__deliver(Tick(conid, fields, payload.get("_updated")))
+        elif topic == "system" and "hb" in payload:
+            self.stats["heartbeats_received"] += 1
+        elif topic == "sts":
+            self.authenticated = (payload.get("args") or {}).get("authenticated")
+        elif "error" in payload:
+            self.__logger.error(f"Market data stream error: {payload['error']}")
+
+    def __deliver(self, tick: Tick):
+        self.stats["ticks"] += 1
+        for callback in self.__callbacks:
+            try:
+                callback(tick)
+            except Exception as e:
+                self.__logger.error(f"Tick callback failed for {tick.conid}: {e}")
+        self.__put(tick)
+
+    def __put(self, tick: Optional[Tick]):
+        if self.__queue.full():
+            self.__queue.get_nowait()
+            self.stats["dropped"] += 1
+        self.__queue.put_nowait(tick)
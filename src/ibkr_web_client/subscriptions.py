@@ -0,0 +1,179 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Evicting at least this share of the active subscriptions is done with one unsubscribe-all call
+DEFAULT_UNSUBSCRIBE_ALL_RATIO = 0.5
+
+
+class MarketDataSubscriptions:
+    """
+    Tracks the server side market data subscriptions opened by #IBKRHttpClient.get_live_market_data_snapshot,
+    least recently used first, with the fields requested per conid.
+
+    With a line_budget, subscriptions are evicted before a snapshot would exceed it: the least recently used
+    conids are unsubscribed one by one, or all at once when that frees most of the lines anyway.
+    Conids of a single snapshot are never evicted to make room for each other.
+    """
+
+    def __init__(
+        self,
+        unsubscribe: Callable[[int], object],
+        unsubscribe_all: Callable[[], object],
+        line_budget: Optional[int] = None,
+        unsubscribe_all_ratio: float = DEFAULT_UNSUBSCRIBE_ALL_RATIO,
+        logger: logging.Logger = None,
+    ):
+        if line_budget is not None and line_budget <= 0:
+            raise ValueError("Market data line budget must be positive")
+        self.line_budget = line_budget
+        self.unsubscribe_all_ratio = unsubscribe_all_ratio
+        self.__unsubscribe = unsubscribe
+        self.__unsubscribe_all = unsubscribe_all
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__active: "OrderedDict[int, Tuple[str, ...]]" = OrderedDict()
+        self.__pending: Set[int] = set()
+        self.__peak = 0
+        self.__counters = {
+            "subscribed": 0,
+            "reused": 0,
+            "evicted": 0,
+            "unsubscribe_calls": 0,
+            "unsubscribe_all_calls": 0,
+            "unsubscribe_failures": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self.__active)
+
+    def __contains__(self, conid: int) -> bool:
+        return int(conid) in self.__active
+
+    @property
+    def active(self) -> Dict[int, Tuple[str, ...]]:
+        """Subscribed conids and their fields, least recently used first."""
+        with self.__lock:
+            return dict(self.__active)
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            active = len(self.__active)
+            return {
+                "active": active,
+                "peak": self.__peak,
+                "line_budget": self.line_budget,
+                "occupancy": active / self.line_budget if self.line_budget else None,
+                **self.__counters,
+            }
+
+    def acquire(self, conids: Iterable[int], fields: Iterable[str] = ()) -> List[int]:
+        """
+        Marks conids as used by a snapshot with the given field ids, evicting other subscriptions if the
+        budget requires it. Returns the evicted conids.
+        Newly subscribed conids stay pending until #confirm, #rollback releases them if the snapshot failed.
+        """
+        conids = list(dict.fromkeys(int(conid) for conid in conids))
+        fields = tuple(str(field_id) for field_id in fields)
+        if self.line_budget is not None and len(conids) > self.line_budget:
+            raise ValueError(f"Snapshot of {len(conids)} conids exceeds the market data line budget {self.line_budget}")
+        with self.__lock:
+            new = [conid for conid in conids if conid not in self.__active]
+            excess = len(self.__active) + len(new) - self.line_budget if self.line_budget is not None else 0
+            evicted, everything = self.__evict(excess, set(conids))
+            for conid in conids:
+                previous = self.__active.pop(conid, None)
+                if previous is None:
+                    self.__counters["subscribed"] += 1
+                    self.__active[conid] = fields
+                    self.__pending.add(conid)
+                else:
+                    self.__counters["reused"] += 1
+                    # requested fields stay on the subscription
+                    self.__active[conid] = previous + tuple(f for f in fields if f not in previous)
+            self.__peak = max(self.__peak, len(self.__active))
+        # the unsubscribe requests go out after the lock is released, other snapshots do not wait for them
+        self.__unsubscribe_evicted(evicted, everything)
+        return evicted
+
+    def confirm(self, conids: Iterable[int]):
+        """Marks the pending subscriptions of a successful snapshot as held by the server."""
+        with self.__lock:
+            self.__pending.difference_update(int(conid) for conid in conids)
+
+    def rollback(self, conids: Iterable[int]):
+        """Releases the pending subscriptions of a failed snapshot, conids held before it are kept."""
+        with self.__lock:
+            pending = [conid for conid in map(int, conids) if conid in self.__pending]
+            for conid in pending:
+                self.__pending.discard(conid)
+                self.__active.pop(conid, None)
+        self.__unsubscribe_evicted(pending, False)
+
+    def release(self, conids: Iterable[int]):
+        """Unsubscribes conids now."""
+        with self.__lock:
+            released = [conid for conid in map(int, conids) if self.__active.pop(conid, None) is not None]
+            self.__pending.difference_update(released)
+        self.__unsubscribe_evicted(released, False)
+
+    def release_all(self):
+        """Unsubscribes every market data subscription of the session."""
+        with self.__lock:
+            self.__active.clear()
+            self.__pending.clear()
+        self.__unsubscribe_evicted([], True)
+
+    def forget(self, conids: Iterable[int] = None):
+        """Stops tracking conids, e.g. after they were unsubscribed elsewhere. All conids if None."""
+        with self.__lock:
+            if conids is None:
+                self.__active.clear()
+                self.__pending.clear()
+            for conid in conids or []:
+                self.__active.pop(int(conid), None)
+                self.__pending.discard(int(conid))
+
+    def __evict(self, excess: int, keep: set) -> Tuple[List[int], bool]:
+        """Drops the victims from the tracked state, returns them and whether to unsubscribe all at once."""
+        if excess <= 0:
+            return [], False
+        candidates = [conid for conid in self.__active if conid not in keep]
+        victims = candidates[:excess]
+        if len(victims) >= len(self.__active) * self.unsubscribe_all_ratio:
+            self.__logger.info(f"Evicting {len(candidates)} market data subscriptions with one unsubscribe all")
+            # the conids of this snapshot are subscribed again by the snapshot itself
+            self.__counters["evicted"] += len(candidates)
+            self.__active.clear()
+            self.__pending.clear()
+            return candidates, True
+        self.__counters["evicted"] += len(victims)
+        self.__logger.info(f"Evicting {len(victims)} least recently used market data subscriptions")
+        for conid in victims:
+            del self.__active[conid]
+            self.__pending.discard(conid)
+        return victims, False
+
+    def __unsubscribe_evicted(self, conids: List[int], everything: bool):
+        if everything:
+            self.__count("unsubscribe_all_calls")
+            try:
+                self.__unsubscribe_all()
+            except Exception as e:
+                self.__count("unsubscribe_failures")
+                self.__logger.error(f"Unsubscribing all market data failed: {e}")
+            return
+        for conid in conids:
+            self.__count("unsubscribe_calls")
+            try:
+                self.__unsubscribe(conid)
+            except Exception as e:
+                self.__count("unsubscribe_failures")
+                self.__logger.error(f"Unsubscribing market data of {conid} failed: {e}")
+
+    def __count(self, name: str):
+        with self.__lock:
+            self.__counters[name] += 1
@@ -0,0 +1,204 @@
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from .client import IBKRHttpClient
+from .utils_tables import to_float, to_int
+
+
+# /iserver/account/trades can not look back further than this
+MAX_TRADE_DAYS = 7
+DAY_MS = 24 * 60 * 60 * 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    execution_id TEXT PRIMARY KEY,
+    account TEXT,
+    conid INTEGER,
+    trade_time_ms INTEGER NOT NULL,
+    symbol TEXT,
+    side TEXT,
+    size REAL,
+    price REAL,
+    commission REAL,
+    net_amount REAL,
+    raw TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trades_time_idx ON trades (trade_time_ms);
+CREATE INDEX IF NOT EXISTS trades_account_time_idx ON trades (account, trade_time_ms);
+CREATE INDEX IF NOT EXISTS trades_conid_time_idx ON trades (conid, trade_time_ms);
+CREATE TABLE IF NOT EXISTS gaps (
+    start_ms INTEGER PRIMARY KEY,
+    end_ms INTEGER NOT NULL
+);
+"""
+
+
+class TradeJournal:
+    """
+    Append-only local journal of executions returned by #get_trades, stored in SQLite.
+    Executions are indexed by execution id, account, conid and trade time, so range queries
+    over months of fills are served locally.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:", logger: logging.Logger = None):
+        self.__logger = logger or logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.__connection.executescript(_SCHEMA)
+        self.__connection.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    @property
+    def last_trade_time_ms(self) -> Optional[int]:
+        with self.__lock:
+            return self.__connection.execute("SELECT MAX(trade_time_ms) FROM trades").fetchone()[0]
+
+    def sync_window_days(self, now_ms: int = None) -> int:
+        """
+        Smallest #get_trades window that still covers everything since the last journaled execution.
+        One extra day is kept, because trade_time_r and the server side day boundaries do not line up.
+        """
+        last_trade_time_ms = self.last_trade_time_ms
+        if last_trade_time_ms is None:
+            return MAX_TRADE_DAYS
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        days = math.ceil(max(0, now_ms - last_trade_time_ms) / DAY_MS) + 1
+        return max(1, min(MAX_TRADE_DAYS, days))
+
+    def uncovered_interval(self, now_ms: int = None) -> Optional[Tuple[int, int]]:
+        """
+        (start_ms, end_ms) between the last journaled execution and the oldest execution #get_trades can still
+        return, None if the next sync covers everything.
+        """
+        last_trade_time_ms = self.last_trade_time_ms
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        window_start_ms = now_ms - MAX_TRADE_DAYS * DAY_MS
+        if last_trade_time_ms is None or last_trade_time_ms >= window_start_ms:
+            return None
+        return last_trade_time_ms, window_start_ms
+
+    def gaps(self) -> List[Tuple[int, int]]:
+        """Intervals (start_ms, end_ms) no sync could cover, executions in them have to be backfilled elsewhere."""
+        with self.__lock:
+            return [tuple(row) for row in self.__connection.execute("SELECT start_ms, end_ms FROM gaps ORDER BY 1")]
+
+    def clear_gap(self, start_ms: int):
+        """Forgets a gap after its executions were backfilled with #append."""
+        with self.__lock:
+            self.__connection.execute("DELETE FROM gaps WHERE start_ms = ?", (int(start_ms),))
+            self.__connection.commit()
+
+    def sync(self, client: IBKRHttpClient, now_ms: int = None) -> int:
+        """
+        Fetches trades for the smallest needed window and appends only new executions.
+        Returns the number of executions added to the journal. When the last journaled execution is older than
+        #get_trades can look back, the uncovered interval is logged and recorded in #gaps.
+        """
+        gap = self.uncovered_interval(now_ms)
+        if gap is not None:
+            self.__logger.warning(f"Trade journal has no executions between {gap[0]} and {gap[1]} ms, backfill them")
+            with self.__lock:
+                self.__connection.execute("INSERT OR REPLACE INTO gaps VALUES (?,?)", gap)
+                self.__connection.commit()
+        days = self.sync_window_days(now_ms)
+        self.__logger.debug(f"Syncing trade journal with a {days} day window")
+        response = client.get_trades(days=days)
+        if not isinstance(response, list):
+            self.__logger.error(f"Unexpected trades response: {response}")
+            return 0
+        return self.append(response)
+
+    def append(self, trade_lst: List[dict]) -> int:
+        rows = []
+        for trade in trade_lst:
+            execution_id = trade.get("execution_id")
+            trade_time_ms = to_int(trade.get("trade_time_r"), None)
+            if execution_id is None or trade_time_ms is None:
+                self.__logger.debug(f"Skipping trade without execution id or time: {trade}")
+                continue
+            rows.append(
+                (
+                    str(execution_id),
+                    trade.get("account") or trade.get("accountCode"),
+                    to_int(trade.get("conid"), None),
+                    trade_time_ms,
+                    trade.get("symbol"),
+                    trade.get("side"),
+                    to_float(trade.get("size"), None),
+                    to_float(trade.get("price"), None),
+                    to_float(trade.get("commission"), None),
+                    to_float(trade.get("net_amount"), None),
+                    json.dumps(trade, separators=(",", ":")),
+                )
+            )
+
+        with self.__lock:
+            before = self.__connection.total_changes
+            self.__connection.executemany("INSERT OR IGNORE INTO trades VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+            self.__connection.commit()
+            added = self.__connection.total_changes - before
+        self.__logger.info(f"Trade journal: {added} new executions out of {len(rows)}")
+        return added
+
+    def get(self, execution_id: str) -> Optional[dict]:
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT raw FROM trades WHERE execution_id = ?", (execution_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(
+        self,
+        start_ms: int = None,
+        end_ms: int = None,
+        account: str = None,
+        conid: int = None,
+        limit: int = None,
+    ) -> List[dict]:
+        """
+        Returns journaled executions ordered by trade time, start_ms is inclusive and end_ms is exclusive.
+        """
+        clauses, args = [], []
+        if account is not None:
+            clauses.append("account = ?")
+            args.append(account)
+        if conid is not None:
+            clauses.append("conid = ?")
+            args.append(int(conid))
+        if start_ms is not None:
+            clauses.append("trade_time_ms >= ?")
+            args.append(int(start_ms))
+        if end_ms is not None:
+            clauses.append("trade_time_ms < ?")
+            args.append(int(end_ms))
+
+        sql = "SELECT raw FROM trades"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY trade_time_ms, execution_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+
+        with self.__lock:
+            rows = self.__connection.execute(sql, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,163 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .client import IBKRHttpClient
+from .ibkr_types import BaseCurrency
+from .pacing import RateLimiter
+from .utils_tables import columns_to_dataframe, to_float, to_int
+
+
+TRANSACTION_COLUMNS = ("account", "conid", "date", "type", "quantity", "price", "amount", "currency", "fx_rate")
+TRANSACTION_DTYPES = (str, np.int64, "datetime64[D]", str, float, float, float, str, float)
+DEFAULT_ACCOUNT_CHUNK_SIZE = 10
+DEFAULT_CONID_CHUNK_SIZE = 20
+# Source: https://www.interactivebrokers.com/campus/ibkr-api-page/cpapi-v1/#pacing-limits
+TRANSACTIONS_PACING_LIMIT = (1, 15 * 60.0)
+# shared by all fetch_transactions calls of the process, the limit is per session and not per call
+_TRANSACTIONS_LIMITER = RateLimiter(*TRANSACTIONS_PACING_LIMIT)
+
+_MONTHS = {
+    name: index + 1
+    for index, name in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"))
+}
+
+Chunk = Tuple[Tuple[str, ...], Tuple[int, ...]]
+
+
+def _chunks(items: Sequence, size: int) -> List[tuple]:
+    return [tuple(items[i : i + size]) for i in range(0, len(items), size)]
+
+
+def _parse_date(value) -> str:
+    """
+    Transactions carry dates like "Mon Oct 02 00:00:00 EDT 2023", rpnl rows like "20231003".
+    Returns an ISO date or "NaT".
+    """
+    parts = str(value).split()
+    try:
+        if len(parts) == 6:
+            return f"{int(parts[5]):04d}-{_MONTHS[parts[1]]:02d}-{int(parts[2]):02d}"
+        if len(parts) == 1 and len(parts[0]) == 8 and parts[0].isdigit():
+            return f"{parts[0][:4]}-{parts[0][4:6]}-{parts[0][6:]}"
+    except (KeyError, ValueError):
+        pass
+    return "NaT"
+
+
+def _transaction_row(transaction: dict) -> tuple:
+    return (
+        str(transaction.get("acctid", "")),
+        to_int(transaction.get("conid")),
+        _parse_date(transaction.get("date")),
+        str(transaction.get("type", "")),
+        to_float(transaction.get("qty")),
+        to_float(transaction.get("pr")),
+        to_float(transaction.get("amt")),
+        str(transaction.get("cur", "")),
+        to_float(transaction.get("fxRate")),
+    )
+
+
+@dataclass
+class TransactionTable:
+    """
+    Result of #fetch_transactions, a dict of equally sized NumPy columns named after TRANSACTION_COLUMNS.
+    Failed chunks are reported in `errors` by their (account ids, contract ids) and leave the other rows untouched.
+    `out_of_slice` counts the dropped rows a chunk returned for an account or contract id it did not ask for.
+    """
+
+    columns: Dict[str, np.ndarray]
+    errors: Dict[Chunk, Exception] = field(default_factory=dict)
+    out_of_slice: int = 0
+    elapsed: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.columns["account"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def to_dataframe(self):
+        """Returns the table as pandas DataFrame, pandas must be installed."""
+        return columns_to_dataframe(self.columns)
+
+
+def fetch_transactions(
+    client: IBKRHttpClient,
+    account_ids: Sequence[str],
+    contract_ids: Sequence[int],
+    currency: BaseCurrency = BaseCurrency.USD,
+    days: int = 90,
+    account_chunk_size: int = DEFAULT_ACCOUNT_CHUNK_SIZE,
+    conid_chunk_size: int = DEFAULT_CONID_CHUNK_SIZE,
+    max_workers: int = 4,
+    rate_limiter: RateLimiter = None,
+    logger: logging.Logger = None,
+) -> TransactionTable:
+    """
+    Splits accounts x contract ids into #get_accounts_transactions requests of bounded size, runs them
+    concurrently within the /pa/transactions pacing limit and stacks the transactions into a columnar table
+    as the chunks complete.
+    The chunks never overlap, so every chunk keeps only the rows of its own accounts and contract ids.
+    Transactions have no id and two real fills can have identical rows, these are all kept.
+    /pa/transactions only takes a lookback in days, so the time range is not split.
+    IBKR allows one /pa/transactions request per 15 minutes (TRANSACTIONS_PACING_LIMIT), a window the client pacer
+    does not block for. Every chunk waits for rate_limiter instead, by default one limiter shared by the process,
+    so a run of N chunks takes about (N - 1) * 15 minutes: keep N low with large chunk sizes.
+    Without client pacing (IBKRConfig(enforce_pacing=False)) and without a rate_limiter chunks are not paced.
+    """
+    logger = logger or logging.getLogger(__name__)
+    if account_chunk_size <= 0 or conid_chunk_size <= 0:
+        raise ValueError("Chunk sizes must be positive")
+    if rate_limiter is None and getattr(client, "pacer", None) is not None:
+        rate_limiter = _TRANSACTIONS_LIMITER
+
+    def fetch(accounts: Tuple[str, ...], conids: Tuple[int, ...]):
+        if rate_limiter is not None:
+            waited = rate_limiter.acquire()
+            if waited > 0:
+                logger.info(f"Transactions chunk {(accounts, conids)} waited {waited:.0f}s for the pacing limit")
+        return client.get_accounts_transactions(list(accounts), list(conids), currency, days)
+
+    started = time.perf_counter()
+    chunks: List[Chunk] = [
+        (accounts, conids)
+        for accounts in _chunks(list(account_ids), account_chunk_size)
+        for conids in _chunks(list(contract_ids), conid_chunk_size)
+    ]
+    rows: List[tuple] = []
+    out_of_slice = 0
+    errors: Dict[Chunk, Exception] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ibkr-transactions") as executor:
+        futures = {executor.submit(fetch, accounts, conids): (accounts, conids) for accounts, conids in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                response = future.result()
+            except Exception as e:
+                logger.error(f"Transactions chunk {chunk} failed: {e}")
+                errors[chunk] = e
+                continue
+            accounts, conids = set(map(str, chunk[0])), set(map(int, chunk[1]))
+            for transaction in (response or {}).get("transactions") or []:
+                row = _transaction_row(transaction)
+                if row[0] not in accounts or row[1] not in conids:
+                    out_of_slice += 1
+                    continue
+                rows.append(row)
+
+    # chunks complete in any order, sort for a stable output
+    rows.sort(key=lambda row: (row[0], row[1], row[2], row[3]))
+    if rows:
+        columns = {
+            name: np.array(values, dtype=dtype)
+            for name, dtype, values in zip(TRANSACTION_COLUMNS, TRANSACTION_DTYPES, zip(*rows))
+        }
+    else:
+        columns = {name: np.array([], dtype=dtype) for name, dtype in zip(TRANSACTION_COLUMNS, TRANSACTION_DTYPES)}
+    return TransactionTable(columns, errors, out_of_slice, time.perf_counter() - started)
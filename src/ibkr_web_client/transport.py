@@ -0,0 +1,311 @@
+import json
+import queue
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import requests
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
+import urllib3
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from .recording import build_response
+
+
+# Statuses retried by every transport that supports retries, with exponential backoff
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# (method, url without query, query, body, headers) -> (status, headers, body), e.g. IBKRSimulator.handle
+Handler = Callable[[str, str, Dict[str, str], bytes, Dict[str, str]], Tuple[int, Dict[str, str], bytes]]
+
+
+def default_retries() -> Retry:
+    return Retry(total=3, backoff_factor=1, status_forcelist=list(RETRY_STATUSES))
+
+
+def encode_request(params: dict = None, json_content: dict = None) -> Tuple[str, bytes]:
+    """
+    Encodes params and json body the way requests does: None values are dropped, lists are repeated.
+    Returns the query string and the body.
+    """
+    query = urlencode({k: v for k, v in (params or {}).items() if v is not None}, doseq=True)
+    body = json.dumps(json_content).encode("utf-8") if json_content is not None else b""
+    return query, body
+
+
+@dataclass
+class PoolStats:
+    """
+    Connection counters of a pooled transport: connections opened, requests sent on an already open connection
+    and connections closed because the pool was full ("Connection pool is full, discarding connection").
+    Many discards mean pool_maxsize is lower than the number of concurrent requests.
+    """
+
+    created: int = 0
+    reused: int = 0
+    discarded: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {"created": self.created, "reused": self.reused, "discarded": self.discarded}
+
+
+class _CountingPoolMixin:
+    stats: PoolStats = None
+
+    def _new_conn(self):
+        self.stats.count("created")
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        if getattr(conn, "sock", None) is not None:
+            self.stats.count("reused")
+        return conn
+
+    def _put_conn(self, conn):
+        if self.pool is not None and conn is not None:
+            try:
+                self.pool.put(conn, block=False)
+                return
+            except queue.Full:
+                self.stats.count("discarded")
+            except AttributeError:
+                pass
+        super()._put_conn(conn)
+
+    def warmup(self, connections: int) -> int:
+        """Opens up to `connections` keep-alive connections (with TLS handshake) and returns them to the pool."""
+        opened = []
+        try:
+            for _ in range(min(connections, self.pool.maxsize)):
+                conn = self._get_conn()
+                opened.append(conn)
+                if getattr(conn, "sock", None) is None:
+                    conn.connect()
+        finally:
+            for conn in opened:
+                self._put_conn(conn)
+        return len(opened)
+
+
+def instrument_pool_manager(pool_manager: urllib3.PoolManager, stats: PoolStats):
+    """Makes the pools created by pool_manager count into stats."""
+    pool_manager.pool_classes_by_scheme = {
+        "http": type("CountingHTTPConnectionPool", (_CountingPoolMixin, HTTPConnectionPool), {"stats": stats}),
+        "https": type("CountingHTTPSConnectionPool", (_CountingPoolMixin, HTTPSConnectionPool), {"stats": stats}),
+    }
+
+
+class Transport(ABC):
+    """
+    Sends one HTTP request for #IBKRHttpClient. Signing, pacing, caching and recording stay in the client,
+    a transport only moves bytes and returns a requests.Response.
+    Implementations must be safe to share between threads and raise requests.exceptions.RequestException subclasses.
+    """
+
+    name: str = None
+
+    @abstractmethod
+    def request(
+        self, method: str, url: str, headers: Dict[str, str], params: dict = None, json_content: dict = None
+    ) -> requests.Response:
+        pass
+
+    def close(self):
+        pass
+
+    def warmup(self, url: str, connections: int) -> int:
+        """Pre-opens keep-alive connections to the host of url, returns how many are open. Not all transports pool."""
+        return 0
+
+    def pool_stats(self) -> Optional[Dict[str, int]]:
+        """PoolStats as dict, None if the transport does not pool connections."""
+        return None
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RequestsTransport(Transport):
+    """
+    The default transport, a requests.Session with a retrying HTTPAdapter.
+    pool_connections is the number of hosts pooled, pool_maxsize the connections kept open per host.
+    """
+
+    name = "requests"
+
+    def __init__(
+        self,
+        retries: Retry = None,
+        pool_connections: int = DEFAULT_POOLSIZE,
+        pool_maxsize: int = DEFAULT_POOLSIZE,
+        pool_block: bool = DEFAULT_POOLBLOCK,
+    ):
+        self.stats = PoolStats()
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=retries or default_retries(),
+        )
+        instrument_pool_manager(self.adapter.poolmanager, self.stats)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def request(
+        self, method: str, url: str, headers: Dict[str, str], params: dict = None, json_content: dict = None
+    ) -> requests.Response:
+        return self.session.request(method, url=url, json=json_content, params=params, headers=headers)
+
+    def warmup(self, url: str, connections: int) -> int:
+        # The pool is looked up the way requests sends, TLS settings are part of the pool key
+        verify = self.session.merge_environment_settings(url, {}, None, None, None)["verify"]
+        if hasattr(self.adapter, "get_connection_with_tls_context"):
+            pool = self.adapter.get_connection_with_tls_context(requests.Request("GET", url).prepare(), verify)
+        else:
+            pool = self.adapter.get_connection(url)
+        return pool.warmup(connections)
+
+    def pool_stats(self) -> Dict[str, int]:
+        return self.stats.as_dict()
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport(Transport):
+    """urllib3.PoolManager without the requests layer on top, same retries as #RequestsTransport."""
+
+    name = "urllib3"
+
+    def __init__(
+        self,
+        retries: Retry = None,
+        pool_connections: int = DEFAULT_POOLSIZE,
+        pool_maxsize: int = DEFAULT_POOLSIZE,
+        pool_block: bool = DEFAULT_POOLBLOCK,
+    ):
+        self.retries = retries or default_retries()
+        self.stats = PoolStats()
+        self.pool = urllib3.PoolManager(num_pools=pool_connections, maxsize=pool_maxsize, block=pool_block)
+        instrument_pool_manager(self.pool, self.stats)
+
+    def request(
+        self, method: str, url: str, headers: Dict[str, str], params: dict = None, json_content: dict = None
+    ) -> requests.Response:
+        query, body = encode_request(params, json_content)
+        headers = dict(headers)
+        if json_content is not None:
+            headers["Content-Type"] = "application/json"
+        try:
+            response = self.pool.request(
+                method,
+                f"{url}?{query}" if query else url,
+                body=body or None,
+                headers=headers,
+                retries=self.retries,
+                preload_content=True,
+            )
+        except urllib3.exceptions.MaxRetryError as e:
+            if isinstance(e.reason, urllib3.exceptions.ResponseError):
+                raise requests.exceptions.RetryError(e) from e
+            raise requests.exceptions.ConnectionError(e) from e
+        except urllib3.exceptions.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e) from e
+        return build_response(response.status, dict(response.headers), response.data, url)
+
+    def warmup(self, url: str, connections: int) -> int:
+        return self.pool.connection_from_url(url).warmup(connections)
+
+    def pool_stats(self) -> Dict[str, int]:
+        return self.stats.as_dict()
+
+    def close(self):
+        self.pool.clear()
+
+
+class HttpxTransport(Transport):
+    """
+    httpx.Client, optionally over HTTP/2 (`pip install httpx[http2]`).
+    httpx only retries failed connections, throttled and failed responses are returned as they are.
+    """
+
+    name = "httpx"
+
+    def __init__(self, http2: bool = False, retries: int = 3, pool_maxsize: int = DEFAULT_POOLSIZE):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("httpx is required for HttpxTransport, install it with `pip install httpx`") from e
+        self.__httpx = httpx
+        self.client = httpx.Client(
+            http2=http2,
+            transport=httpx.HTTPTransport(http2=http2, retries=retries),
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+            timeout=None,
+        )
+
+    def request(
+        self, method: str, url: str, headers: Dict[str, str], params: dict = None, json_content: dict = None
+    ) -> requests.Response:
+        query, body = encode_request(params, json_content)
+        headers = dict(headers)
+        if json_content is not None:
+            headers["Content-Type"] = "application/json"
+        try:
+            response = self.client.request(method, f"{url}?{query}" if query else url, content=body, headers=headers)
+        except self.__httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e) from e
+        return build_response(response.status_code, dict(response.headers), response.content, url)
+
+    def close(self):
+        self.client.close()
+
+
+class InProcessTransport(Transport):
+    """
+    Calls a handler directly instead of going over the network, e.g. InProcessTransport(simulator.handle).
+    Isolates the client overhead from the network stack in benchmarks and tests.
+    """
+
+    name = "inprocess"
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+
+    def request(
+        self, method: str, url: str, headers: Dict[str, str], params: dict = None, json_content: dict = None
+    ) -> requests.Response:
+        query, body = encode_request(params, json_content)
+        status, response_headers, content = self.handler(
+            method, url, dict(parse_qsl(query, keep_blank_values=True)), body, dict(headers)
+        )
+        return build_response(status, response_headers, content, url)
+
+
+TRANSPORTS = {
+    RequestsTransport.name: RequestsTransport,
+    Urllib3Transport.name: Urllib3Transport,
+    HttpxTransport.name: HttpxTransport,
+    InProcessTransport.name: InProcessTransport,
+}
+
+
+def create_transport(name: str, **kwargs) -> Transport:
+    """Creates a transport by its name, one of TRANSPORTS."""
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {name}, expected one of {sorted(TRANSPORTS)}")
+    return TRANSPORTS[name](**kwargs)
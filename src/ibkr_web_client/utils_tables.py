@@ -0,0 +1,45 @@
+from typing import Dict
+
+import numpy as np
+
+
+def to_float(value, default: float = np.nan) -> float:
+    """
+    Parses numbers of Web API payloads: plain numbers, strings with thousands separators like "1,234.5"
+    and amount objects like {"amount": 12.5}. Returns default for missing or unparsable values.
+    """
+    if isinstance(value, dict):
+        value = value.get("amount")
+    if isinstance(value, str):
+        value = value.replace(",", "")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_price(value) -> float:
+    """
+    Parses a snapshot price, stripping the "C" (previous close) and "H" (halted) prefixes.
+    Returns nan for missing or unparsable values.
+    """
+    if isinstance(value, str):
+        value = value.lstrip("CH")
+    return to_float(value)
+
+
+def to_int(value, default: int = -1) -> int:
+    """Parses ids like conids, returns default for missing or unparsable values."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def columns_to_dataframe(columns: Dict[str, np.ndarray]):
+    """Returns NumPy columns as pandas DataFrame, pandas must be installed."""
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("pandas is required for to_dataframe, install it with `pip install pandas`") from e
+    return pd.DataFrame(columns)
@@ -0,0 +1,133 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .client import IBKRHttpClient
+
+
+@dataclass
+class WatchlistSpec:
+    name: str
+    contract_id_lst: List[int]
+
+
+@dataclass
+class WatchlistSyncReport:
+    created: List[str] = field(default_factory=list)
+    replaced: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+    # phase name -> seconds: fetch_list, fetch_details, diff, apply
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.replaced or self.deleted)
+
+
+def _instrument_conid(instrument: dict) -> Optional[int]:
+    conid = instrument.get("conid", instrument.get("C"))
+    try:
+        return int(conid)
+    except (TypeError, ValueError):
+        return None
+
+
+class WatchlistSync:
+    """
+    Brings the user watchlists in line with a desired {watchlist_id: WatchlistSpec} state.
+    Remote details are fetched in parallel and only the needed create, replace and delete calls are sent.
+    Replacing re-posts the watchlist under the same id, which overwrites it.
+    """
+
+    def __init__(self, client: IBKRHttpClient, max_workers: int = 8, logger: logging.Logger = None):
+        self.__client = client
+        self.__max_workers = max_workers
+        self.__logger = logger or logging.getLogger(__name__)
+
+    def sync(
+        self, desired: Dict[str, WatchlistSpec], prune: bool = False, managed_prefix: str = None
+    ) -> WatchlistSyncReport:
+        """
+        With prune, remote watchlists missing from desired are deleted,
+        managed_prefix limits deletion to watchlist ids starting with it.
+        """
+        report = WatchlistSyncReport()
+
+        started = time.perf_counter()
+        # The remote state may have been changed by someone else, never diff against a cached listing
+        self.__client.invalidate_response_cache("/iserver/watchlist*")
+        response = self.__client.get_all_watchlists()
+        remote_ids = [str(obj["id"]) for obj in (response.get("data") or {}).get("user_lists", [])]
+        report.timings["fetch_list"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        to_fetch = [watchlist_id for watchlist_id in desired if watchlist_id in remote_ids]
+        remote: Dict[str, WatchlistSpec] = {}
+        with ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="ibkr-watchlist") as executor:
+            futures = {
+                watchlist_id: executor.submit(self.__client.get_watchlist_info, watchlist_id)
+                for watchlist_id in to_fetch
+            }
+            for watchlist_id, future in futures.items():
+                try:
+                    info = future.result()
+                    conids = [_instrument_conid(instrument) for instrument in info.get("instruments", [])]
+                    conids = [conid for conid in conids if conid is not None]
+                    remote[watchlist_id] = WatchlistSpec(info.get("name"), conids)
+                except Exception as e:
+                    # without the remote state it will be replaced, which is always correct
+                    self.__logger.error(f"Fetching watchlist {watchlist_id} failed: {e}")
+        report.timings["fetch_details"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        to_create, to_replace, to_delete = [], [], []
+        for watchlist_id, spec in desired.items():
+            current = remote.get(watchlist_id)
+            if watchlist_id not in remote_ids:
+                to_create.append(watchlist_id)
+            elif current is None or current.name != spec.name or current.contract_id_lst != list(spec.contract_id_lst):
+                to_replace.append(watchlist_id)
+            else:
+                report.unchanged.append(watchlist_id)
+        if prune:
+            to_delete = [
+                watchlist_id
+                for watchlist_id in remote_ids
+                if watchlist_id not in desired and (managed_prefix is None or watchlist_id.startswith(managed_prefix))
+            ]
+        report.timings["diff"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="ibkr-watchlist") as executor:
+            futures = {}
+            for watchlist_id in to_create + to_replace:
+                spec = desired[watchlist_id]
+                futures[watchlist_id] = executor.submit(
+                    self.__client.create_watchlist, watchlist_id, spec.name, list(spec.contract_id_lst)
+                )
+            for watchlist_id in to_delete:
+                futures[watchlist_id] = executor.submit(self.__client.delete_watchlist, watchlist_id)
+            for watchlist_id, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    self.__logger.error(f"Syncing watchlist {watchlist_id} failed: {e}")
+                    report.errors[watchlist_id] = e
+                    continue
+                if watchlist_id in to_delete:
+                    report.deleted.append(watchlist_id)
+                elif watchlist_id in to_replace:
+                    report.replaced.append(watchlist_id)
+                else:
+                    report.created.append(watchlist_id)
+        report.timings["apply"] = time.perf_counter() - started
+
+        self.__logger.info(
+            f"Watchlist sync: {len(report.created)} created, {len(report.replaced)} replaced, "
+            f"{len(report.deleted)} deleted, {len(report.unchanged)} unchanged, {len(report.errors)} failed"
+        )
+        return report
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from ibkr_web_client import AccountScheduler
+
+
+class FakeAccountClient:
+    def __init__(self):
+        self.selected = None
+        self.log = []
+        self.gate = threading.Event()
+
+    def switch_account(self, account_id: str):
+        self.log.append(("switch", account_id))
+        if account_id == "BAD":
+            raise ValueError("unknown account")
+        if account_id == "REJECTED":
+            return {"error": "Account REJECTED is not available"}
+        self.selected = account_id
+        return {"set": True, "acctId": account_id}
+
+    def get_orders(self, filters: str = None, force: bool = None):
+        self.gate.wait(1)
+        self.log.append(("orders", self.selected))
+        return {"orders": [], "account": self.selected}
+
+    def get_trades(self, days: int = 7, force: bool = None):
+        self.gate.wait(1)
+        self.log.append(("trades", self.selected))
+        return [{"account": self.selected}]
+
+
+def test_calls_run_against_their_account_with_minimal_switches():
+    client = FakeAccountClient()
+    with AccountScheduler(client) as scheduler:
+        # hold the worker on the first call so the rest queue up
+        futures = [scheduler.get_orders("U1")]
+        for account_id in ["U2", "U1", "U2", "U3", "U1"]:
+            futures.append(scheduler.get_trades(account_id))
+        client.gate.set()
+        results = [future.result(timeout=5) for future in futures]
+
+        assert results[0]["account"] == "U1"
+        assert [result[0]["account"] for result in results[1:]] == ["U2", "U1", "U2", "U3", "U1"]
+        assert scheduler.stats["switches"] == 3
+        assert scheduler.stats["calls"] == 6
+        assert scheduler.current_account == "U3"
+
+
+def test_current_account_is_not_switched_again():
+    client = FakeAccountClient()
+    client.gate.set()
+    with AccountScheduler(client, current_account="U1") as scheduler:
+        scheduler.get_orders("U1").result(timeout=5)
+
+        assert scheduler.stats["switches"] == 0
+        assert ("switch", "U1") not in client.log
+
+
+def test_switch_failure_fails_only_that_account():
+    client = FakeAccountClient()
+    client.gate.set()
+    with AccountScheduler(client) as scheduler:
+        bad = scheduler.get_orders("BAD")
+        good = scheduler.get_orders("U1")
+
+        with pytest.raises(ValueError):
+            bad.result(timeout=5)
+        assert good.result(timeout=5)["account"] == "U1"
+
+
+def test_capped_batches_let_other_accounts_run():
+    client = FakeAccountClient()
+    with AccountScheduler(client, current_account="U1", max_batch=2) as scheduler:
+        futures = [scheduler.get_trades("U1") for _ in range(4)] + [scheduler.get_trades("U2")]
+        client.gate.set()
+        for future in futures:
+            future.result(timeout=5)
+
+    accounts = [account for kind, account in client.log if kind == "trades"]
+    assert accounts.index("U2") < 4
+
+
+def test_rejected_switch_fails_the_batch_and_keeps_the_account():
+    client = FakeAccountClient()
+    client.gate.set()
+    client.selected = "U1"
+    with AccountScheduler(client, current_account="U1") as scheduler:
+        rejected = scheduler.get_orders("REJECTED")
+
+        with pytest.raises(RuntimeError):
+            rejected.result(timeout=5)
+        assert scheduler.current_account == "U1" and scheduler.stats["switches"] == 0
+        assert scheduler.get_orders("U1").result(timeout=5)["account"] == "U1"
+    assert ("orders", "REJECTED") not in client.log
@@ -0,0 +1,191 @@
+import threading
+
+from ibkr_web_client import AlertManager
+from ibkr_web_client.ibkr_types.alert import (
+    Alert,
+    AlertCondition,
+    Condition,
+    ConditionType,
+    GTCAlert,
+    LogicBind,
+    Operator,
+)
+
+
+def make_alert(name: str, conid: int, price: str) -> Alert:
+    condition = AlertCondition(
+        conid, "SMART", LogicBind.END, Operator.GREATER_THAN, Condition(ConditionType.PRICE, price)
+    )
+    return Alert(name, f"{name} crossed {price}", False, False, False, "", GTCAlert(), [condition])
+
+
+class FakeAlertClient:
+    def __init__(self):
+        # alert_id -> details as returned by /iserver/account/alert/{alert_id}
+        self.alerts = {}
+        self.next_id = 100
+        self.calls = []
+        self.lock = threading.Lock()
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.barrier = None
+        self.failing_details = set()
+
+    def __enter_call(self, *call):
+        with self.lock:
+            self.calls.append(call)
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        if self.barrier is not None:
+            self.barrier.wait(timeout=2)
+        with self.lock:
+            self.concurrent -= 1
+
+    def add(self, alert: Alert, active: int = 1) -> int:
+        alert_id = self.next_id
+        self.next_id += 1
+        payload = alert.__dict__
+        self.alerts[alert_id] = {
+            "order_id": alert_id,
+            "alert_name": payload["alertName"],
+            "alert_message": payload["alertMessage"],
+            "alert_active": active,
+            "alert_repeatable": payload["alertRepeatable"],
+            "tif": payload["tif"],
+            "conditions": [
+                {
+                    "conidex": condition["conidex"],
+                    "condition_type": condition["type"],
+                    "condition_operator": condition["operator"],
+                    "condition_logic_bind": condition["logicBind"],
+                    "condition_value": condition["value"],
+                }
+                for condition in payload["conditions"]
+            ],
+        }
+        return alert_id
+
+    def get_alert_list(self, account_id: str):
+        self.__enter_call("list")
+        return [{"order_id": alert_id, "alert_name": obj["alert_name"]} for alert_id, obj in self.alerts.items()]
+
+    def get_alert_details(self, alert_id: int):
+        self.__enter_call("details", alert_id)
+        if alert_id in self.failing_details:
+            raise ConnectionError("boom")
+        return dict(self.alerts[alert_id])
+
+    def create_alert(self, account_id: str, alert: Alert):
+        self.__enter_call("create", alert.alert_name)
+        if alert.alert_name == "rejected":
+            return {"success": False, "text": "rejected"}
+        with self.lock:
+            alert_id = self.add(alert)
+        return {"order_id": alert_id, "success": True}
+
+    def modify_alert(self, account_id: str, alert_id: int, alert: Alert):
+        self.__enter_call("modify", alert_id)
+        with self.lock:
+            active = self.alerts[alert_id]["alert_active"]
+            del self.alerts[alert_id]
+            new_id = self.add(alert, active)
+            self.alerts[alert_id] = dict(self.alerts.pop(new_id), order_id=alert_id)
+        return {"order_id": alert_id, "success": True}
+
+    def delete_alert(self, account_id: str, alert_id: int):
+        self.__enter_call("delete", alert_id)
+        if alert_id not in self.alerts:
+            raise ConnectionError("boom")
+        del self.alerts[alert_id]
+        return {"success": True}
+
+    def set_alert_activation(self, account_id: str, alert_id: int, active_active: bool):
+        self.__enter_call("activate", alert_id, active_active)
+        self.alerts[alert_id]["alert_active"] = int(active_active)
+        return {"success": True}
+
+
+def test_details_are_fetched_concurrently():
+    client = FakeAlertClient()
+    alert_ids = [client.add(make_alert(f"alert{i}", 1000 + i, "10")) for i in range(4)]
+    client.barrier = threading.Barrier(4)
+
+    details = AlertManager(client, "U1", max_workers=4).fetch_details(alert_ids)
+
+    assert sorted(details) == alert_ids
+    assert all(result.success for result in details.values())
+    assert client.max_concurrent == 4
+
+
+def test_reconcile_sends_only_needed_changes():
+    client = FakeAlertClient()
+    unchanged_id = client.add(make_alert("same", 1, "10"))
+    modified_id = client.add(make_alert("moved", 2, "10"))
+    inactive_id = client.add(make_alert("inactive", 3, "10"), active=0)
+    stale_id = client.add(make_alert("stale", 4, "10"))
+    desired = [
+        make_alert("same", 1, "10"),
+        make_alert("moved", 2, "12"),
+        make_alert("inactive", 3, "10"),
+        make_alert("new", 5, "10"),
+    ]
+
+    report = AlertManager(client, "U1").reconcile(desired, delete_missing=True)
+
+    assert report.unchanged == ["same"]
+    assert report.failed == []
+    operations = sorted((result.operation, result.key) for result in report.results)
+    assert operations == [("activate", "inactive"), ("create", "new"), ("delete", "stale"), ("modify", "moved")]
+    assert client.alerts[modified_id]["conditions"][0]["condition_value"] == "12"
+    assert client.alerts[inactive_id]["alert_active"] == 1
+    assert stale_id not in client.alerts
+    assert unchanged_id in client.alerts
+    assert not [call for call in client.calls if call[0] != "details" and unchanged_id in call]
+
+
+def test_reconcile_by_conidex():
+    client = FakeAlertClient()
+    alert_id = client.add(make_alert("old name", 7, "10"))
+
+    report = AlertManager(client, "U1").reconcile([make_alert("new name", 7, "10")], key="conidex")
+
+    assert [(result.operation, result.alert_id) for result in report.results] == [("modify", alert_id)]
+    assert client.alerts[alert_id]["alert_name"] == "new name"
+
+
+def test_failures_are_reported_per_item():
+    client = FakeAlertClient()
+    alert_id = client.add(make_alert("kept", 1, "10"))
+    manager = AlertManager(client, "U1")
+
+    created = manager.create_many([make_alert("ok", 2, "10"), make_alert("rejected", 3, "10")])
+    deleted = manager.delete_many([alert_id, 999])
+
+    assert [(result.key, result.success) for result in created] == [("ok", True), ("rejected", False)]
+    assert created[0].alert_id is not None
+    assert deleted[0].success
+    assert not deleted[1].success and isinstance(deleted[1].error, ConnectionError)
+
+
+def test_alerts_with_failed_details_are_not_created_again():
+    client = FakeAlertClient()
+    alert_id = client.add(make_alert("a", 1, "10"))
+    client.failing_details.add(alert_id)
+
+    report = AlertManager(client, "U1").reconcile([make_alert("a", 1, "12"), make_alert("b", 2, "10")])
+
+    assert report.skipped == ["a"]
+    operations = [(result.operation, result.key) for result in report.results]
+    assert operations == [("details", str(alert_id)), ("create", "b")]
+    assert sorted(obj["alert_name"] for obj in client.alerts.values()) == ["a", "b"]
+
+
+def test_failed_details_block_creates_by_conidex():
+    client = FakeAlertClient()
+    alert_id = client.add(make_alert("a", 1, "10"))
+    client.failing_details.add(alert_id)
+
+    report = AlertManager(client, "U1").reconcile([make_alert("renamed", 1, "10")], key="conidex")
+
+    assert report.skipped == ["1@SMART"]
+    assert list(client.alerts) == [alert_id]
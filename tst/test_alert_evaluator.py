@@ -0,0 +1,102 @@
+import pytest
+
+from ibkr_web_client import AlertEvaluator
+from ibkr_web_client.ibkr_types import (
+    Alert,
+    AlertCondition,
+    GTCAlert,
+    LogicBind,
+    MarginCondition,
+    Operator,
+    PriceCondition,
+    TradeCondition,
+)
+
+
+def make_alert(name: str, conditions, repeatable: bool = False) -> Alert:
+    return Alert(name, name, repeatable, False, False, "", GTCAlert(), conditions)
+
+
+def price(conid: int, operator: Operator, value: float, logic_bind: LogicBind = LogicBind.END) -> AlertCondition:
+    return AlertCondition(conid, "SMART", logic_bind, operator, PriceCondition(value))
+
+
+def snapshot(conid: int, last) -> dict:
+    return {"conid": conid, "31": last}
+
+
+def test_single_conditions_fire_on_edges():
+    evaluator = AlertEvaluator()
+    evaluator.add(make_alert("above", [price(1, Operator.GREATER_THAN, 100)]))
+    evaluator.add(make_alert("below", [price(2, Operator.LESS_THAN, 50)], repeatable=True))
+    fired = []
+    evaluator.on_trigger(lambda trigger: fired.append(trigger.key))
+
+    assert evaluator.conids == [1, 2]
+    assert evaluator.evaluate([snapshot(1, "99"), snapshot(2, "60")]) == []
+    evaluator.evaluate([snapshot(1, "C101.5"), snapshot(2, "49")])
+    evaluator.evaluate([snapshot(1, "102"), snapshot(2, "48")])
+    assert fired == ["above", "below"]
+
+    # repeatable rules re-arm once the chain turned false, the others fire once
+    evaluator.evaluate([snapshot(1, "90"), snapshot(2, "55")])
+    evaluator.evaluate([snapshot(1, "H120"), snapshot(2, "40")])
+    assert fired == ["above", "below", "below"]
+
+
+def test_chains_bind_left_to_right():
+    evaluator = AlertEvaluator()
+    # (1 >= 10 OR 2 >= 10) AND 3 <= 5
+    evaluator.add(
+        make_alert(
+            "chain",
+            [
+                price(1, Operator.GREATER_THAN, 10, LogicBind.OR),
+                price(2, Operator.GREATER_THAN, 10, LogicBind.AND),
+                price(3, Operator.LESS_THAN, 5),
+            ],
+            repeatable=True,
+        )
+    )
+    evaluator.add(make_alert("short", [price(3, Operator.LESS_THAN, 5)], repeatable=True))
+
+    triggers = evaluator.evaluate([snapshot(1, 11), snapshot(2, 1), snapshot(3, 6)])
+    assert triggers == []
+    triggers = evaluator.evaluate([snapshot(3, 4)])
+    assert sorted(trigger.key for trigger in triggers) == ["chain", "short"]
+    evaluator.evaluate([snapshot(1, 1)])
+    triggers = evaluator.evaluate([snapshot(2, 12)])
+    assert [trigger.key for trigger in triggers] == ["chain"]
+
+
+def test_margin_conditions_and_unknown_values():
+    evaluator = AlertEvaluator()
+    margin = AlertCondition(0, "", LogicBind.AND, Operator.LESS_THAN, MarginCondition(20))
+    evaluator.add(make_alert("margin", [margin, price(1, Operator.GREATER_THAN, 100)]))
+
+    assert evaluator.evaluate([snapshot(1, "150")]) == []
+    assert evaluator.evaluate(margin_cushion=30) == []
+    assert [trigger.key for trigger in evaluator.evaluate(margin_cushion=10)] == ["margin"]
+
+
+def test_rule_changes_keep_state_of_other_rules():
+    evaluator = AlertEvaluator()
+    evaluator.add(make_alert("a", [price(1, Operator.GREATER_THAN, 10)]))
+    assert len(evaluator.evaluate([snapshot(1, 11)])) == 1
+
+    evaluator.add(make_alert("b", [price(1, Operator.GREATER_THAN, 5)]))
+    triggers = evaluator.evaluate()
+    assert [trigger.key for trigger in triggers] == ["b"]
+
+    evaluator.remove("b")
+    assert len(evaluator) == 1
+    assert evaluator.evaluate([snapshot(1, 12)]) == []
+
+
+def test_unsupported_rules_are_rejected():
+    evaluator = AlertEvaluator()
+    trade = AlertCondition(1, "SMART", LogicBind.END, Operator.GREATER_THAN, TradeCondition())
+    with pytest.raises(ValueError):
+        evaluator.add(make_alert("trade", [trade]))
+    with pytest.raises(ValueError):
+        evaluator.add(make_alert("empty", []))
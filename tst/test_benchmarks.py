@@ -0,0 +1,29 @@
+import importlib.util
+import json
+from pathlib import Path
+
+
+BENCH_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "bench_client.py"
+
+
+def load_bench():
+    spec = importlib.util.spec_from_file_location("bench_client", BENCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_quick_run_emits_json(tmp_path):
+    payload_dir = tmp_path / "payloads"
+    payload_dir.mkdir()
+    (payload_dir / "recorded_positions.json").write_text(json.dumps([{"conid": 1, "position": 2}] * 100))
+    output = tmp_path / "bench.json"
+
+    load_bench().main(["--quick", "--payload-dir", str(payload_dir), "--output", str(output)])
+
+    results = json.loads(output.read_text())
+    assert results["signing"]["headers_per_second"] > 0
+    assert set(results["decode"]) == {"all_conids", "history", "scanner_params", "recorded_positions"}
+    for mode in ("sequential", "threaded", "async"):
+        assert results["end_to_end"][mode]["requests"] == 20
+        assert results["end_to_end"][mode]["p99_ms"] >= results["end_to_end"][mode]["p50_ms"]
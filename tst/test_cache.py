@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from ibkr_web_client import ResponseCache, MemoryCacheBackend, SQLiteCacheBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend_factory(request, tmp_path):
+    def create(max_entries: int = 100):
+        if request.param == "memory":
+            return MemoryCacheBackend(max_entries)
+        return SQLiteCacheBackend(tmp_path / "cache.sqlite", max_entries)
+
+    return create
+
+
+def test_ttl_policies():
+    cache = ResponseCache({"/portfolio/accounts": 300, "/portfolio/*/meta": 60, "/iserver/account/orders": 0})
+
+    assert cache.ttl_for("/portfolio/accounts") == 300
+    assert cache.ttl_for("portfolio/U1/meta") == 60
+    assert cache.ttl_for("/portfolio/U1/summary") is None
+    assert cache.ttl_for("/iserver/account/orders") is None
+
+
+def test_default_policies_never_cache_live_data():
+    cache = ResponseCache()
+
+    assert cache.ttl_for("/iserver/scanner/params") is not None
+    assert cache.ttl_for("/iserver/marketdata/snapshot") is None
+    assert cache.ttl_for("/iserver/account/orders") is None
+
+
+def test_default_policies_never_skip_the_portfolio_account_calls():
+    cache = ResponseCache()
+
+    assert cache.ttl_for("/portfolio/accounts") is None
+    assert cache.ttl_for("/portfolio/subaccounts") is None
+    assert cache.ttl_for("/portfolio/U1/meta") is not None
+
+
+def test_hits_misses_and_expiry(backend_factory):
+    cache = ResponseCache(backend=backend_factory())
+    key = ResponseCache.make_key("/iserver/currency/pairs", {"currency": "USD"})
+
+    assert cache.get(key) is None
+    cache.set(key, b'{"USD": []}', ttl=0.2)
+    assert cache.get(key) == b'{"USD": []}'
+    time.sleep(0.25)
+    assert cache.get(key) is None
+
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+    assert cache.stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_lru_eviction(backend_factory):
+    cache = ResponseCache(backend=backend_factory(max_entries=2))
+    cache.set("/a?{}", b"a", 60)
+    time.sleep(0.01)
+    cache.set("/b?{}", b"b", 60)
+    time.sleep(0.01)
+    assert cache.get("/a?{}") == b"a"
+    time.sleep(0.01)
+    cache.set("/c?{}", b"c", 60)
+
+    assert cache.get("/b?{}") is None
+    assert cache.get("/a?{}") == b"a"
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["entries"] == 2
+
+
+def test_invalidate_by_endpoint_pattern(backend_factory):
+    cache = ResponseCache(backend=backend_factory())
+    cache.set(ResponseCache.make_key("/portfolio/U1/meta"), b"1", 60)
+    cache.set(ResponseCache.make_key("/portfolio/U2/meta"), b"2", 60)
+    cache.set(ResponseCache.make_key("/iserver/watchlists", {"SC": "USER_WATCHLIST"}), b"3", 60)
+
+    assert cache.invalidate("/portfolio/U1/*") == 1
+    assert cache.get(ResponseCache.make_key("/portfolio/U2/meta")) == b"2"
+    assert cache.invalidate("/iserver/watchlist*") == 1
+    assert cache.stats["entries"] == 1
+
+
+def test_namespaces_share_a_backend_without_sharing_entries(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.sqlite")
+    first, second = ResponseCache(backend=backend, namespace="a:"), ResponseCache(backend=backend, namespace="b:")
+    key = ResponseCache.make_key("/portfolio/accounts")
+    first.set(key, b"accounts of a", 60)
+
+    assert second.get(key) is None
+    assert second.invalidate("/portfolio/*") == 0
+    assert first.get(key) == b"accounts of a"
+    assert first.invalidate("/portfolio/*") == 1
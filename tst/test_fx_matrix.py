@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ibkr_web_client import FxMatrix
+from ibkr_web_client.ibkr_types import BaseCurrency
+
+
+# value of one unit in USD
+USD_RATES = {"USD": 1.0, "EUR": 1.1, "GBP": 1.25, "JPY": 0.0067}
+
+
+class FakeFxClient:
+    def __init__(self, failing: str = None):
+        self.failing = failing
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_currency_exchange_rate(self, target_currency: BaseCurrency, source_currency: BaseCurrency):
+        with self.lock:
+            self.calls.append((target_currency.value, source_currency.value))
+        if source_currency.value == self.failing:
+            raise ConnectionError("boom")
+        return {"rate": USD_RATES[source_currency.value] / USD_RATES[target_currency.value]}
+
+
+CURRENCIES = [BaseCurrency.USD, BaseCurrency.EUR, BaseCurrency.GBP, BaseCurrency.JPY]
+
+
+def test_only_anchor_rates_are_fetched():
+    client = FakeFxClient()
+    fx = FxMatrix(client, CURRENCIES)
+
+    matrix = fx.matrix
+
+    assert sorted(client.calls) == [("USD", "EUR"), ("USD", "GBP"), ("USD", "JPY")]
+    assert matrix.shape == (4, 4)
+    assert np.allclose(np.diag(matrix), 1.0)
+    assert fx.rate("EUR", BaseCurrency.GBP) == pytest.approx(1.1 / 1.25)
+    assert fx.rate(BaseCurrency.JPY, "EUR") == pytest.approx(0.0067 / 1.1)
+
+    fx.matrix
+    assert len(client.calls) == 3
+
+
+def test_convert_is_vectorized_over_currencies():
+    fx = FxMatrix(FakeFxClient(), CURRENCIES)
+
+    converted = fx.convert([100.0, 200.0, 1000.0, 5.0], np.array(["EUR", "USD", "JPY", "EUR"]), BaseCurrency.GBP)
+    assert converted == pytest.approx([100 * 1.1 / 1.25, 200 / 1.25, 1000 * 0.0067 / 1.25, 5 * 1.1 / 1.25])
+
+    same = fx.convert(np.array([1.0, 2.0]), [BaseCurrency.EUR, BaseCurrency.EUR], "USD")
+    assert same == pytest.approx([1.1, 2.2])
+    assert fx.convert([10.0], "GBP", "USD") == pytest.approx([12.5])
+    with pytest.raises(ValueError):
+        fx.convert([1.0], ["CHF"], "USD")
+
+
+def test_failed_rates_are_nan_and_expired_rates_refetched():
+    client = FakeFxClient(failing="JPY")
+    fx = FxMatrix(client, CURRENCIES, ttl=0)
+
+    assert np.isnan(fx.rate("JPY", "USD"))
+    assert list(fx.errors) == ["JPY"]
+    assert fx.rate("EUR", "USD") == pytest.approx(1.1)
+
+    client.failing = None
+    assert fx.rate("JPY", "USD") == pytest.approx(0.0067)
+    assert fx.errors == {}
+
+
+def test_unsupported_codes_fail_at_construction():
+    with pytest.raises(ValueError, match="ILS"):
+        FxMatrix(FakeFxClient(), ["EUR", "ILS"])
+
+    assert FxMatrix(FakeFxClient(), ["EUR", "GBP"]).currencies == ["EUR", "GBP", "USD"]
@@ -0,0 +1,98 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ibkr_web_client import IBKRHttpClient, SessionKeepalive, SessionRecovery
+from ibkr_web_client.ibkr_types import MarketDataField
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials, SimulatorSettings
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="module")
+def credentials(tmp_path_factory):
+    return SimulatorCredentials.generate(tmp_path_factory.mktemp("credentials"), key_size=1024)
+
+
+@pytest.fixture
+def simulator(credentials):
+    with IBKRSimulator(credentials, SimulatorSettings(size=10)) as simulator:
+        yield simulator
+
+
+@pytest.fixture
+def client(simulator):
+    config = simulator.client_config(enforce_pacing=False, coalesce_endpoints=(), response_cache_ttls={})
+    return IBKRHttpClient(config, LOGGER)
+
+
+def snapshot(client: IBKRHttpClient) -> list:
+    return client.get_live_market_data_snapshot([100001], [MarketDataField.LAST_PRICE])
+
+
+def test_interrupted_session_is_recovered_and_read_replayed(simulator, client):
+    simulator.interrupt_brokerage_session()
+
+    assert snapshot(client)[0]["conid"] == 100001
+    assert simulator.stats["brokerage_sessions"] == 2
+    stats = client.session_recovery.stats
+    assert (stats["interruptions"], stats["recoveries"], stats["replays"]) == (1, 1, 1)
+
+
+def test_writes_are_not_replayed(simulator, client):
+    simulator.interrupt_brokerage_session()
+
+    assert client.create_watchlist("1", "First", [100001]) == {"error": "not authenticated"}
+    assert client.create_watchlist("1", "First", [100001])["id"] == "1"
+    assert client.session_recovery.stats["replays"] == 0
+
+
+def test_concurrent_failures_share_one_recovery(simulator, client):
+    simulator.interrupt_brokerage_session()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: snapshot(client), range(8)))
+
+    assert all(result[0]["conid"] == 100001 for result in results)
+    assert simulator.stats["brokerage_sessions"] == 2
+    assert client.session_recovery.stats["interruptions"] == 1
+
+
+def test_keepalive_recovers_competing_session(simulator, client):
+    keepalive = SessionKeepalive(client, logger=LOGGER)
+    assert keepalive.tickle().authenticated
+
+    simulator.interrupt_brokerage_session(competing=True)
+    state = keepalive.tickle()
+
+    assert state.authenticated and not state.competing
+    assert keepalive.stats["competing"] == 1 and keepalive.stats["unauthenticated"] == 1
+    assert simulator.stats["brokerage_sessions"] == 2
+    assert client.session_recovery.stats["interruptions"] == 1
+
+
+def test_keepalive_tickles_in_background(client):
+    with SessionKeepalive(client, interval=0.02, logger=LOGGER) as keepalive:
+        time.sleep(0.2)
+
+    assert keepalive.stats["tickles"] >= 2 and keepalive.stats["tickle_failures"] == 0
+
+
+def test_failed_recovery_is_reported_once():
+    calls = []
+
+    def reinitialize():
+        calls.append(recovery.recover(recovery.generation))
+        raise RuntimeError("still not authenticated")
+
+    recovery = SessionRecovery(reinitialize, LOGGER)
+    generation = recovery.generation
+
+    assert recovery.recover(generation) is False
+    # the failed generation is not recovered again and requests made by the recovery do not recurse
+    assert recovery.recover(generation) is False
+    assert calls == [False]
+    assert recovery.stats["recovery_failures"] == 1 and recovery.stats["interruptions"] == 1
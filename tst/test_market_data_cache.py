@@ -0,0 +1,61 @@
+import logging
+
+import numpy as np
+
+from ibkr_web_client import IBKRHttpClient, LastValueCache
+from ibkr_web_client.ibkr_types import MarketDataField
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials
+
+
+LOGGER = logging.getLogger(__name__)
+LAST, BID = MarketDataField.LAST_PRICE, MarketDataField.BID_PRICE
+
+
+def test_partial_rows_are_merged():
+    cache = LastValueCache(logger=LOGGER)
+    cache.update([{"conid": 1, "31": "10.5", "84": "10.4", "_updated": 1000}])
+    cache.update([{"conid": 1, "31": "10.6"}], received_at=5.0)
+
+    assert cache.row(1) == {"conid": 1, "31": "10.6", "84": "10.4"}
+    assert cache.updated_at([1], [LAST, BID]).tolist() == [[5.0, 1.0]]
+    assert cache.row(2) is None
+
+
+def test_callbacks_get_changed_fields_only():
+    cache = LastValueCache(logger=LOGGER)
+    changes = []
+    cache.on_change(lambda conid, changed: changes.append((conid, changed)))
+
+    cache.update([{"conid": 1, "31": "10.5", "84": "10.4"}])
+    returned = cache.update([{"conid": 1, "31": "10.5", "84": "10.3"}, {"conid": 2, "31": "7"}])
+    cache.update([{"conid": 1, "31": "10.5"}])
+
+    assert returned == {1: {"84": "10.3"}, 2: {"31": "7"}}
+    assert changes == [(1, {"31": "10.5", "84": "10.4"}), (1, {"84": "10.3"}), (2, {"31": "7"})]
+    assert cache.stats["merged_rows"] == 4 and cache.stats["changed_fields"] == 4
+
+
+def test_vectorized_lookup_grows_with_conids():
+    cache = LastValueCache([LAST], capacity=2, logger=LOGGER)
+    cache.update([{"conid": conid, "31": str(conid / 10)} for conid in range(1, 11)])
+    cache.update([{"conid": 3, "31": "C0.5", "84": "H0.4"}, {"conid": 4, "31": "N/A"}])
+
+    prices = cache.get([3, 4, 10, 99], [LAST, BID, "55"])
+
+    assert len(cache) == 10 and cache.fields == ["31", "84"]
+    np.testing.assert_array_equal(
+        prices, [[0.5, 0.4, np.nan], [np.nan, np.nan, np.nan], [1.0, np.nan, np.nan], [np.nan] * 3]
+    )
+    assert cache.get_values([4, 99], [LAST]).tolist() == [["N/A"], [None]]
+
+
+def test_client_returns_merged_snapshots(tmp_path):
+    credentials = SimulatorCredentials.generate(tmp_path, key_size=1024)
+    with IBKRSimulator(credentials) as simulator:
+        client = IBKRHttpClient(simulator.client_config(response_cache_ttls={}), LOGGER)
+
+        rows = client.get_live_market_data_snapshot([100001, 100002], [LAST, BID], merged=True)
+
+        assert [row["conid"] for row in rows] == [100001, 100002]
+        assert all(set(row) == {"conid", "31", "84"} for row in rows)
+        assert client.market_data_cache.get([100001], [LAST])[0, 0] == float(rows[0]["31"].lstrip("CH"))
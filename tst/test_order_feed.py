@@ -0,0 +1,89 @@
+import asyncio
+
+from ibkr_web_client import OrderTradeFeed, FeedItemKind, FeedAction
+
+
+class FakeOrdersClient:
+    def __init__(self):
+        self.orders = []
+        self.trades = []
+        self.calls = []
+
+    def get_orders(self, filters: str = None, force: bool = None):
+        self.calls.append(("orders", force))
+        return {"orders": [dict(order) for order in self.orders], "snapshot": True}
+
+    def get_trades(self, days: int = 7, force: bool = None):
+        self.calls.append(("trades", force))
+        return [dict(trade) for trade in self.trades]
+
+
+def test_feed_emits_inserts_then_only_changes():
+    client = FakeOrdersClient()
+    client.orders = [{"orderId": 1, "status": "Submitted", "filledQuantity": 0, "lastExecutionTime_r": 1}]
+    client.trades = [{"execution_id": "0001.01", "size": 10, "price": "100"}]
+    feed = OrderTradeFeed(client)
+
+    events = feed.poll()
+    assert [(e.kind, e.action, e.key) for e in events] == [
+        (FeedItemKind.ORDER, FeedAction.INSERT, "1"),
+        (FeedItemKind.TRADE, FeedAction.INSERT, "0001.01"),
+    ]
+
+    # timestamp only changes are not reported
+    client.orders[0]["lastExecutionTime_r"] = 2
+    assert feed.poll() == []
+
+    client.orders[0]["status"] = "Filled"
+    client.orders[0]["filledQuantity"] = 10
+    client.trades.append({"execution_id": "0001.02", "size": 5, "price": "101"})
+    events = feed.poll()
+    assert [(e.kind, e.action, e.key) for e in events] == [
+        (FeedItemKind.ORDER, FeedAction.UPDATE, "1"),
+        (FeedItemKind.TRADE, FeedAction.INSERT, "0001.02"),
+    ]
+    assert events[0].previous["status"] == "Submitted"
+    assert feed.orders["1"]["status"] == "Filled"
+
+
+def test_feed_runs_preflight_only_once():
+    client = FakeOrdersClient()
+    feed = OrderTradeFeed(client)
+
+    feed.poll()
+    feed.poll()
+
+    assert client.calls == [("orders", None), ("trades", None), ("orders", False), ("trades", False)]
+
+
+def test_feed_callbacks_and_stats():
+    client = FakeOrdersClient()
+    client.orders = [{"orderId": 7, "status": "PreSubmitted"}]
+    feed = OrderTradeFeed(client, track_trades=False)
+    received = []
+    feed.add_callback(received.append)
+
+    feed.poll()
+
+    assert len(received) == 1
+    assert received[0].key == "7"
+    assert len(feed.stats) == 1
+    assert feed.stats[0].orders_seen == 1
+    assert feed.stats[0].inserts == 1
+    assert feed.stats[0].total_latency >= 0
+
+
+def test_feed_async_iterator():
+    client = FakeOrdersClient()
+    client.orders = [{"orderId": 1, "status": "Submitted"}, {"orderId": 2, "status": "Submitted"}]
+    feed = OrderTradeFeed(client, track_trades=False)
+
+    async def collect():
+        received = []
+        async for event in feed.events(interval=0):
+            received.append(event.key)
+            if len(received) == 2:
+                break
+        return received
+
+    assert asyncio.run(collect()) == ["1", "2"]
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from ibkr_web_client import Pacer, RateLimiter
+
+
+def test_rate_limiter_allows_burst_then_waits():
+    limiter = RateLimiter(max_calls=5, period=0.5)
+
+    assert [limiter.reserve() for _ in range(5)] == [0.0] * 5
+    wait = limiter.reserve()
+    assert 0.05 < wait <= 0.1
+
+
+def test_rate_limiter_paces_concurrent_callers():
+    limiter = RateLimiter(max_calls=2, period=0.1)
+    started = time.perf_counter()
+
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 2 calls are free, the remaining 6 need 0.3 seconds
+    assert time.perf_counter() - started >= 0.25
+
+
+def test_rate_limiter_rejects_invalid_limits():
+    with pytest.raises(ValueError):
+        RateLimiter(0, 1.0)
+
+
+def test_pacer_matches_endpoint_patterns():
+    pacer = Pacer({"/iserver/scanner/run": (1, 1.0), "/fyi/*": (1, 1.0)}, global_limit=None)
+
+    assert pacer.limiter_for("iserver/scanner/run") is pacer.limiter_for("/iserver/scanner/run")
+    assert pacer.limiter_for("/fyi/unreadnumber") is not None
+    assert pacer.limiter_for("/portfolio/accounts") is None
+
+    assert pacer.acquire("/fyi/unreadnumber") == 0.0
+    assert pacer.limiter_for("/fyi/settings").available < 1
+
+
+def test_default_limits_cover_account_order_and_trade_polling():
+    pacer = Pacer()
+
+    for endpoint in ("/iserver/account/orders", "/iserver/account/trades", "/portfolio/accounts"):
+        limiter = pacer.limiter_for(endpoint)
+        assert (limiter.max_calls, limiter.period) == (1, 5.0)
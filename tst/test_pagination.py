@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from ibkr_web_client import iter_subaccounts, iter_positions
+from ibkr_web_client.pagination import iter_pages
+
+
+class FakePagedClient:
+    def __init__(self, subaccount_count: int = 0, position_count: int = 0, page_size: int = 100, delay: float = 0):
+        self.subaccounts = [{"id": f"U{i}"} for i in range(subaccount_count)]
+        self.positions = [{"conid": i} for i in range(position_count)]
+        self.page_size = page_size
+        self.delay = delay
+        self.requested_pages = []
+        self.lock = threading.Lock()
+
+    def portfolio_subaccounts_large(self, page_number: int = 0):
+        with self.lock:
+            self.requested_pages.append(page_number)
+        time.sleep(self.delay)
+        page = self.subaccounts[page_number * self.page_size : (page_number + 1) * self.page_size]
+        if not page:
+            return {}
+        return {
+            "metadata": {"total": len(self.subaccounts), "pageSize": self.page_size, "pageNum": page_number},
+            "subaccounts": page,
+        }
+
+    def get_positions(self, account_id: str, page_id: int = 0):
+        with self.lock:
+            self.requested_pages.append(page_id)
+        time.sleep(self.delay)
+        return self.positions[page_id * self.page_size : (page_id + 1) * self.page_size]
+
+
+def test_iter_subaccounts_walks_all_pages():
+    client = FakePagedClient(subaccount_count=250)
+
+    ids = [subaccount["id"] for subaccount in iter_subaccounts(client)]
+
+    assert ids == [f"U{i}" for i in range(250)]
+
+
+def test_iter_positions_batches_and_stops_on_short_page():
+    client = FakePagedClient(position_count=230)
+
+    batches = list(iter_positions(client, "U1", batches=True, prefetch=0))
+
+    assert [len(batch) for batch in batches] == [100, 100, 30]
+    assert client.requested_pages == [0, 1, 2]
+
+
+def test_iter_positions_stops_on_empty_page():
+    client = FakePagedClient(position_count=200)
+
+    positions = list(iter_positions(client, "U1", prefetch=1))
+
+    assert len(positions) == 200
+
+
+def test_prefetch_overlaps_with_processing():
+    client = FakePagedClient(position_count=500, delay=0.05)
+
+    started = time.perf_counter()
+    for _ in iter_positions(client, "U1", batches=True, prefetch=2):
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    # serial would take 5 * (0.05 + 0.05) + 0.05 for the terminating empty page
+    assert elapsed < 0.45
+
+
+def test_errors_are_raised_to_the_caller():
+    def fetch_page(page_number: int):
+        if page_number == 1:
+            raise ValueError("boom")
+        return [page_number]
+
+    pages = iter_pages(fetch_page, lambda response: response, prefetch=2)
+    assert next(pages) == (0, [0])
+    with pytest.raises(ValueError):
+        next(pages)
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from ibkr_web_client import PerformanceData, PerformanceService
+from ibkr_web_client.ibkr_types import Period
+
+
+DATES = ["20230102", "20230103", "20230104"]
+
+
+def performance_response(account_ids) -> dict:
+    nav, cps = [], []
+    for account_id in account_ids:
+        if account_id == "U2":
+            # opened on the second day of the period
+            nav.append({"id": account_id, "start": "20230103", "navs": [300.0, 330.0]})
+            cps.append({"id": account_id, "start": "20230103", "returns": [0.0, 0.1]})
+        else:
+            nav.append({"id": account_id, "start": "20230102", "navs": [100.0, 110.0, 99.0]})
+            cps.append({"id": account_id, "start": "20230102", "returns": [0.0, 0.1, -0.01]})
+    return {
+        "nav": {"data": nav, "dates": DATES, "freq": "D"},
+        "cps": {"data": cps, "dates": DATES, "freq": "D"},
+        "tpps": {
+            "data": [{"id": account_id, "returns": [0.05]} for account_id in account_ids],
+            "dates": ["202301"],
+            "freq": "M",
+        },
+    }
+
+
+class FakePerformanceClient:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_accounts_performance(self, account_ids, period: Period):
+        with self.lock:
+            self.calls.append((tuple(account_ids), period))
+        time.sleep(self.delay)
+        return performance_response(account_ids)
+
+
+def test_response_is_decoded_into_aligned_series():
+    data = PerformanceData.from_response(Period.ONE_MONTH, performance_response(["U1", "U2"]))
+
+    assert data.accounts == ["U1", "U2"]
+    assert data.nav_dates[0] == np.datetime64("2023-01-02")
+    assert np.isnan(data.nav["U2"][0]) and data.nav["U2"][1:].tolist() == [300.0, 330.0]
+    assert data.period_return_dates.tolist() == [np.datetime64("2023-01-01").item()]
+    assert data.total_nav().tolist() == [100.0, 410.0, 429.0]
+    weighted = data.weighted_cumulative_return()
+    assert weighted[0] == 0.0
+    assert weighted[1] == pytest.approx((0.1 * 110 + 0.0 * 300) / 410)
+    assert weighted[2] == pytest.approx((-0.01 * 99 + 0.1 * 330) / 429)
+
+
+def test_results_are_cached_per_accounts_and_period():
+    client = FakePerformanceClient()
+    service = PerformanceService(client, ttls={Period.ONE_DAY: 60, Period.ONE_YEAR: 3600})
+
+    first = service.get(["U2", "U1"], Period.ONE_DAY)
+    assert service.get(["U1", "U2"], Period.ONE_DAY) is first
+    service.get(["U1", "U2"], Period.ONE_YEAR)
+    service.get(["U1"], Period.ONE_DAY)
+    assert client.calls == [
+        (("U1", "U2"), Period.ONE_DAY),
+        (("U1", "U2"), Period.ONE_YEAR),
+        (("U1",), Period.ONE_DAY),
+    ]
+    assert service.stats == {"hits": 1, "misses": 3, "entries": 3}
+
+    service.invalidate(Period.ONE_DAY)
+    assert service.get(["U1", "U2"], Period.ONE_DAY) is not first
+    # periods without a TTL are never served from the cache
+    service.get(["U1"], Period.ONE_WEEK)
+    service.get(["U1"], Period.ONE_WEEK)
+    assert len(client.calls) == 6
+
+
+def test_concurrent_requests_share_one_call():
+    client = FakePerformanceClient(delay=0.1)
+    service = PerformanceService(client)
+
+    threads = [threading.Thread(target=service.get, args=(["U1"], Period.ONE_DAY)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(client.calls) == 1
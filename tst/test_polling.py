@@ -0,0 +1,128 @@
+import logging
+
+from ibkr_web_client import IBKRHttpClient, LastValueCache, MarketDataSubscriptions, SnapshotPoller
+from ibkr_web_client.ibkr_types import MarketDataField
+from ibkr_web_client.pacing import Pacer
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials
+
+
+LOGGER = logging.getLogger(__name__)
+LAST, BID = MarketDataField.LAST_PRICE, MarketDataField.BID_PRICE
+AVAILABILITY = MarketDataField.MARKET_DATA_AVAILABILITY
+SNAPSHOT = "/iserver/marketdata/snapshot"
+
+
+class FakeSnapshotClient:
+    def __init__(self, snapshot_limit=(1000, 1.0), line_budget=None):
+        self.pacer = Pacer({SNAPSHOT: snapshot_limit}, global_limit=None)
+        self.market_data_cache = LastValueCache(logger=LOGGER)
+        self.market_data_subscriptions = MarketDataSubscriptions(lambda conid: None, lambda: None, line_budget)
+        self.prices = {}
+        self.availability = {}
+        self.calls = []
+
+    def get_live_market_data_snapshot(self, contract_id_lst, field_lst):
+        self.pacer.acquire(SNAPSHOT)
+        self.calls.append((list(contract_id_lst), [field.value for field in field_lst]))
+        rows = [
+            {"conid": conid, **{str(f.value): self.prices.get(conid, "10") for f in field_lst}} for conid in contract_id_lst
+        ]
+        for row in rows:
+            if str(AVAILABILITY.value) in row:
+                row[str(AVAILABILITY.value)] = self.availability.get(row["conid"], "RpB")
+        self.market_data_cache.update(rows)
+        return rows
+
+
+def test_due_conids_are_batched_by_fields():
+    client = FakeSnapshotClient()
+    poller = SnapshotPoller(client, max_batch=3, logger=LOGGER)
+    poller.add(range(1, 6), [LAST])
+    poller.add([6], [LAST, BID])
+
+    assert poller.poll(now=0) == 3
+    assert [conids for conids, _ in client.calls] == [[1, 2, 3], [4, 5], [6]]
+    assert client.calls[2][1] == [31, 84, 6509]
+    assert poller.poll(now=1) == 0 and poller.next_poll() == 5.0
+
+
+def test_rarely_changing_conids_are_polled_less_often():
+    client = FakeSnapshotClient()
+    poller = SnapshotPoller(client, max_slowdown=4, smoothing=0.5, logger=LOGGER)
+    poller.add([1, 2], [LAST], target_freshness=1)
+
+    now = 0.0
+    for tick in range(20):
+        client.prices[1] = str(tick)
+        poller.poll(now=now)
+        now += 1
+    instruments = poller.instruments
+
+    assert instruments[1].interval == 1 and instruments[1].change_rate > 0.99
+    assert instruments[2].interval == 4
+    assert sum(2 in conids for conids, _ in client.calls) < sum(1 in conids for conids, _ in client.calls) / 2
+
+
+def test_higher_priorities_go_first_within_the_pacing_limit():
+    client = FakeSnapshotClient(snapshot_limit=(2, 60.0))
+    poller = SnapshotPoller(client, max_batch=1, pacing_share=1.0, logger=LOGGER)
+    poller.add([1, 2], [LAST], priority=0)
+    poller.add([3], [LAST], priority=5)
+
+    assert poller.poll(now=0) == 2
+    assert [conids for conids, _ in client.calls] == [[3], [1]]
+    assert poller.stats["deferred"] == 1 and poller.pressure == 2
+    assert poller.staleness(now=1)[2] == float("inf")
+
+
+def test_closed_markets_are_paused():
+    client = FakeSnapshotClient()
+    client.prices = {1: "C10.5"}
+    poller = SnapshotPoller(client, closed_recheck_interval=100, logger=LOGGER)
+    poller.add([1, 2], [LAST], target_freshness=1)
+
+    poller.poll(now=0)
+    instruments = poller.instruments
+    assert instruments[1].paused and instruments[1].next_poll == 100
+    assert not instruments[2].paused and poller.stats["paused"] == 1
+
+    client.prices = {1: "10.6"}
+    poller.poll(now=100)
+    assert not poller.instruments[1].paused and poller.stats["resumed"] == 1
+
+
+def test_closed_markets_are_paused_without_last_price():
+    client = FakeSnapshotClient()
+    client.availability = {1: "ZpB"}
+    poller = SnapshotPoller(client, closed_recheck_interval=100, logger=LOGGER)
+    poller.add([1, 2], [BID], target_freshness=1)
+
+    poller.poll(now=0)
+
+    assert client.calls[0][1] == [84, 6509]
+    instruments = poller.instruments
+    assert instruments[1].paused and not instruments[2].paused
+
+
+def test_staleness_histogram():
+    client = FakeSnapshotClient()
+    poller = SnapshotPoller(client, staleness_buckets=(1, 5), logger=LOGGER)
+    poller.add([1], [LAST], target_freshness=1)
+
+    for now in (0, 1, 3, 10):
+        poller.poll(now=now)
+
+    assert poller.staleness_histogram == {1.0: 1, 5.0: 1, float("inf"): 1}
+
+
+def test_poller_refreshes_the_client_cache(tmp_path):
+    credentials = SimulatorCredentials.generate(tmp_path, key_size=1024)
+    with IBKRSimulator(credentials) as simulator:
+        client = IBKRHttpClient(simulator.client_config(response_cache_ttls={}), LOGGER)
+        poller = SnapshotPoller(client, max_batch=10, logger=LOGGER)
+        poller.add(range(100001, 100021), [LAST, BID], target_freshness=0.5)
+
+        assert poller.poll() == 2
+        assert simulator.stats["requests"] >= 2
+        assert (client.market_data_cache.get(range(100001, 100021), [LAST]) > 0).all()
+        assert poller.stats["refreshed"] == 20
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import numpy as np
+
+from ibkr_web_client import fetch_portfolio_snapshot
+from ibkr_web_client.ibkr_types import SortingOrder
+
+
+class FakePortfolioClient:
+    def __init__(self, failing_account: str = None, delay: float = 0):
+        self.failing_account = failing_account
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call(self, account_id: str, response):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if account_id == self.failing_account:
+            raise ConnectionError("boom")
+        return response
+
+    def get_portfolio_summary(self, account_id: str):
+        return self.__call(account_id, {"netliquidation": {"amount": 1000.0, "currency": "USD"}})
+
+    def get_portfolio_ledger(self, account_id: str):
+        return self.__call(
+            account_id,
+            {
+                "BASE": {"netliquidationvalue": 1500.0, "cashbalance": 10.0},
+                "USD": {"netliquidationvalue": 1000.0, "cashbalance": 5.0},
+                "EUR": {"netliquidationvalue": 500.0, "cashbalance": 5.0},
+            },
+        )
+
+    def portfolio_account_allocation(self, account_id: str):
+        return self.__call(account_id, {"assetClass": {"long": {"STK": 1000.0}, "short": {}}})
+
+    def get_all_positions(self, account_id: str, sorting_order: SortingOrder):
+        return self.__call(
+            account_id,
+            [
+                {"conid": 265598, "position": 10, "marketValue": 1900.0, "currency": "USD", "assetClass": "STK"},
+                {"conid": 8314, "position": -5, "marketValue": -700.0, "currency": "USD", "assetClass": "STK"},
+            ],
+        )
+
+
+def test_snapshot_stacks_accounts_into_columns():
+    client = FakePortfolioClient()
+
+    snapshot = fetch_portfolio_snapshot(client, ["U1", "U2", "U3"])
+
+    assert snapshot.errors == {}
+    assert list(snapshot.summary["account"]) == ["U1", "U2", "U3"]
+    np.testing.assert_array_equal(snapshot.summary["netliquidation"], [1000.0] * 3)
+    assert len(snapshot.ledger["account"]) == 9
+    assert len(snapshot.positions["conid"]) == 6
+    assert snapshot.positions["conid"].dtype == np.int64
+    assert set(snapshot.allocation) == {"U1", "U2", "U3"}
+
+    currencies, totals = snapshot.net_liquidation_by_currency()
+    assert dict(zip(currencies, totals)) == {"EUR": 1500.0, "USD": 3000.0}
+    conids, totals = snapshot.market_value_by_conid()
+    assert dict(zip(conids.tolist(), totals)) == {8314: -2100.0, 265598: 5700.0}
+
+
+def test_snapshot_reports_failures_per_account():
+    client = FakePortfolioClient(failing_account="U2")
+
+    snapshot = fetch_portfolio_snapshot(client, ["U1", "U2"], calls=("summary", "positions"))
+
+    assert snapshot.failed_accounts == ["U2"]
+    assert set(snapshot.errors["U2"]) == {"summary", "positions"}
+    assert list(snapshot.summary["account"]) == ["U1"]
+    assert set(snapshot.positions["account"]) == {"U1"}
+    assert len(snapshot.ledger["account"]) == 0
+
+
+def test_snapshot_fans_out_concurrently():
+    client = FakePortfolioClient(delay=0.02)
+
+    fetch_portfolio_snapshot(client, [f"U{i}" for i in range(10)], max_workers=4)
+
+    assert client.max_active > 1
+    assert client.max_active <= 4
+
+
+def test_malformed_positions_fail_only_their_account():
+    class MalformedPositionsClient(FakePortfolioClient):
+        def get_all_positions(self, account_id: str, sorting_order: SortingOrder):
+            if account_id == "U1":
+                return [{"conid": None, "position": 1, "marketValue": 10.0}]
+            if account_id == "U2":
+                return [{"conid": 1}, None]
+            return super().get_all_positions(account_id, sorting_order)
+
+    snapshot = fetch_portfolio_snapshot(MalformedPositionsClient(), ["U1", "U2", "U3"], calls=("positions",))
+
+    assert list(snapshot.errors) == ["U2"] and set(snapshot.errors["U2"]) == {"positions"}
+    assert snapshot.positions["conid"].tolist() == [-1, 265598, 8314]
@@ -0,0 +1,93 @@
+import gzip
+import logging
+import time
+
+import pytest
+
+from ibkr_web_client import CassetteMissError, IBKRConfig, IBKRHttpClient
+from ibkr_web_client.ibkr_types import MarketDataField
+from ibkr_web_client.recording import SCRUBBED_VALUE, CassettePlayer, read_cassette, request_key
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials, SimulatorSettings
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="module")
+def credentials(tmp_path_factory):
+    return SimulatorCredentials.generate(tmp_path_factory.mktemp("credentials"), key_size=1024)
+
+
+def replay_config(path, speed: float = 0.0) -> IBKRConfig:
+    return IBKRConfig(None, None, None, None, None, None, replay_path=path, replay_speed=speed)
+
+
+@pytest.fixture(scope="module")
+def cassette(credentials, tmp_path_factory):
+    path = tmp_path_factory.mktemp("cassettes") / "session.jsonl.gz"
+    with IBKRSimulator(credentials, SimulatorSettings(size=5, latency=0.02)) as simulator:
+        client = IBKRHttpClient(simulator.client_config(record_path=path), LOGGER)
+        client.portfolio_accounts()
+        client.get_live_market_data_snapshot([100001, 100002], [MarketDataField.LAST_PRICE])
+        client.create_watchlist("1", "first", [100001])
+        client.create_watchlist("2", "second", [100002])
+        client.close()
+    return path
+
+
+def test_cassette_has_no_credentials(credentials, cassette):
+    content = gzip.open(cassette, "rt").read()
+
+    assert credentials.token_access not in content
+    assert credentials.consumer_key not in content
+    assert "oauth_signature" not in content
+    assert len(list(read_cassette(cassette))) == 6
+
+
+def test_session_of_tickle_is_scrubbed(credentials, tmp_path):
+    path = tmp_path / "tickle.jsonl.gz"
+    with IBKRSimulator(credentials) as simulator:
+        client = IBKRHttpClient(simulator.client_config(record_path=path), LOGGER)
+        session = client.tickle()["session"]
+        client.close()
+
+    assert session and session not in gzip.open(path, "rt").read()
+    assert IBKRHttpClient(replay_config(path), LOGGER).tickle()["session"] == SCRUBBED_VALUE
+
+
+def test_replay_matches_normalized_requests(cassette):
+    client = IBKRHttpClient(replay_config(cassette), LOGGER)
+
+    assert [account["id"] for account in client.portfolio_accounts()] == ["U1000000", "U1000001"]
+    snapshot = client.get_live_market_data_snapshot([100001, 100002], [MarketDataField.LAST_PRICE])
+    assert [row["conid"] for row in snapshot] == [100001, 100002]
+    assert client.create_watchlist("2", "second", [100002])["name"] == "second"
+    with pytest.raises(CassetteMissError):
+        client.get_live_market_data_snapshot([100003], [MarketDataField.LAST_PRICE])
+
+
+def test_replay_timing(cassette):
+    player = CassettePlayer(cassette, speed=1.0)
+    started = time.perf_counter()
+    _, elapsed = player.play("GET", "/portfolio/accounts")
+    assert time.perf_counter() - started >= elapsed >= 0.02
+
+    player.speed = 0
+    started = time.perf_counter()
+    response, _ = player.play("GET", "portfolio/accounts", {})
+    assert response.ok and time.perf_counter() - started < 0.02
+
+
+def test_repeated_requests_replay_in_order(tmp_path):
+    from ibkr_web_client.recording import CassetteRecorder, build_response
+
+    path = tmp_path / "orders.jsonl.gz"
+    recorder = CassetteRecorder(path)
+    for body in (b'{"n": 1}', b'{"n": 2}'):
+        recorder.record("GET", "/iserver/account/orders", {"force": False}, {}, build_response(200, {}, body), 0.0)
+    recorder.close()
+
+    player = CassettePlayer(path)
+    bodies = [player.play("GET", "/iserver/account/orders", {"force": "False"})[0].json()["n"] for _ in range(3)]
+    assert bodies == [1, 2, 2]
+    assert player.keys == [request_key("GET", "/iserver/account/orders", {"force": False})]
@@ -0,0 +1,80 @@
+from ibkr_web_client import ScanBatchRunner, ScanDefinition, ScannerCatalog
+from ibkr_web_client.ibkr_types import MarketDataField
+
+from .test_scanner_catalog import SCANNER_PARAMS
+
+
+class FakeScanClient:
+    def __init__(self, results: dict):
+        self.results = results
+        self.snapshot_calls = []
+
+    def iserver_market_scanner(self, instrument, location, scan_type, filter_lst):
+        result = self.results[scan_type]
+        if isinstance(result, Exception):
+            raise result
+        return {"contracts": [{"con_id": conid, "symbol": f"S{conid}", "conidex": str(conid)} for conid in result]}
+
+    def get_live_market_data_snapshot(self, contract_id_lst, field_lst):
+        self.snapshot_calls.append(list(contract_id_lst))
+        return [{"conid": conid, "31": "10.0"} for conid in contract_id_lst]
+
+
+GAINERS = ScanDefinition("STK", "STK.US.MAJOR", "TOP_PERC_GAIN")
+HOT = ScanDefinition("STK", "STK.US.MAJOR", "HOT_BY_VOLUME", name="hot")
+
+
+def test_results_are_merged_by_conid_with_ranks():
+    client = FakeScanClient({"TOP_PERC_GAIN": [1, 2, 3], "HOT_BY_VOLUME": [3, 4]})
+
+    result = ScanBatchRunner(client).run([GAINERS, HOT])
+
+    assert result.errors == {}
+    assert set(result.entries) == {1, 2, 3, 4}
+    assert result.entries[3].ranks == {GAINERS.key: 2, "hot": 0}
+    assert result.entries[4].symbol == "S4"
+
+
+def test_enrichment_uses_one_snapshot_call():
+    client = FakeScanClient({"TOP_PERC_GAIN": [1, 2], "HOT_BY_VOLUME": [2, 3]})
+
+    result = ScanBatchRunner(client).run([GAINERS, HOT], enrich_fields=[MarketDataField.LAST_PRICE])
+
+    assert len(client.snapshot_calls) == 1
+    assert sorted(client.snapshot_calls[0]) == [1, 2, 3]
+    assert result.entries[2].snapshot["31"] == "10.0"
+
+
+def test_reruns_report_added_and_removed():
+    client = FakeScanClient({"TOP_PERC_GAIN": [1, 2], "HOT_BY_VOLUME": [5]})
+    runner = ScanBatchRunner(client)
+
+    first = runner.run([GAINERS, HOT])
+    assert first.added == {1, 2, 5}
+    assert first.removed == set()
+
+    client.results["TOP_PERC_GAIN"] = [2, 3]
+    second = runner.run([GAINERS, HOT])
+    assert second.added == {3}
+    assert second.removed == {1}
+
+    # matches of a failed scan are not reported as removed
+    client.results["HOT_BY_VOLUME"] = ConnectionError("boom")
+    third = runner.run([GAINERS, HOT])
+    assert "hot" in third.errors
+    assert third.removed == set()
+
+    # and not reported as added again once the scan recovers
+    client.results["HOT_BY_VOLUME"] = [5]
+    fourth = runner.run([GAINERS, HOT])
+    assert fourth.added == set() and fourth.removed == set()
+
+
+def test_catalog_rejects_invalid_definitions_without_network():
+    client = FakeScanClient({"TOP_PERC_GAIN": [1]})
+    invalid = ScanDefinition("STK", "STK.US.MAJOR", "MOST_ACTIVE")
+
+    result = ScanBatchRunner(client, catalog=ScannerCatalog(SCANNER_PARAMS)).run([GAINERS, invalid])
+
+    assert set(result.entries) == {1}
+    assert isinstance(result.errors[invalid.key], ValueError)
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from ibkr_web_client import ScannerCatalog
+
+SCANNER_PARAMS = {
+    "scan_type_list": [
+        {"display_name": "Top % Gainers", "code": "TOP_PERC_GAIN", "instruments": ["STK", "ETF.EQ.US"]},
+        {"display_name": "Hot Contracts", "code": "HOT_BY_VOLUME", "instruments": ["STK", "FUT.US"]},
+        {"display_name": "Most Active", "code": "MOST_ACTIVE", "instruments": ["FUT.US"]},
+    ],
+    "instrument_list": [
+        {"display_name": "US Stocks", "type": "STK", "filters": ["priceAbove", "priceBelow"]},
+        {"display_name": "US Futures", "type": "FUT.US", "filters": ["volumeAbove"]},
+    ],
+    "filter_list": [
+        {"group": "priceAbove", "display_name": "Price Above", "type": "non-range", "code": "priceAbove"},
+        {"group": "priceBelow", "display_name": "Price Below", "type": "non-range", "code": "priceBelow"},
+        {"group": "volumeAbove", "display_name": "Volume Above", "type": "non-range", "code": "volumeAbove"},
+    ],
+    "location_tree": [
+        {
+            "display_name": "US Stocks",
+            "type": "STK",
+            "locations": [
+                {
+                    "display_name": "Listed/NASDAQ",
+                    "type": "STK.US.MAJOR",
+                    "locations": [{"display_name": "NYSE", "type": "STK.NYSE", "locations": []}],
+                }
+            ],
+        },
+        {"display_name": "US Futures", "type": "FUT.US", "locations": [{"display_name": "CME", "type": "FUT.CME"}]},
+    ],
+}
+
+
+class FakeScannerClient:
+    def __init__(self):
+        self.calls = 0
+
+    def get_iserver_scanner_params(self):
+        self.calls += 1
+        return SCANNER_PARAMS
+
+
+def test_lookups():
+    catalog = ScannerCatalog(SCANNER_PARAMS)
+
+    assert catalog.instrument_types == ["STK", "FUT.US"]
+    assert set(catalog.locations_for("STK")) == {"STK.US.MAJOR", "STK.NYSE"}
+    assert [scan["code"] for scan in catalog.scan_types_for("STK", "STK.US.MAJOR")] == ["TOP_PERC_GAIN", "HOT_BY_VOLUME"]
+    assert catalog.filter("priceAbove")["display_name"] == "Price Above"
+    assert [f["code"] for f in catalog.filters_for("FUT.US")] == ["volumeAbove"]
+    with pytest.raises(ValueError):
+        catalog.scan_types_for("STK", "FUT.CME")
+
+
+@pytest.mark.parametrize(
+    "instrument, location, scan_type, filter_lst, message",
+    [
+        ("OPT", "STK.NYSE", "TOP_PERC_GAIN", [], "Unknown scanner instrument"),
+        ("STK", "FUT.CME", "TOP_PERC_GAIN", [], "not valid for instrument"),
+        ("STK", "STK.NYSE", "UNKNOWN", [], "Unknown scan type"),
+        ("STK", "STK.NYSE", "MOST_ACTIVE", [], "not valid for instrument"),
+        ("STK", "STK.NYSE", "TOP_PERC_GAIN", [{"code": "nope", "value": 1}], "Unknown scanner filter"),
+        ("STK", "STK.NYSE", "TOP_PERC_GAIN", [{"code": "volumeAbove", "value": 1}], "not valid for instrument"),
+    ],
+)
+def test_validate_rejects_invalid_scans(instrument, location, scan_type, filter_lst, message):
+    catalog = ScannerCatalog(SCANNER_PARAMS)
+
+    with pytest.raises(ValueError, match=message):
+        catalog.validate(instrument, location, scan_type, filter_lst)
+
+
+def test_validate_accepts_valid_scan():
+    ScannerCatalog(SCANNER_PARAMS).validate("STK", "STK.NYSE", "TOP_PERC_GAIN", [{"code": "priceAbove", "value": 5}])
+
+
+def test_load_persists_and_refreshes_after_ttl(tmp_path):
+    client = FakeScannerClient()
+    path = tmp_path / "scanner_params.json"
+
+    ScannerCatalog.load(client, path, ttl=60)
+    catalog = ScannerCatalog.load(client, path, ttl=60)
+    assert client.calls == 1
+    assert catalog.scan_type("MOST_ACTIVE") is not None
+
+    catalog.fetched_at = time.time() - 120
+    catalog.save(path)
+    ScannerCatalog.load(client, path, ttl=60)
+    assert client.calls == 2
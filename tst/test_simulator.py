@@ -0,0 +1,74 @@
+import logging
+import time
+
+import pytest
+
+from ibkr_web_client import IBKRHttpClient
+from ibkr_web_client.ibkr_types import MarketDataField, SortingOrder
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials, SimulatorSettings
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="module")
+def credentials(tmp_path_factory):
+    # small keys keep the test fast, the handshake is the same
+    return SimulatorCredentials.generate(tmp_path_factory.mktemp("credentials"), key_size=1024)
+
+
+def test_client_authenticates_and_reads_synthetic_data(credentials):
+    with IBKRSimulator(credentials, SimulatorSettings(size=30, accounts=3)) as simulator:
+        client = IBKRHttpClient(simulator.client_config(), LOGGER)
+
+        accounts = client.portfolio_accounts()
+        positions = client.get_all_positions(accounts[0]["id"], SortingOrder.DESCENDING)
+        snapshot = client.get_live_market_data_snapshot([100001, 100002], [MarketDataField.LAST_PRICE])
+        created = client.create_watchlist("7", "Simulated", [100001, 100002])
+
+        assert [account["id"] for account in accounts] == ["U1000000", "U1000001", "U1000002"]
+        assert len(positions) == 30
+        assert [row["conid"] for row in snapshot] == [100001, 100002] and float(snapshot[0]["31"]) > 0
+        assert created["id"] == "7"
+        assert client.get_watchlist_info("7")["instruments"][1]["conid"] == 100002
+        assert simulator.stats["live_session_tokens"] == 1
+        assert simulator.stats["unauthorized"] == 0
+
+
+def test_unsigned_requests_are_rejected(credentials):
+    simulator = IBKRSimulator(credentials)
+    url = f"{simulator.base_url}/portfolio/accounts"
+
+    status, _, _ = simulator.handle("GET", url, {}, b"", {"Authorization": 'OAuth oauth_signature="forged"'})
+
+    assert status == 401
+
+
+def test_expired_live_session_token_is_renewed(credentials):
+    settings = SimulatorSettings(lst_lifetime=0.5)
+    with IBKRSimulator(credentials, settings) as simulator:
+        client = IBKRHttpClient(simulator.client_config(update_session_interval=0), LOGGER)
+        client.portfolio_accounts()
+        time.sleep(0.6)
+        client.get_portfolio_summary("U1000000")
+
+        assert simulator.stats["live_session_tokens"] == 2
+        assert simulator.stats["unauthorized"] == 0
+
+
+def test_faults_are_injected_per_endpoint(credentials):
+    settings = SimulatorSettings(verify_signatures=False, fault_endpoints=("/portfolio/*",), latency=0.05)
+    simulator = IBKRSimulator(credentials, settings)
+    base_url = simulator.base_url
+
+    started = time.perf_counter()
+    status, _, _ = simulator.handle("GET", f"{base_url}/portfolio/accounts", {}, b"", {})
+    assert status == 200 and time.perf_counter() - started >= 0.05
+
+    settings.throttle_probability = 1.0
+    assert simulator.handle("GET", f"{base_url}/portfolio/accounts", {}, b"", {})[0] == 429
+    assert simulator.handle("GET", f"{base_url}/iserver/accounts", {}, b"", {})[0] == 200
+
+    settings.throttle_probability, settings.error_probability, settings.error_status = 0.0, 1.0, 503
+    assert simulator.handle("GET", f"{base_url}/portfolio/accounts", {}, b"", {})[0] == 503
+    assert simulator.stats["throttled"] == 1 and simulator.stats["errors"] == 1
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from ibkr_web_client import SingleFlight
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    singleflight = SingleFlight()
+    calls = []
+    key = SingleFlight.make_key("GET", "/portfolio/accounts")
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return "response"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(singleflight.do(key, fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["response"] * 5
+    assert len(calls) == 1
+    assert singleflight.stats == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_sequential_calls_are_not_coalesced():
+    singleflight = SingleFlight()
+    key = SingleFlight.make_key("GET", "/portfolio/accounts")
+
+    assert singleflight.do(key, lambda: 1) == 1
+    assert singleflight.do(key, lambda: 2) == 2
+    assert singleflight.stats["coalesced"] == 0
+
+
+def test_errors_are_shared_with_waiting_callers():
+    singleflight = SingleFlight()
+    key = SingleFlight.make_key("GET", "/iserver/exchangerate", {"target": "EUR", "source": "USD"})
+    started = threading.Event()
+
+    def fetch():
+        started.set()
+        time.sleep(0.1)
+        raise ConnectionError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            singleflight.do(key, fetch)
+        except ConnectionError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+    assert errors[0] is errors[1]
+
+
+def test_keys_depend_on_params_but_not_on_their_order():
+    assert SingleFlight.make_key("GET", "/a", {"x": 1, "y": 2}) == SingleFlight.make_key("GET", "a", {"y": 2, "x": 1})
+    assert SingleFlight.make_key("GET", "/a", {"x": 1}) != SingleFlight.make_key("GET", "/a", {"x": 2})
+
+
+@pytest.mark.parametrize(
+    "endpoint, enabled",
+    [("/portfolio/accounts", True), ("/portfolio/U1/summary", True), ("/iserver/account/orders", False)],
+)
+def test_endpoint_patterns(endpoint: str, enabled: bool):
+    singleflight = SingleFlight(include=("/portfolio/*",), exclude=("/iserver/account/orders",))
+
+    assert singleflight.enabled_for(endpoint) == enabled
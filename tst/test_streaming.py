@@ -0,0 +1,117 @@
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from ibkr_web_client import IBKRHttpClient, MarketDataStream
+from ibkr_web_client.ibkr_types import MarketDataField
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials, StreamSimulator
+
+
+LOGGER = logging.getLogger(__name__)
+FIELDS = [MarketDataField.LAST_PRICE, MarketDataField.BID_PRICE]
+
+
+@pytest.fixture(scope="module")
+def credentials(tmp_path_factory):
+    return SimulatorCredentials.generate(tmp_path_factory.mktemp("credentials"), key_size=1024)
+
+
+@pytest.fixture
+def simulators(credentials):
+    with IBKRSimulator(credentials) as simulator, StreamSimulator(simulator, tick_interval=0.01) as stream_simulator:
+        yield simulator, stream_simulator
+
+
+@pytest.fixture
+def client(simulators):
+    return IBKRHttpClient(simulators[0].client_config(), LOGGER)
+
+
+async def collect(stream: MarketDataStream, count: int) -> list:
+    ticks = []
+    async for tick in stream:
+        ticks.append(tick)
+        if len(ticks) == count:
+            return ticks
+
+
+def test_websocket_url(client, simulators):
+    simulator = simulators[0]
+    token = simulator.credentials.token_access
+
+    assert client.websocket_url() == f"{simulator.base_url.replace('http', 'ws', 1)}/ws?oauth_token={token}"
+
+
+def test_subscribed_ticks_are_streamed(client, simulators):
+    stream_simulator = simulators[1]
+    received = []
+
+    async def run():
+        async with MarketDataStream(client, stream_simulator.url, logger=LOGGER) as stream:
+            stream.on_tick(received.append)
+            await stream.subscribe(100001, FIELDS)
+            await stream.subscribe(100002, FIELDS)
+            ticks = await asyncio.wait_for(collect(stream, 10), 5)
+            await stream.unsubscribe(100002)
+            await asyncio.sleep(0.05)
+            subscriptions = stream_simulator.subscriptions
+        return ticks, subscriptions
+
+    ticks, subscriptions = asyncio.run(run())
+
+    assert {tick.conid for tick in ticks} == {100001, 100002}
+    assert set(ticks[0].fields) == {"31", "84"} and float(ticks[0].get(MarketDataField.LAST_PRICE)) > 0
+    assert ticks[0].as_snapshot_row()["conid"] == ticks[0].conid
+    assert len(received) >= len(ticks)
+    assert subscriptions == [{100001: ["31", "84"]}]
+
+
+def test_reconnect_resubscribes(client, simulators):
+    stream_simulator = simulators[1]
+
+    async def run():
+        async with MarketDataStream(client, stream_simulator.url, reconnect_delay=0.01, logger=LOGGER) as stream:
+            await stream.subscribe(100003, FIELDS)
+            await asyncio.wait_for(collect(stream, 1), 5)
+            await asyncio.get_running_loop().run_in_executor(None, stream_simulator.drop_connections)
+            await asyncio.wait_for(collect(stream, 5), 5)
+            return dict(stream.stats)
+
+    stats = asyncio.run(run())
+
+    assert stats["connects"] == 2 and stats["reconnects"] == 1 and stats["resubscriptions"] == 1
+    assert stream_simulator.stats["connections"] == 2
+    assert stream_simulator.stats["subscribes"] == 2
+
+
+def test_heartbeats(client, simulators):
+    stream_simulator = simulators[1]
+    stream_simulator.heartbeat_interval = 0.02
+
+    async def run():
+        async with MarketDataStream(client, stream_simulator.url, heartbeat_interval=0.02, logger=LOGGER) as stream:
+            await asyncio.sleep(0.2)
+            return dict(stream.stats)
+
+    stats = asyncio.run(run())
+
+    assert stats["heartbeats_sent"] >= 2 and stats["heartbeats_received"] >= 2
+    assert stream_simulator.stats["heartbeats"] >= 2
+
+
+def test_unauthenticated_connections_are_rejected(client, simulators):
+    stream_simulator = simulators[1]
+    url = stream_simulator.url.replace(stream_simulator.simulator.credentials.token_access, "forged")
+
+    async def run():
+        stream = MarketDataStream(client, url, reconnect_delay=0.01, logger=LOGGER)
+        with pytest.raises(asyncio.TimeoutError):
+            await stream.connect(timeout=0.2)
+        await stream.close()
+
+    asyncio.run(run())
+
+    assert stream_simulator.stats["rejected"] >= 1 and stream_simulator.stats["connections"] == 0
@@ -0,0 +1,129 @@
+import logging
+
+import pytest
+
+from ibkr_web_client import IBKRHttpClient, MarketDataSubscriptions
+from ibkr_web_client.ibkr_types import MarketDataField
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials, SimulatorSettings
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class FakeEndpoints:
+    def __init__(self):
+        self.unsubscribed = []
+        self.unsubscribe_all_calls = 0
+
+    def unsubscribe(self, conid: int):
+        self.unsubscribed.append(conid)
+
+    def unsubscribe_all(self):
+        self.unsubscribe_all_calls += 1
+
+
+def test_least_recently_used_are_evicted():
+    endpoints = FakeEndpoints()
+    subscriptions = MarketDataSubscriptions(endpoints.unsubscribe, endpoints.unsubscribe_all, line_budget=4)
+
+    subscriptions.acquire([1, 2, 3], ["31"])
+    subscriptions.acquire([1], ["84"])
+    evicted = subscriptions.acquire([4, 5])
+
+    assert evicted == [2] and endpoints.unsubscribed == [2]
+    assert list(subscriptions.active) == [3, 1, 4, 5]
+    assert subscriptions.active[1] == ("31", "84")
+    stats = subscriptions.stats
+    assert (stats["active"], stats["peak"], stats["occupancy"], stats["evicted"]) == (4, 4, 1.0, 1)
+
+
+def test_large_evictions_unsubscribe_all():
+    endpoints = FakeEndpoints()
+    subscriptions = MarketDataSubscriptions(endpoints.unsubscribe, endpoints.unsubscribe_all, line_budget=4)
+    subscriptions.acquire([1, 2, 3, 4])
+
+    evicted = subscriptions.acquire([4, 5, 6, 7])
+
+    assert evicted == [1, 2, 3] and endpoints.unsubscribe_all_calls == 1 and endpoints.unsubscribed == []
+    assert list(subscriptions.active) == [4, 5, 6, 7]
+
+
+def test_snapshot_larger_than_budget_is_rejected():
+    endpoints = FakeEndpoints()
+    subscriptions = MarketDataSubscriptions(endpoints.unsubscribe, endpoints.unsubscribe_all, line_budget=2)
+
+    with pytest.raises(ValueError):
+        subscriptions.acquire([1, 2, 3])
+
+
+def test_failed_unsubscribe_is_counted():
+    def unsubscribe(conid: int):
+        raise ConnectionError("down")
+
+    subscriptions = MarketDataSubscriptions(unsubscribe, lambda: None, line_budget=4, logger=LOGGER)
+    subscriptions.acquire([1, 2, 3, 4])
+    subscriptions.acquire([5])
+
+    assert subscriptions.stats["unsubscribe_failures"] == 1 and 1 not in subscriptions
+
+
+def test_client_stays_within_the_line_limit(tmp_path):
+    credentials = SimulatorCredentials.generate(tmp_path, key_size=1024)
+    with IBKRSimulator(credentials, SimulatorSettings(market_data_lines=3)) as simulator:
+        config = simulator.client_config(market_data_line_budget=3, coalesce_endpoints=())
+        client = IBKRHttpClient(config, LOGGER)
+
+        rows = []
+        for conids in ([100001, 100002], [100003], [100004, 100001], [100005]):
+            rows += client.get_live_market_data_snapshot(conids, [MarketDataField.LAST_PRICE])
+
+        assert all("31" in row for row in rows)
+        assert simulator.stats["line_limit_misses"] == 0
+        assert sorted(simulator.market_data_subscriptions) == sorted(client.market_data_subscriptions.active)
+
+        client.unsubscribe_market_data(100005)
+        assert 100005 not in client.market_data_subscriptions
+        client.unsubscribe_all_market_data()
+        assert simulator.market_data_subscriptions == [] and len(client.market_data_subscriptions) == 0
+
+
+def test_unsubscribes_are_sent_without_holding_the_lock():
+    subscriptions = None
+    seen_active = []
+
+    def unsubscribe(conid: int):
+        # a tracker call from the unsubscribe would deadlock if the lock were still held
+        seen_active.append(list(subscriptions.active))
+
+    subscriptions = MarketDataSubscriptions(unsubscribe, lambda: None, line_budget=4)
+    subscriptions.acquire([1, 2, 3, 4])
+    subscriptions.acquire([5])
+
+    assert seen_active == [[2, 3, 4, 5]]
+
+
+def test_failed_snapshots_roll_back_new_subscriptions():
+    endpoints = FakeEndpoints()
+    subscriptions = MarketDataSubscriptions(endpoints.unsubscribe, endpoints.unsubscribe_all, line_budget=4)
+    subscriptions.acquire([1, 2])
+    subscriptions.confirm([1, 2])
+
+    subscriptions.acquire([2, 3])
+    subscriptions.rollback([2, 3])
+
+    assert list(subscriptions.active) == [1, 2] and endpoints.unsubscribed == [3]
+
+
+def test_client_rolls_back_a_failed_snapshot(tmp_path):
+    credentials = SimulatorCredentials.generate(tmp_path, key_size=1024)
+    settings = SimulatorSettings(error_status=400, fault_endpoints=("/iserver/marketdata/snapshot",))
+    with IBKRSimulator(credentials, settings) as simulator:
+        config = simulator.client_config(market_data_line_budget=3, coalesce_endpoints=())
+        client = IBKRHttpClient(config, LOGGER)
+        client.get_live_market_data_snapshot([100001], [MarketDataField.LAST_PRICE])
+        settings.error_probability = 1.0
+
+        response = client.get_live_market_data_snapshot([100001, 100002], [MarketDataField.LAST_PRICE])
+
+        assert "error" in response
+        assert list(client.market_data_subscriptions.active) == [100001]
@@ -0,0 +1,90 @@
+from ibkr_web_client import TradeJournal
+from ibkr_web_client.trade_journal import DAY_MS, MAX_TRADE_DAYS
+
+
+def make_trade(execution_id: str, trade_time_ms: int, account: str = "DU111", conid: int = 265598) -> dict:
+    return {
+        "execution_id": execution_id,
+        "account": account,
+        "conid": conid,
+        "trade_time_r": trade_time_ms,
+        "symbol": "AAPL",
+        "side": "B",
+        "size": 10,
+        "price": "190.5",
+        "commission": "1.00",
+        "net_amount": 1905.0,
+    }
+
+
+class FakeTradesClient:
+    def __init__(self, trade_lst):
+        self.trade_lst = trade_lst
+        self.requested_days = []
+
+    def get_trades(self, days: int = 7, force: bool = None):
+        self.requested_days.append(days)
+        return list(self.trade_lst)
+
+
+def test_sync_appends_only_new_executions(tmp_path):
+    now = 1_700_000_000_000
+    client = FakeTradesClient([make_trade("a", now - DAY_MS), make_trade("b", now)])
+
+    with TradeJournal(tmp_path / "journal.sqlite") as journal:
+        assert journal.sync(client) == 2
+        client.trade_lst.append(make_trade("c", now + 1000))
+        assert journal.sync(client) == 1
+        assert len(journal) == 3
+
+    # journal is persisted and reopened
+    with TradeJournal(tmp_path / "journal.sqlite") as journal:
+        assert len(journal) == 3
+        assert journal.get("c")["trade_time_r"] == now + 1000
+
+
+def test_sync_window_shrinks_to_last_execution():
+    now = 1_700_000_000_000
+    journal = TradeJournal()
+    assert journal.sync_window_days(now) == MAX_TRADE_DAYS
+
+    journal.append([make_trade("a", now - 2 * DAY_MS + 1)])
+    assert journal.sync_window_days(now) == 3
+
+    journal.append([make_trade("b", now)])
+    assert journal.sync_window_days(now) == 1
+
+
+def test_range_queries():
+    start = 1_600_000_000_000
+    journal = TradeJournal()
+    journal.append(
+        [make_trade(f"e{i}", start + i * DAY_MS, account="DU1" if i % 2 else "DU2", conid=i % 3) for i in range(90)]
+    )
+
+    month = journal.query(start_ms=start, end_ms=start + 30 * DAY_MS)
+    assert [trade["execution_id"] for trade in month] == [f"e{i}" for i in range(30)]
+
+    by_account = journal.query(account="DU1")
+    assert len(by_account) == 45
+    assert all(trade["account"] == "DU1" for trade in by_account)
+
+    by_conid = journal.query(conid=2, start_ms=start + 60 * DAY_MS)
+    assert [trade["execution_id"] for trade in by_conid] == [f"e{i}" for i in range(60, 90) if i % 3 == 2]
+    assert len(journal.query(limit=5)) == 5
+
+
+def test_sync_records_the_interval_it_can_not_cover():
+    now = 1_700_000_000_000
+    journal = TradeJournal()
+    journal.append([make_trade("a", now - 30 * DAY_MS)])
+    client = FakeTradesClient([make_trade("b", now - DAY_MS)])
+
+    assert journal.uncovered_interval(now) == (now - 30 * DAY_MS, now - MAX_TRADE_DAYS * DAY_MS)
+    assert journal.sync(client, now) == 1
+    assert client.requested_days == [MAX_TRADE_DAYS]
+    assert journal.gaps() == [(now - 30 * DAY_MS, now - MAX_TRADE_DAYS * DAY_MS)]
+    assert journal.uncovered_interval(now) is None
+
+    journal.clear_gap(now - 30 * DAY_MS)
+    assert journal.gaps() == []
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from ibkr_web_client import fetch_transactions, transactions
+from ibkr_web_client.ibkr_types import BaseCurrency
+from ibkr_web_client.pacing import Pacer, RateLimiter
+
+
+def transaction(account_id: str, conid: int, date: str, qty: float, price: float) -> dict:
+    return {
+        "date": date,
+        "cur": "USD",
+        "fxRate": 1,
+        "pr": price,
+        "qty": qty,
+        "acctid": account_id,
+        "amt": -qty * price,
+        "conid": conid,
+        "type": "Buy" if qty > 0 else "Sell",
+        "desc": "",
+    }
+
+
+class FakeTransactionsClient:
+    def __init__(self, failing_account: str = None):
+        self.failing_account = failing_account
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_accounts_transactions(self, account_ids, contract_ids, currency=BaseCurrency.USD, days=90):
+        with self.lock:
+            self.calls.append((tuple(account_ids), tuple(contract_ids), days))
+        if self.failing_account in account_ids:
+            raise ConnectionError("boom")
+        transactions = [
+            transaction(account_id, conid, "Mon Oct 02 00:00:00 EDT 2023", 10, 100.0 + conid)
+            for account_id in account_ids
+            for conid in contract_ids
+        ]
+        # the server also reports a contract that was not asked for, every chunk gets it
+        transactions.append(transaction("U1", 999, "Tue Oct 03 00:00:00 EDT 2023", -5, 50.0))
+        return {"currency": currency.value, "transactions": transactions}
+
+
+def test_chunks_are_fetched_and_stacked():
+    client = FakeTransactionsClient()
+
+    table = fetch_transactions(
+        client, ["U1", "U2", "U3"], [1, 2, 3], days=30, account_chunk_size=2, conid_chunk_size=2
+    )
+
+    assert sorted(client.calls) == [
+        (("U1", "U2"), (1, 2), 30),
+        (("U1", "U2"), (3,), 30),
+        (("U3",), (1, 2), 30),
+        (("U3",), (3,), 30),
+    ]
+    assert len(table) == 9
+    assert table.out_of_slice == 4
+    assert table.errors == {}
+    assert table["conid"].dtype == np.int64
+    assert table["date"][0] == np.datetime64("2023-10-02")
+    assert 999 not in table["conid"]
+    assert table["amount"][table["conid"] == 1] == pytest.approx([-1010.0] * 3)
+    assert table["account"].tolist() == sorted(table["account"].tolist())
+
+
+def test_identical_fills_within_a_chunk_are_kept():
+    class RepeatedFillClient(FakeTransactionsClient):
+        def get_accounts_transactions(self, account_ids, contract_ids, currency=BaseCurrency.USD, days=90):
+            fill = transaction("U1", 1, "Mon Oct 02 00:00:00 EDT 2023", 10, 100.0)
+            return {"currency": currency.value, "transactions": [fill, dict(fill)]}
+
+    table = fetch_transactions(RepeatedFillClient(), ["U1"], [1])
+
+    assert len(table) == 2 and table.out_of_slice == 0
+    assert table["type"].tolist() == ["Buy", "Buy"]
+
+
+def test_failed_chunks_are_reported():
+    client = FakeTransactionsClient(failing_account="U2")
+
+    table = fetch_transactions(client, ["U1", "U2"], [1], account_chunk_size=1)
+
+    assert list(table.errors) == [(("U2",), (1,))]
+    assert sorted(set(table["account"].tolist())) == ["U1"]
+
+
+def test_empty_result_has_typed_columns():
+    table = fetch_transactions(FakeTransactionsClient(), [], [1])
+
+    assert len(table) == 0
+    assert table["date"].dtype == np.dtype("datetime64[D]")
+
+
+def test_chunks_wait_for_the_pacing_limit():
+    client = FakeTransactionsClient()
+    started = time.perf_counter()
+
+    table = fetch_transactions(client, ["U1", "U2", "U3"], [1], account_chunk_size=1, rate_limiter=RateLimiter(1, 0.1))
+
+    assert len(client.calls) == 3 and len(table) == 3
+    assert time.perf_counter() - started >= 0.2
+
+
+def test_paced_clients_share_the_transactions_limiter():
+    client = FakeTransactionsClient()
+    client.pacer = Pacer()
+
+    fetch_transactions(client, ["U1"], [1])
+    # the shared limiter has no token left for another chunk within 15 minutes
+    assert transactions._TRANSACTIONS_LIMITER.available < 1
@@ -0,0 +1,150 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from urllib3.util.retry import Retry
+
+from ibkr_web_client import IBKRHttpClient
+from ibkr_web_client.ibkr_types import MarketDataField, SortingOrder
+from ibkr_web_client.simulator import IBKRSimulator, SimulatorCredentials, SimulatorSettings
+from ibkr_web_client.transport import (
+    HttpxTransport,
+    InProcessTransport,
+    RequestsTransport,
+    Urllib3Transport,
+    create_transport,
+    encode_request,
+)
+
+
+LOGGER = logging.getLogger(__name__)
+FAST_RETRIES = Retry(total=2, backoff_factor=0, status_forcelist=[429, 500, 502, 503, 504])
+# concurrent identical reads would otherwise be coalesced or cached into one request
+UNCOALESCED = {"coalesce_endpoints": (), "response_cache_ttls": {}}
+
+
+def httpx_transport(simulator: IBKRSimulator) -> HttpxTransport:
+    pytest.importorskip("httpx")
+    return HttpxTransport()
+
+
+# Every transport has to pass the same conformance tests
+TRANSPORT_FACTORIES = {
+    "requests": lambda simulator: RequestsTransport(FAST_RETRIES),
+    "urllib3": lambda simulator: Urllib3Transport(FAST_RETRIES),
+    "httpx": httpx_transport,
+    "inprocess": lambda simulator: InProcessTransport(simulator.handle),
+}
+
+
+@pytest.fixture(scope="module")
+def credentials(tmp_path_factory):
+    return SimulatorCredentials.generate(tmp_path_factory.mktemp("credentials"), key_size=1024)
+
+
+@pytest.fixture
+def simulator(credentials):
+    with IBKRSimulator(credentials, SimulatorSettings(size=20, fault_endpoints=("/portfolio/*",))) as simulator:
+        yield simulator
+
+
+@pytest.fixture(params=sorted(TRANSPORT_FACTORIES))
+def transport(request, simulator):
+    transport = TRANSPORT_FACTORIES[request.param](simulator)
+    yield transport
+    transport.close()
+
+
+def test_client_calls(simulator, transport):
+    client = IBKRHttpClient(simulator.client_config(), LOGGER, transport)
+
+    positions = client.get_all_positions("U1000000", SortingOrder.DESCENDING)
+    snapshot = client.get_live_market_data_snapshot([100001, 100002], [MarketDataField.LAST_PRICE])
+    client.create_watchlist("7", "Conformance", [100001])
+    created = client.get_watchlist_info("7")
+    client.delete_watchlist("7")
+
+    assert client.transport is transport
+    assert len(positions) == 20
+    assert [row["conid"] for row in snapshot] == [100001, 100002]
+    assert created["name"] == "Conformance" and created["instruments"][0]["conid"] == 100001
+    assert simulator.stats["unauthorized"] == 0
+
+
+def test_error_responses_are_returned(simulator, transport):
+    config = simulator.client_config()
+    response = transport.request("GET", f"{config.base_url}/unknown/endpoint", {})
+
+    assert response.status_code == 404 and not response.ok
+    assert "Unknown endpoint" in response.json()["error"]
+
+
+def test_params_are_encoded_like_requests(simulator):
+    params = {"a": 1, "b": None, "c": "x y", "d": [1, 2]}
+    captured = {}
+
+    def capture(method, url, query, body, headers):
+        captured.update(query)
+        return simulator.handle(method, url, query, body, headers)
+
+    InProcessTransport(capture).request("GET", f"{simulator.base_url}/iserver/accounts", {}, params)
+    prepared = requests.Request("GET", simulator.base_url, params=params).prepare()
+
+    assert prepared.url.split("?")[1] == encode_request(params)[0]
+    assert captured == {"a": "1", "c": "x y", "d": "2"}
+
+
+@pytest.mark.parametrize("name", ["requests", "urllib3"])
+def test_throttled_requests_are_retried(simulator, name):
+    transport = TRANSPORT_FACTORIES[name](simulator)
+    client = IBKRHttpClient(simulator.client_config(enforce_pacing=False), LOGGER, transport)
+    simulator.settings.throttle_probability = 1.0
+
+    with pytest.raises(requests.exceptions.RetryError):
+        client.get_portfolio_summary("U1000000")
+    assert simulator.stats["throttled"] == 3
+
+
+@pytest.mark.parametrize("name", ["requests", "urllib3"])
+def test_connection_errors_are_requests_exceptions(name):
+    transport = create_transport(name, retries=Retry(total=0))
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        transport.request("GET", "http://127.0.0.1:9/v1/api/tickle", {})
+
+
+def test_unknown_transport():
+    with pytest.raises(ValueError):
+        create_transport("carrier-pigeon")
+
+
+@pytest.mark.parametrize("name", ["requests", "urllib3"])
+def test_live_session_token_shares_the_pool(simulator, name):
+    client = IBKRHttpClient(simulator.client_config(), LOGGER, create_transport(name))
+    client.get_portfolio_summary("U1000000")
+
+    # the token handshake, the session init calls and the summary all go over one keep-alive connection
+    assert client.pool_stats() == {"created": 1, "reused": 3, "discarded": 0}
+
+
+def test_warmup_opens_keep_alive_connections(simulator):
+    config = simulator.client_config(warmup_connections=3, pool_maxsize=4, **UNCOALESCED)
+    client = IBKRHttpClient(config, LOGGER)
+
+    assert client.pool_stats()["created"] == 3
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(lambda _: client.get_portfolio_summary("U1000000"), range(3)))
+    assert client.pool_stats()["created"] == 3
+
+
+def test_full_pool_discards_are_counted(simulator):
+    simulator.settings.latency = 0.05
+    config = simulator.client_config(pool_maxsize=1, enforce_pacing=False, **UNCOALESCED)
+    client = IBKRHttpClient(config, LOGGER)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: client.get_portfolio_summary("U1000000"), range(4)))
+
+    stats = client.pool_stats()
+    assert stats["created"] > 1 and stats["discarded"] == stats["created"] - 1
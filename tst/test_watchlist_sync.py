@@ -0,0 +1,90 @@
+import threading
+
+from ibkr_web_client import WatchlistSync, WatchlistSpec
+
+
+class FakeWatchlistClient:
+    def __init__(self, watchlists: dict):
+        # watchlist_id -> (name, conids)
+        self.watchlists = dict(watchlists)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __record(self, *call):
+        with self.lock:
+            self.calls.append(call)
+
+    def invalidate_response_cache(self, endpoint_pattern: str = "*") -> int:
+        return 0
+
+    def get_all_watchlists(self):
+        self.__record("list")
+        user_lists = [{"id": watchlist_id, "name": name} for watchlist_id, (name, _) in self.watchlists.items()]
+        return {"data": {"user_lists": user_lists}}
+
+    def get_watchlist_info(self, watchlist_id: str):
+        self.__record("info", watchlist_id)
+        name, conids = self.watchlists[watchlist_id]
+        instruments = [{"C": str(conid), "conid": conid} for conid in conids]
+        return {"id": watchlist_id, "name": name, "instruments": instruments}
+
+    def create_watchlist(self, watchlist_id: str, watchlist_name: str, contract_id_lst):
+        self.__record("create", watchlist_id)
+        if watchlist_name == "FAIL":
+            raise ConnectionError("boom")
+        self.watchlists[watchlist_id] = (watchlist_name, list(contract_id_lst))
+        return {"id": watchlist_id}
+
+    def delete_watchlist(self, watchlist_id: str):
+        self.__record("delete", watchlist_id)
+        del self.watchlists[watchlist_id]
+        return {"data": {"deleted": watchlist_id}}
+
+
+def test_sync_sends_only_needed_calls():
+    client = FakeWatchlistClient(
+        {"100": ("same", [1, 2]), "101": ("renamed", [1]), "102": ("conids", [1, 2]), "900": ("manual", [5])}
+    )
+    desired = {
+        "100": WatchlistSpec("same", [1, 2]),
+        "101": WatchlistSpec("new name", [1]),
+        "102": WatchlistSpec("conids", [2, 3]),
+        "103": WatchlistSpec("fresh", [7]),
+    }
+
+    report = WatchlistSync(client).sync(desired)
+
+    assert report.unchanged == ["100"]
+    assert sorted(report.replaced) == ["101", "102"]
+    assert report.created == ["103"]
+    assert report.deleted == []
+    assert {name: conids for name, conids in client.watchlists.values()} == {
+        "same": [1, 2],
+        "new name": [1],
+        "conids": [2, 3],
+        "fresh": [7],
+        "manual": [5],
+    }
+    assert ("create", "100") not in client.calls
+    assert set(report.timings) == {"fetch_list", "fetch_details", "diff", "apply"}
+
+    second = WatchlistSync(client).sync(desired)
+    assert not second.changed
+
+
+def test_prune_respects_managed_prefix():
+    client = FakeWatchlistClient({"gen-1": ("a", [1]), "gen-2": ("b", [2]), "manual": ("c", [3])})
+
+    report = WatchlistSync(client).sync({"gen-1": WatchlistSpec("a", [1])}, prune=True, managed_prefix="gen-")
+
+    assert report.deleted == ["gen-2"]
+    assert set(client.watchlists) == {"gen-1", "manual"}
+
+
+def test_failures_are_reported_per_watchlist():
+    client = FakeWatchlistClient({})
+
+    report = WatchlistSync(client).sync({"1": WatchlistSpec("FAIL", [1]), "2": WatchlistSpec("ok", [2])})
+
+    assert report.created == ["2"]
+    assert isinstance(report.errors["1"], ConnectionError)